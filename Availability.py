@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import os
+import math
+import argparse
+
+import numpy as np
+
+from ProgramModel import ProgramModel
+from NumericTime import NumericTime
+from DiagRules import DiagRules, DiagSettings, EvaluateDiagRules
+from ReportHelpers import SafeDelete
+from Log import Log, LogError
+
+# Who is free to fill a gap in the program?
+#
+# The availability matrix has a row for each person in the People tab and a column for each slot (half-hour, by default) of the
+# schedule grid.  A person is busy in a slot if they are on an item then or their Avoid entry covers it.  A person is available for an
+# item if they said yes and are busy in none of the item's slots.  (The people already on an item are busy during it, so they're never
+# offered for it.)
+#
+# Both the matrix and the questions are handled as whole arrays: the busy slots are marked via a difference array, and a running count
+# of each person's busy slots answers "is this person free from slot a to slot b" for every person and every item at once.
+#
+#   ProgramAnalyzer.py free                         Write "Available people.txt" for the items with too few people on them
+#   Availability.py                                 Print the same thing
+#   Availability.py --item "Panel name"             Who is available for these items
+#   Availability.py --time "Sat 2 pm" --length 1.5  Who is free at this time
+#   (--snapshot <file> reads the program from a snapshot; --any-response includes people who haven't said yes)
+
+_epsilon=0.001
+ChunkCells=4_000_000       # The most (person, item) pairs to compare at once, to keep the temporary arrays small
+
+
+class AvailabilityMatrix:
+    def __init__(self, model: ProgramModel, slotHours: float=0.5, respondedOnly: bool=True):
+        self.Model: ProgramModel=model
+        self.SlotHours: float=slotHours
+        self.RespondedOnly: bool=respondedOnly
+
+        # The people, in People tab order.  (Skip the empty Persons left behind by lookups of scheduled people who aren't in the People tab.)
+        persons=[(name, person) for name, person in model.Persons.items() if person.Fullname != ""]
+        self.People: list[str]=[name for name, _ in persons]
+        self._people: np.ndarray=np.array(self.People, dtype=object)
+        self._row: dict[str, int]={name: i for i, name in enumerate(self.People)}
+        self.RespondedYes: np.ndarray=np.array([person.RespondedYes for _, person in persons], dtype=bool)
+
+        # The slots run from the start of the earliest item to the end of the latest
+        spans=[(item.Time.Numeric, item.Length) for item in model.Items.values() if item.Time is not None and not item.Time.Bogus]
+        self.Origin: float=math.floor(min((t for t, _ in spans), default=0)/slotHours)*slotHours
+        end=max((t+length for t, length in spans), default=self.Origin)
+        self.SlotCount: int=max(1, math.ceil((end-self.Origin)/slotHours-_epsilon))
+
+        # Collect every busy interval as (row, first slot, slot after the last) and mark them all at once
+        rows: list[int]=[]
+        starts: list[float]=[]
+        ends: list[float]=[]
+        for name, schedule in model.Schedules.items():
+            row=self._row.get(name)
+            if row is None:
+                continue
+            for element in schedule:
+                if element.IsDummy or element.Time is None or element.Time.Bogus:
+                    continue
+                rows.append(row)
+                starts.append(element.Time.Numeric)
+                ends.append(element.Time.Numeric+element.Length)
+        for name, person in persons:
+            try:
+                avoids=person.Avoid
+            except ValueError as e:
+                LogError(f"AvailabilityMatrix: {name}: {e}")
+                continue
+            for av in avoids:
+                rows.append(self._row[name])
+                starts.append(av.Start.Numeric)
+                ends.append(av.End.Numeric)
+
+        first, after=self._SlotRange(np.array(starts, dtype=float), np.array(ends, dtype=float))
+        keep=first < after
+        marks=np.zeros((len(self.People), self.SlotCount+1), dtype=np.int32)
+        np.add.at(marks, (np.array(rows, dtype=np.int64)[keep], first[keep]), 1)
+        np.add.at(marks, (np.array(rows, dtype=np.int64)[keep], after[keep]), -1)
+        self.Busy: np.ndarray=np.cumsum(marks, axis=1)[:, :self.SlotCount] > 0     # people x slots
+
+        # _busyBefore[p, s] is the number of slots before slot s in which person p is busy
+        self._busyBefore: np.ndarray=np.zeros((len(self.People), self.SlotCount+1), dtype=np.int32)
+        np.cumsum(self.Busy, axis=1, out=self._busyBefore[:, 1:])
+        Log(f"Availability matrix: {len(self.People)} people x {self.SlotCount} slots of {slotHours} hours, {len(rows)} busy intervals")
+
+
+    # The slots covered by [start, end): any slot the interval overlaps by more than a moment.  Clipped to the grid.
+    def _SlotRange(self, start: np.ndarray, end: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        first=np.floor((start-self.Origin)/self.SlotHours+_epsilon).astype(np.int64)
+        after=np.ceil((end-self.Origin)/self.SlotHours-_epsilon).astype(np.int64)
+        return np.clip(first, 0, self.SlotCount), np.clip(after, 0, self.SlotCount)
+
+
+    # The people who could take part: everyone, or only those who said yes
+    @property
+    def _Candidates(self) -> np.ndarray:
+        if self.RespondedOnly:
+            return self.RespondedYes
+        return np.ones(len(self.People), dtype=bool)
+
+
+    # A bool per person: are they free for all of [start, start+length)?
+    def FreeMask(self, start: float|NumericTime, length: float) -> np.ndarray:
+        if isinstance(start, NumericTime):
+            start=start.Numeric
+        first, after=self._SlotRange(np.array([start]), np.array([start+length]))
+        return (self._busyBefore[:, after[0]]-self._busyBefore[:, first[0]] == 0) & self._Candidates
+
+    def FreeAt(self, start: float|NumericTime, length: float) -> list[str]:
+        return self._people[self.FreeMask(start, length)].tolist()
+
+
+    # An items x people bool matrix: is each person available for each item?  (Items with bogus times have no one available.)
+    def FreeMatrix(self, names: list[str]) -> np.ndarray:
+        items=self.Model.Items
+        times=np.array([items[name].Time.Numeric if items[name].Time is not None else 0.0 for name in names], dtype=float)
+        first, after=self._SlotRange(times, times+np.array([items[name].Length for name in names], dtype=float))
+        free=(self._busyBefore[:, after]-self._busyBefore[:, first] == 0) & self._Candidates[:, np.newaxis]    # people x items
+        free[:, times < _epsilon]=False
+        return free.T
+
+
+    # The people available for each of the items (all of them if names is None), keyed by item name
+    def AvailableForItems(self, names: list[str]|None=None) -> dict[str, list[str]]:
+        items=self.Model.Items
+        if names is None:
+            names=list(items)
+        names=[name for name in names if items[name].Time is not None and not items[name].Time.Bogus]
+        available: dict[str, list[str]]={}
+        if len(names) == 0 or len(self.People) == 0:
+            return {name: [] for name in names}
+
+        chunk=max(1, ChunkCells//len(self.People))
+        for lo in range(0, len(names), chunk):
+            free=self.FreeMatrix(names[lo:lo+chunk])
+            for j, name in enumerate(names[lo:lo+chunk]):
+                available[name]=self._people[free[j]].tolist()
+        return available
+
+    def Available(self, itemName: str) -> list[str]:
+        return self.AvailableForItems([itemName]).get(itemName, [])
+
+
+#*************************************************************************************************
+# The items the Diag rules find have too few people on them, in time order
+def UnderstaffedItems(model: ProgramModel) -> list[str]:
+    settings=DiagSettings(model)
+    rules=[rule for rule in DiagRules if rule.Name == "Low participant counts"]
+    names=[name for name, _ in EvaluateDiagRules(model, settings, rules)["Low participant counts"]]
+    return sorted(names, key=lambda name: (model.Items[name].Time.Numeric, model.RoomNames.index(model.Items[name].Room) if model.Items[name].Room in model.RoomNames else 0))
+
+
+def AvailabilityLines(model: ProgramModel, matrix: AvailabilityMatrix, names: list[str]) -> list[str]:
+    lines=[]
+    for name, people in matrix.AvailableForItems(names).items():
+        item=model.Items[name]
+        lines.append(f"{item.Time}  {item.Room}  {item.Name}: {len(item.People)}")
+        lines.append("    "+(", ".join(sorted(people)) if len(people) > 0 else "None available"))
+    return lines
+
+
+def WriteAvailablePeople(model: ProgramModel, reportsdir: str, timestamp: str) -> None:
+    matrix=AvailabilityMatrix(model)
+    fname=os.path.join(reportsdir, "Available people.txt")
+    SafeDelete(fname)
+    with open(fname, "w") as f:
+        print(f"People who said yes and are free for the items with fewer than {DiagSettings(model).MinimumParticipants} people on them\n", file=f)
+        print(timestamp, file=f)
+        lines=AvailabilityLines(model, matrix, UnderstaffedItems(model))
+        for line in lines:
+            print(line, file=f)
+        if len(lines) == 0:
+            print("None found", file=f)
+
+
+def main(argv: list[str]|None=None):
+    from ProgramAnalyzer import LoadModel
+    from ProgramLoader import ReadParameters, PrepareReportsDir
+
+    parser=argparse.ArgumentParser(description="Who is free for an item or a time slot?")
+    parser.add_argument("--parameters", default="parameters.txt", help="The parameters file (default: parameters.txt)")
+    parser.add_argument("--snapshot", default=None, help="Read the program from a snapshot rather than from the spreadsheet")
+    parser.add_argument("--item", action="append", default=None, help="An item's name (may be repeated)")
+    parser.add_argument("--time", default=None, help='A start time, e.g., "Sat 2 pm"')
+    parser.add_argument("--length", type=float, default=1.0, help="The length in hours (default 1) of the slot given by --time")
+    parser.add_argument("--any-response", action="store_true", help="Include people who haven't said yes")
+    args=parser.parse_args(argv)
+
+    parms=ReadParameters(args.parameters)
+    model=LoadModel(parms, args.snapshot, PrepareReportsDir(parms))
+    if model is None:
+        exit(999)
+    matrix=AvailabilityMatrix(model, respondedOnly=not args.any_response)
+
+    if args.time is not None:
+        start=NumericTime(args.time, calendar=model.Calendar)
+        print(f"Free {start} for {args.length} hours:")
+        for name in sorted(matrix.FreeAt(start, args.length)):
+            print(f"    {name}")
+        return
+
+    names=UnderstaffedItems(model) if args.item is None else args.item
+    missing=[name for name in names if name not in model.Items]
+    if len(missing) > 0:
+        parser.error(f"No such item: {', '.join(missing)}")
+    print("\n".join(AvailabilityLines(model, matrix, names)))
+
+
+if __name__ == "__main__":
+    main()
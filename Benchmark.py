@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import os
+import sys
+import time
+import json
+import argparse
+import platform
+import tempfile
+from datetime import datetime
+
+from HelpersPackage import ParmDict
+
+from SyntheticProgram import SyntheticProgram
+from ProgramLoader import LoadCellsFromXLSX
+from ProgramModel import BuildProgramModel
+from ReportRegistry import ReportsForCommand
+from ReportHelpers import MakeTimestamp
+from RunProfile import RunProfile
+from Log import Log
+
+# End-to-end benchmark: generate synthetic programs of several sizes and time each stage of a ProgramAnalyzer run on them
+# (load, clean, parse, schedule build and each report).  The results are written as JSON so runs can be compared over time.
+#
+#   python Benchmark.py --sizes small,medium,large --repeat 3 --output "Benchmark results.json"
+#
+# This must be run from the directory holding the Word templates if the docx reports are included.
+
+# The scale of each named size: rooms, days, hourly slots/day and people
+BenchmarkSizes: dict[str, dict[str, int]]={
+    "small":  {"rooms": 6,  "days": 3, "slots": 10, "people": 150},
+    "medium": {"rooms": 15, "days": 4, "slots": 12, "people": 800},
+    "large":  {"rooms": 30, "days": 5, "slots": 14, "people": 3000},
+    "huge":   {"rooms": 60, "days": 5, "slots": 15, "people": 8000},
+}
+
+
+# Run the pipeline once on a workbook, timing each stage.  Returns the stage times (in order) and the object counts.
+def TimeStages(workbook: str, tabs: dict[str, str], reportsdir: str, command: str="all") -> tuple[dict[str, float], dict[str, int]]:
+    parms=ParmDict(CaseInsensitiveCompare=True)
+    for parm, tabname in tabs.items():
+        parms[parm]=tabname
+
+    profile=RunProfile(command=command)
+    with profile.Stage("load"):
+        cells=LoadCellsFromXLSX(parms, workbook)
+    model=BuildProgramModel(cells, profile)
+    profile.RecordCounts(**model.Counts())
+
+    timestamp=MakeTimestamp()
+    for report in ReportsForCommand(command):
+        with profile.Stage(f"report: {report.Name}"):
+            report.Function(model, reportsdir, timestamp)
+    return {stage["name"]: stage["wall"] for stage in profile.Stages}, profile.Counts
+
+
+def RunBenchmarks(sizes: list[str], repeat: int, command: str, seed: int) -> dict:
+    results={"generated": datetime.now().isoformat(timespec="seconds"), "python": sys.version.split()[0], "platform": platform.platform(),
+             "command": command, "repeat": repeat, "runs": []}
+
+    with tempfile.TemporaryDirectory() as workdir:
+        reportsdir=os.path.join(workdir, "Reports")
+        os.mkdir(reportsdir)
+        for size in sizes:
+            scale=BenchmarkSizes[size]
+            workbook=os.path.join(workdir, f"{size}.xlsx")
+            start=time.perf_counter()
+            tabs=SyntheticProgram(seed=seed, **scale).WriteWorkbook(workbook)
+            Log(f"Benchmark: generated {size} workbook in {time.perf_counter()-start:.2f}s")
+
+            # Keep the best time for each stage over the repeats; it's the least noisy estimate
+            best: dict[str, float]={}
+            counts: dict[str, int]={}
+            for i in range(repeat):
+                stages, counts=TimeStages(workbook, tabs, reportsdir, command)
+                for name, t in stages.items():
+                    best[name]=min(t, best.get(name, t))
+
+            total=sum(best.values())
+            Log(f"Benchmark: {size}: {counts['items']} items, {counts['people']} people -- {total:.3f}s")
+            results["runs"].append({"size": size, "scale": scale, "counts": counts, "stages": best, "total": total})
+
+    return results
+
+
+def main():
+    parser=argparse.ArgumentParser(description="Time each stage of ProgramAnalyzer on synthetic programs of several sizes")
+    parser.add_argument("--sizes", default="small,medium", help=f"Comma-separated list from {', '.join(BenchmarkSizes)}")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per size; the best time for each stage is kept")
+    parser.add_argument("--reports", default="all", choices=["all", "check", "reports", "docx", "html", "ics", "feed", "resolve", "free"], help="Which reports to time")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default="Benchmark results.json")
+    args=parser.parse_args()
+
+    sizes=[s.strip() for s in args.sizes.split(",") if s.strip() != ""]
+    for size in sizes:
+        if size not in BenchmarkSizes:
+            parser.error(f"Unknown size '{size}'")
+
+    results=RunBenchmarks(sizes, args.repeat, args.reports, args.seed)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    Log(f"Benchmark results written to '{args.output}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+from bisect import bisect_right
+
+# The convention's calendar: which day of the week is Day One, and how many days the convention runs.
+#
+# Every NumericTime carries the calendar it was made with, so it can print its day name.  Each analysis builds its own calendar from
+# its Control tab and passes it explicitly to the parsing, so several conventions can be analyzed at once in one process (in threads,
+# or one after another) without seeing each other's days.  The calendar is fixed once built, apart from the number of convention days,
+# which is only known once the schedule has been read (see SetConventionDays).  DefaultCalendar is shared by everything made without a
+# calendar, so it is frozen: changing it raises an error, and a model which starts from it gets its own copy (see ProgramModel).
+#
+# The lookups NumericTime and ParseAvoid need are computed once, when the calendar is built:
+#   DayLookup       every prefix of every day name (lower case) --> the number of the first day it matches, counting from Day One
+#   DayStarts       the hour (counted from the start of Day One) at which each day starts
+#   NominalStarts   the hour at which each *nominal* day starts: 4am, so that late-night items belong with the evening before
+
+_weekDays: list[str]=["Sunday", "Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"]
+_dayNameForms: set[str]={day.lower() for day in _weekDays} | {day.lower()[:3] for day in _weekDays}     # The names and their abbreviations
+
+
+class ConventionCalendar:
+    NominalDayStartHour: float=4
+
+    def __init__(self, startingDay: str="Friday", conventionDays: int=3):
+        if startingDay not in _weekDays:
+            raise ValueError(f"ConventionCalendar: '{startingDay}' is not the name of a day")
+        # It's extra-long so that clipping days from the front will still leave a full week
+        self.DayList: list[str]=(_weekDays+_weekDays)[_weekDays.index(startingDay):]
+
+        self.DayLookup: dict[str, int]={}
+        for i, day in enumerate(self.DayList):
+            day=day.lower()
+            for length in range(len(day)+1):
+                self.DayLookup.setdefault(day[:length], i)
+
+        self.DayStarts: list[float]=[24.0*i for i in range(len(self.DayList))]
+        self.NominalStarts: list[float]=[24.0*i+self.NominalDayStartHour for i in range(len(self.DayList))]
+        self.Frozen: bool=False        # Can the convention days no longer be changed?
+        self.ConventionDays: int=conventionDays
+        self.SetConventionDays(conventionDays)
+
+
+    # Build the calendar from the Control tab's starting day.  Returns None if the day can't be interpreted.
+    @classmethod
+    def FromStartingDay(cls, startingDay: str, conventionDays: int=3) -> ConventionCalendar|None:
+        startingDay=startingDay.strip()
+        if startingDay == "":
+            return None
+        startingDay=startingDay[0].upper()+startingDay.lower()[1:]  # Force the capitalization to be right
+        if startingDay not in _weekDays:
+            return None
+        return cls(startingDay, conventionDays)
+
+
+    # A calendar of the same days which can be changed
+    def Copy(self) -> ConventionCalendar:
+        return ConventionCalendar(self.StartingDay, self.ConventionDays)
+
+    # Make the calendar unchangeable (for calendars which are shared)
+    def Freeze(self) -> ConventionCalendar:
+        self.Frozen=True
+        return self
+
+
+    # Record how many days the convention runs (the daily Avoids and the default Arrive and Leave days depend on it)
+    def SetConventionDays(self, conventionDays: int) -> None:
+        if self.Frozen:
+            raise ValueError(f"{self!r} is shared and can't be changed; change a Copy() of it")
+        self.ConventionDays=max(1, min(conventionDays, len(self.DayList)))
+
+
+    # Set the convention days from the times in the schedule: Day One through the last nominal day with an item
+    def SetConventionDaysFromTimes(self, hours: list[float]) -> None:
+        if len(hours) > 0:
+            self.SetConventionDays(max(self.NominalDay(h) for h in hours)+1)
+
+
+    @property
+    def StartingDay(self) -> str:
+        return self.DayList[0]
+
+    # The names of the days the convention runs, starting with Day One
+    @property
+    def ConventionDayNames(self) -> list[str]:
+        return self.DayList[:self.ConventionDays]
+
+    @property
+    def LastDayName(self) -> str:
+        return self.DayList[self.ConventionDays-1]
+
+
+    # The number of the first day (Day One is 0) whose name begins with dstr, or None
+    def DayNumber(self, dstr: str) -> int|None:
+        return self.DayLookup.get(dstr.strip().lower())
+
+    # Is s a day's name or its three-letter abbreviation?
+    def IsDayName(self, s: str) -> bool:
+        return s.lower() in _dayNameForms
+
+    def DayName(self, day: int) -> str:
+        return self.DayList[day]
+
+
+    # The day (Day One is 0) holding an hour counted from the start of Day One
+    def Day(self, hours: float) -> int:
+        return max(0, bisect_right(self.DayStarts, hours)-1)
+
+    # The nominal day of an hour (late-night hours belong to the day before).  Hours before 4am on Day One belong to Day One.
+    def NominalDay(self, hours: float) -> int:
+        return max(0, bisect_right(self.NominalStarts, hours)-1)
+
+
+    def __repr__(self) -> str:
+        return f"ConventionCalendar({self.StartingDay!r}, {self.ConventionDays})"
+
+
+# The calendar used by NumericTimes made without one: a Friday-Sunday convention, as was assumed before the Control tab said otherwise.
+# (It's shared, so it's frozen.)
+DefaultCalendar: ConventionCalendar=ConventionCalendar("Friday", 3).Freeze()
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import os
+import json
+
+from ProgramModel import ProgramModel, PersonOfInterest
+from ProgramSnapshot import WriteSnapshot, LoadSnapshot
+from ReportHelpers import ScrubPrecis, SortedParticipantList, ControlNumber
+from Log import Log, LogError
+
+# A versioned JSON feed of the program for the web site and the convention app, in the "Feed" folder of the reports directory:
+#   feed.json           The index clients poll: the current version, the name of the full program file and the deltas available
+#   program.json        The whole program: the days, the rooms, every item (time, room, people, scrubbed precis) and every participant
+#   delta-<n>.json      What changed between version n-1 and version n: the items and people added, removed and changed
+#   last feed.snapshot  A snapshot (see ProgramSnapshot) of the program as of the current version, which the next run's delta is taken against
+#
+# The version goes up only when the feed's content changes.  A client which has version v fetches delta-(v+1) ... delta-(current) and
+# applies them in turn; if any of those is no longer listed it fetches program.json instead.  The files are written compactly.
+#
+# This Control tab setting adjusts it:
+#   Feed: deltas kept       20      The number of deltas kept (older ones are deleted)
+
+_defaultSettings: dict[str, str]={
+    "Feed: deltas kept": "20",
+}
+
+_indexName="feed.json"
+_programName="program.json"
+_snapshotName="last feed.snapshot"
+
+
+# The feed's records of a program: the items and the participants, each keyed by name
+def FeedRecords(model: ProgramModel) -> dict:
+    items: dict[str, dict]={}
+    for name, item in model.Items.items():
+        if item.Time is None or item.Time.Bogus or item.DisplayName == "":
+            continue
+        items[name]={"id": name, "title": item.DisplayName, "day": item.Time.DayString, "start": round(item.Time.Numeric, 4), "length": item.Length,
+                     "room": item.Room, "people": [p for p in item.People if p != ""], "moderator": item.ModName, "precis": ScrubPrecis(item.Precis or "").strip()}
+
+    people: dict[str, dict]={}
+    for name in SortedParticipantList(model.Schedules):
+        if not PersonOfInterest(name, model.Schedules):
+            continue
+        schedule=[x for x in model.Schedules[name] if not x.IsDummy and x.ItemName in items]
+        people[name]={"name": name, "items": [x.ItemName for x in schedule], "moderating": [x.ItemName for x in schedule if x.IsMod]}
+
+    return {"days": model.Calendar.ConventionDayNames, "rooms": [r for r in model.RoomNames[1:] if r != ""], "items": items, "people": people}
+
+
+# The differences between two sets of records, as added and changed records and removed names
+def _Diff(old: dict[str, dict], new: dict[str, dict]) -> dict:
+    return {"added": [rec for name, rec in new.items() if name not in old],
+            "changed": [rec for name, rec in new.items() if name in old and old[name] != rec],
+            "removed": [name for name in old if name not in new]}
+
+
+def FeedDelta(old: dict, new: dict) -> dict:
+    delta={"items": _Diff(old["items"], new["items"]), "people": _Diff(old["people"], new["people"])}
+    # The days and rooms are short, so if they change they're sent whole
+    for key in ["days", "rooms"]:
+        if old[key] != new[key]:
+            delta[key]=new[key]
+    return delta
+
+
+def _DeltaIsEmpty(delta: dict) -> bool:
+    return all(len(delta[part][kind]) == 0 for part in ["items", "people"] for kind in ["added", "changed", "removed"]) and "days" not in delta and "rooms" not in delta
+
+
+def _WriteJson(fname: str, data: dict) -> None:
+    # Write to a temporary file and rename it, so a client never fetches a half-written file
+    temp=fname+".tmp"
+    with open(temp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(temp, fname)
+
+
+#*************************************************************************************************
+def WriteDataFeed(model: ProgramModel, reportsdir: str, timestamp: str) -> None:
+    deltasKept=ControlNumber(model.Control, "Feed: deltas kept", _defaultSettings["Feed: deltas kept"], int)
+    folder=os.path.join(reportsdir, "Feed")
+    os.makedirs(folder, exist_ok=True)
+    indexName=os.path.join(folder, _indexName)
+    snapshotName=os.path.join(folder, _snapshotName)
+
+    index={"version": 0, "generated": "", "program": _programName, "deltas": []}
+    if os.path.exists(indexName):
+        try:
+            with open(indexName, encoding="utf-8") as f:
+                index=json.load(f)
+        except (OSError, ValueError) as e:
+            LogError(f"WriteDataFeed: can't read '{indexName}' ({e}); starting the feed over")
+
+    # The previous version's records come from its snapshot.  Without one, there's no delta and clients must fetch the whole program.
+    records=FeedRecords(model)
+    previous=None
+    if index["version"] > 0 and os.path.exists(snapshotName):
+        try:
+            with LoadSnapshot(snapshotName) as snapshot:
+                previous=FeedRecords(snapshot.ToModel())
+        except (OSError, ValueError) as e:
+            LogError(f"WriteDataFeed: can't read the previous feed snapshot '{snapshotName}' ({e}); no delta will be written")
+
+    if previous is not None:
+        delta=FeedDelta(previous, records)
+        if _DeltaIsEmpty(delta) and os.path.exists(os.path.join(folder, _programName)):
+            Log(f"Data feed: unchanged at version {index['version']}")
+            return
+        version=index["version"]+1
+        delta={"from": index["version"], "to": version, "generated": timestamp, **delta}
+        fname=f"delta-{version}.json"
+        _WriteJson(os.path.join(folder, fname), delta)
+        index["deltas"].append({"from": index["version"], "to": version, "file": fname})
+        Log(f"Data feed: version {version}: items {len(delta['items']['added'])} added, {len(delta['items']['changed'])} changed, {len(delta['items']['removed'])} removed;"
+            f" people {len(delta['people']['added'])} added, {len(delta['people']['changed'])} changed, {len(delta['people']['removed'])} removed")
+    else:
+        # Starting over: any deltas there are don't lead to this version
+        version=index["version"]+1
+        for entry in index["deltas"]:
+            if os.path.exists(os.path.join(folder, entry["file"])):
+                os.remove(os.path.join(folder, entry["file"]))
+        index["deltas"]=[]
+        Log(f"Data feed: version {version} (full program only)")
+
+    for entry in index["deltas"][:-deltasKept] if deltasKept > 0 else index["deltas"]:
+        if os.path.exists(os.path.join(folder, entry["file"])):
+            os.remove(os.path.join(folder, entry["file"]))
+    index["deltas"]=index["deltas"][-deltasKept:] if deltasKept > 0 else []
+
+    _WriteJson(os.path.join(folder, _programName), {"version": version, "generated": timestamp, **records, "items": list(records["items"].values()),
+                                                    "people": list(records["people"].values())})
+    WriteSnapshot(snapshotName, model.Items, model.Persons, model.Schedules, model.Times, model.RoomNames, model.Control, model.Calendar)
+
+    # The index is written last, so it never points to files which aren't there yet
+    index["version"]=version
+    index["generated"]=timestamp
+    index["program"]=_programName
+    _WriteJson(indexName, index)
@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import os
+import difflib
+
+from ProgramModel import ProgramModel
+from ScheduleElement import ScheduleElement
+from ReportHelpers import SafeDelete, TimesOverlap
+from NameResolver import NameIndex, AliasColumn, CachedSuggestions
+
+# The error and checking reports
+
+
+#******
+# List the precis which have no corresponding items
+def WritePrecisWithoutItems(model: ProgramModel, reportsdir: str, timestamp: str) -> None:
+    if model.UnmatchedPrecis is None:   # No precis tab
+        return
+    fname=os.path.join(reportsdir, "Diag - precis without items.txt")
+    with open(fname, "w") as f:
+        print("Precis without corresponding items:", file=f)
+        print(timestamp,  file=f)
+        for itemname in model.UnmatchedPrecis:
+            print("   "+itemname, file=f)
+        if len(model.UnmatchedPrecis) == 0:
+            print("    None found", file=f)
+
+
+#******
+# Check for people in the schedule who are not in the people tab
+def WritePeopleNotInPeople(model: ProgramModel, reportsdir: str, timestamp: str) -> None:
+    gPersons=model.Persons
+    gSchedules=model.Schedules
+    missing=[personname for personname in gSchedules.keys() if personname not in gPersons.keys()]
+    suggestions=CachedSuggestions(NameIndex(gPersons, AliasColumn(model.Control)), missing, reportsdir) if len(missing) > 0 else {}
+    fname=os.path.join(reportsdir, "Diag - People in schedule but not in People.txt")
+    with open(fname, "w") as f:
+        print("People who are scheduled but not in People:", file=f)
+        print("(Note that these may be due to spelling differences, use of initials, etc.)", file=f)
+        print(timestamp,  file=f)
+        for personname in missing:
+            print("   "+personname, file=f)
+            if len(suggestions[personname]) > 0:
+                print("        Perhaps: "+", ".join(f"{name} ({score:.2f})" for name, score in suggestions[personname]), file=f)
+        if len(missing) == 0:
+            print("    None found", file=f)
+
+
+#******
+# List the scheduled names which were automatically resolved to People tab names (see NameResolver.ResolveScheduleNames)
+def WriteNamesResolved(model: ProgramModel, reportsdir: str, timestamp: str) -> None:
+    fname=os.path.join(reportsdir, "Diag - Names resolved automatically.txt")
+    with open(fname, "w") as f:
+        print("Scheduled names which were taken to be people in People:", file=f)
+        print("(Check these, and correct the spelling in the schedule or add an alias to People)", file=f)
+        print(timestamp,  file=f)
+        count=0
+        for item in model.Items.values():
+            for name, resolved in item.ResolvedNames.items():
+                print(f"   {item.Name}: '{name}' --> '{resolved}'", file=f)
+                count+=1
+        if count == 0:
+            print("    None found", file=f)
+
+
+#******
+# Check for people in the schedule whose response is 'y', but who are not scheduled to be on the program
+def WriteYesButNotScheduled(model: ProgramModel, reportsdir: str, timestamp: str) -> None:
+    gPersons=model.Persons
+    gSchedules=model.Schedules
+    fname=os.path.join(reportsdir, "Diag - People response is 'y' but who are not scheduled.txt")
+    with open(fname, "w") as f:
+        print("People who are scheduled and in People but whose response is 'y' but who are not scheduled:", file=f)
+        print(timestamp,  file=f)
+        count=0
+        for personname in gPersons.keys():
+            if gPersons[personname].RespondedYes:
+                found=False
+                for item in gSchedules.values():
+                    for x in item:
+                        if personname == x.PersonName:
+                            found=True
+                            break
+                    if found:
+                        break
+                if not found:
+                    count+=1
+                    print(f"   {personname} is not scheduled", file=f)
+        if count == 0:
+            print("    None found", file=f)
+
+
+#******
+# Check for people who are scheduled opposite themselves
+def WriteScheduleConflicts(model: ProgramModel, reportsdir: str, timestamp: str) -> None:
+    gPersons=model.Persons
+    gSchedules=model.Schedules
+    fname=os.path.join(reportsdir, "Diag - People with schedule conflicts.txt")
+    with open(fname, "w") as f:
+        print("People with schedule conflicts", file=f)
+        print(timestamp,  file=f)
+        count=0
+        for personname in gSchedules.keys():
+            pSched=[x for x in gSchedules[personname] if not x.IsDummy]     # Get a single person's schedule w/o dummy entries
+            if len(pSched) == 0:
+                continue
+
+            # Look for duplicate times
+            if len(pSched) > 1:     # Need two to tango
+                pSched.sort(key=lambda x: x.Time)       # Sort pSched by time
+                prev: ScheduleElement=pSched[0]
+                for item in pSched[1:]:
+                    # We insert dummy items for use elsewhere and need to ignore them here.  Also, prev is initialized to an empty Item which also has IsDummy set
+                    if TimesOverlap(item.Time, item.Length, prev.Time, prev.Length):
+                        print(f"{personname}: is scheduled to be in {prev.Room} and also {item.Room} at {prev.Time}", file=f)
+                        count+=1
+                    prev=item
+
+            # Now check for Avoid conflicts
+            avoidments=gPersons[personname].Avoid
+            for item in pSched:
+                for av in avoidments:
+                    if TimesOverlap(item.Time, item.Length, av.Start, av.Duration):
+                        print(f'{personname}: is scheduled to be in {item.Room} at {item.Time}, conflicting with "{av}"', file=f)
+                        count+=1
+
+        # To make it clear that the test ran, write a message if no conflicts were found.
+        if count == 0:
+            print("    None found", file=f)
+
+
+#******
+# Make a handy-dandy list of people's scheduling limitations
+def WriteSchedulingLimitations(model: ProgramModel, reportsdir: str, timestamp: str) -> None:
+    gPersons=model.Persons
+    fname=os.path.join(reportsdir, "People's scheduling limitations.txt")
+    with open(fname, "w") as f:
+        print("People's scheduling limitations", file=f)
+        print(timestamp,  file=f)
+        for personname in model.Schedules.keys():
+            avoidments=gPersons[personname].Avoid
+            output=f"{personname}: "
+            found=False
+            for av in avoidments:
+                if not found:
+                    found=True
+                else:
+                    output+=", "
+                output+=av.Pretty()
+            if found:
+                print(output, file=f)
+
+
+#******
+# Now look for similar name pairs
+def WriteSimilarNames(model: ProgramModel, reportsdir: str, timestamp: str) -> None:
+    # First we make up a list of all names that appear in any tab
+    names=set()
+    names.update(model.Schedules.keys())
+    names.update(model.Persons.keys())
+    similarNames: list[tuple[str, str, float]]=[]
+    for p1 in names:
+        for p2 in names:
+            if p1 < p2:
+                rat=difflib.SequenceMatcher(a=p1, b=p2).ratio()
+                if rat > .75:
+                    similarNames.append((p1, p2, rat))
+    similarNames.sort(key=lambda x: x[2], reverse=True)
+
+    fname=os.path.join(reportsdir, "Diag - Disturbingly similar names.txt")
+    SafeDelete(fname)
+    if len(similarNames) > 0:
+        with open(fname, "w") as f:
+            print("Names that are disturbingly similar:", file=f)
+            print(timestamp,  file=f)
+            count=0
+            for s in similarNames:
+                print(f"   {s[0]}  &  {s[1]}", file=f)
+                count+=1
+            if count == 0:
+                print("    None found", file=f)
@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import os
+import re
+import json
+from dataclasses import dataclass
+from typing import Callable
+
+from ProgramModel import ProgramModel
+from Item import Item
+from Person import Person
+from ReportHelpers import SafeDelete, ControlSetting, ControlNumber
+
+# The per-item and per-person checking reports, declared as rules.
+#
+# Each rule is a predicate which returns a finding (the line to report) or None.  All the item rules are evaluated in a single pass over
+# the items and all the person rules in a single pass over the people.  Each rule's findings go to its own Diag file, as before, and
+# all the findings also go to "Diag - findings.json" so they can be processed by other tools.
+#
+# The rules' settings come from the Control tab (setting name in column A, value in column B); any not given there take these defaults:
+#   Diag: minimum participants      3                               Items with fewer people than this are flagged
+#   Diag: routine items             Reading, KK, Kaffe, Autograph   Items whose names contain any of these don't need a moderator, precis or a full panel
+#   Diag: email pattern             ^[^@\s,]+@[^@\s,]+\.[^@\s,]+$   What an email address must look like
+#   Diag: skip rules                                                Names of rules not to run (e.g., "Missing precis"); their files say so
+
+_defaultSettings: dict[str, str]={
+    "Diag: minimum participants": "3",
+    "Diag: routine items": "Reading, KK, Kaffe, Autograph",
+    "Diag: email pattern": r"^[^@\s,]+@[^@\s,]+\.[^@\s,]+$",
+    "Diag: skip rules": "",
+}
+
+
+# The settings, converted and compiled once per run
+class DiagSettings:
+    def __init__(self, model: ProgramModel):
+        control=model.Control
+        self.MinimumParticipants: int=ControlNumber(control, "Diag: minimum participants", _defaultSettings["Diag: minimum participants"], int)
+        routine=ControlSetting(control, "Diag: routine items", _defaultSettings["Diag: routine items"])
+        self.RoutineItems: list[str]=[x.strip() for x in routine.split(",") if x.strip() != ""]
+        self.EmailPattern: re.Pattern=re.compile(ControlSetting(control, "Diag: email pattern", _defaultSettings["Diag: email pattern"]))
+        skip=ControlSetting(control, "Diag: skip rules", _defaultSettings["Diag: skip rules"])
+        self.SkipRules: set[str]={x.strip().lower() for x in skip.split(",") if x.strip() != ""}
+        self.Schedules=model.Schedules
+
+    # Is this a reading, KK, etc., which doesn't need the full panel treatment?
+    def IsRoutine(self, item: Item) -> bool:
+        return any(word in item.Name for word in self.RoutineItems)
+
+
+@dataclass(order=False)
+class DiagRule:
+    Name: str=""                # The rule's name, as used in findings and in "Diag: skip rules"
+    Kind: str=""                # "item" or "person"
+    Filename: str=""            # The Diag file its findings are written to
+    Heading: Callable=None      # (settings) --> the heading line(s) of the file
+    Check: Callable=None        # (name, item-or-person, settings) --> the finding's text, or None
+    NoneFound: str="    None found"
+    Delete: bool=True           # Delete the old file before writing
+
+
+#*************************************************************************************************
+# The rules
+
+def _ItemLine(item: Item) -> str:
+    return f"{item.Time} {item.Name}: {len(item.People)}"
+
+
+def _LowParticipants(name: str, item: Item, settings: DiagSettings) -> str|None:
+    if not item.Name or len(item.People) >= settings.MinimumParticipants or settings.IsRoutine(item) or item.Parms["solo"]:
+        return None
+    return _ItemLine(item)
+
+
+def _MissingModerator(name: str, item: Item, settings: DiagSettings) -> str|None:
+    if settings.IsRoutine(item) or item.Parms["solo"] or item.ModName != "":   # Solo items don't need a moderator
+        return None
+    return _ItemLine(item)
+
+
+def _MissingPrecis(name: str, item: Item, settings: DiagSettings) -> str|None:
+    if settings.IsRoutine(item) or (item.Precis is not None and len(item.Precis) > 0):
+        return None
+    return _ItemLine(item)
+
+
+def _SuspectEmail(name: str, person: Person, settings: DiagSettings) -> str|None:
+    email=person.Email
+    if len(email) == 0:
+        return None
+    if "," in email or " " in email:
+        return f"   {name} has a email address containing a comma or a space"
+    if settings.EmailPattern.match(email) is None:
+        return f"   {name} has a email address not of the form something@something.something"
+    return None
+
+
+def _ResponseNotYes(name: str, person: Person, settings: DiagSettings) -> str|None:
+    if person.RespondedYes or not any(not x.IsDummy for x in settings.Schedules.get(name, [])):
+        return None
+    return f"   {name} has a response of '{person.Response}'"
+
+
+DiagRules: list[DiagRule]=[
+    DiagRule("Response not yes", "person", "Diag - People in schedule and in People but whose response is not 'y'.txt",
+             lambda s: "People who are scheduled and in People but whose response is not 'y':", _ResponseNotYes, Delete=False),
+    DiagRule("Suspect emails", "person", "Diag - People with suspect email addresses.txt",
+             lambda s: "People with suspect email addresses:", _SuspectEmail, Delete=False),
+    DiagRule("Low participant counts", "item", "Diag - Items with unexpectedly low number of participants.txt",
+             lambda s: f"List of non-readings, non-KKs, and non-solo items with fewer than {s.MinimumParticipants} people on them\n\n", _LowParticipants,
+             NoneFound="None found"),
+    DiagRule("Missing moderators", "item", "Diag - Items missing a moderator.txt",
+             lambda s: "List of non-readings and KKs with no moderator\n\n", _MissingModerator, NoneFound="None found"),
+    DiagRule("Missing precis", "item", "Diag - Items missing a precis.txt",
+             lambda s: "List of non-readings and KKs with no precis\n\n", _MissingPrecis, NoneFound="None found"),
+]
+
+
+#*************************************************************************************************
+# Evaluate the rules.  Returns the findings of each rule, in the order found.
+def EvaluateDiagRules(model: ProgramModel, settings: DiagSettings, rules: list[DiagRule]) -> dict[str, list[tuple[str, str]]]:
+    findings: dict[str, list[tuple[str, str]]]={rule.Name: [] for rule in rules}
+
+    itemRules=[rule for rule in rules if rule.Kind == "item"]
+    if len(itemRules) > 0:
+        for name, item in model.Items.items():
+            for rule in itemRules:
+                finding=rule.Check(name, item, settings)
+                if finding is not None:
+                    findings[rule.Name].append((name, finding))
+
+    personRules=[rule for rule in rules if rule.Kind == "person"]
+    if len(personRules) > 0:
+        for name, person in model.Persons.items():
+            if person.Fullname == "":      # Skip the empty Persons left behind by lookups of scheduled people who aren't in the People tab
+                continue
+            for rule in personRules:
+                finding=rule.Check(name, person, settings)
+                if finding is not None:
+                    findings[rule.Name].append((name, finding))
+
+    return findings
+
+
+def WriteDiagRuleReports(model: ProgramModel, reportsdir: str, timestamp: str) -> None:
+    settings=DiagSettings(model)
+    rules=[rule for rule in DiagRules if rule.Name.lower() not in settings.SkipRules]
+    findings=EvaluateDiagRules(model, settings, rules)
+
+    # A skipped rule's file says so, rather than being left over from a run which didn't skip it
+    for rule in DiagRules:
+        if rule not in rules:
+            fname=os.path.join(reportsdir, rule.Filename)
+            SafeDelete(fname)
+            with open(fname, "w") as f:
+                print(f"Not checked: '{rule.Name}' is one of the Control tab's 'Diag: skip rules'", file=f)
+                print(timestamp, file=f)
+
+    for rule in rules:
+        fname=os.path.join(reportsdir, rule.Filename)
+        if rule.Delete:
+            SafeDelete(fname)
+        with open(fname, "w") as f:
+            print(rule.Heading(settings), file=f)
+            print(timestamp, file=f)
+            for _, text in findings[rule.Name]:
+                print(text, file=f)
+            if len(findings[rule.Name]) == 0:
+                print(rule.NoneFound, file=f)
+
+    fname=os.path.join(reportsdir, "Diag - findings.json")
+    with open(fname, "w", encoding="utf-8") as f:
+        json.dump({"timestamp": timestamp.strip(),
+                   "settings": {"minimum participants": settings.MinimumParticipants, "routine items": settings.RoutineItems,
+                                "email pattern": settings.EmailPattern.pattern, "skip rules": sorted(settings.SkipRules)},
+                   "findings": [{"rule": rule.Name, "kind": rule.Kind, "subject": subject, "text": text.strip()}
+                                for rule in rules for subject, text in findings[rule.Name]]},
+                  f, indent=2, ensure_ascii=False)
@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import io
+import os
+
+import docx
+from docx.shared import Inches
+from docx.enum.section import WD_ORIENTATION
+
+from DocxHelpers import AppendStyledParaToDoc, AppendStyledTextToPara
+
+from ProgramModel import ProgramModel, PersonOfInterest
+from ReportHelpers import SafeDelete, ScrubPrecis, SortedParticipantList
+
+# The Word reports.  python-docx is slow to import, so this module is only imported when Word output is wanted.
+
+# The templates' contents, keyed by the template's full path, so a process generating several conventions' documents (see ProgramBatch)
+# reads each template file only once.  The mtime is kept so that an edited template is re-read.
+_templateCache: dict[str, tuple[float, bytes]]={}
+
+
+# A new document based on the named template
+def LoadTemplate(fname: str) -> docx.Document:
+    path=os.path.abspath(fname)
+    mtime=os.path.getmtime(path)
+    cached=_templateCache.get(path)
+    if cached is None or cached[0] != mtime:
+        with open(path, "rb") as f:
+            cached=(mtime, f.read())
+        _templateCache[path]=cached
+    return docx.Document(io.BytesIO(cached[1]))
+
+
+#*******
+# Print the program participant's schedule report in docx format.
+# We accumulate the docx file in docx.Document() object, and then output it at the end.
+def WriteParticipantSchedulesDocx(model: ProgramModel, reportsdir: str, timestamp: str) -> None:
+    gItems=model.Items
+    gSchedules=model.Schedules
+    doc=LoadTemplate("Template - Program Participant Schedules.docx")  # The object holding the partly created Word document
+    fname=os.path.join(reportsdir, "Program participant schedules.docx")
+    SafeDelete(fname)
+    for personname in SortedParticipantList(gSchedules):
+        if PersonOfInterest(personname, gSchedules):
+            section=doc.add_section()
+            section.orientation=WD_ORIENTATION.PORTRAIT
+            AppendStyledParaToDoc(doc, personname, style="ParaPersonHeader")
+            for schedElement in gSchedules[personname]:
+                if len(schedElement.DisplayName) > 0:
+                    para=doc.add_paragraph()
+                    AppendStyledTextToPara(para, f"\n{schedElement.Time}:", charstyle="CharDayTime")
+                    AppendStyledTextToPara(para, "  "+schedElement.DisplayName, charstyle="CharItem")
+                    AppendStyledTextToPara(para, "  "+schedElement.Room, charstyle="CharRoom")
+                    item=gItems[schedElement.ItemName]
+                    AppendStyledParaToDoc(doc, f"Participants: {item.DisplayPlist()}", style="ProgPanellists")
+                    if item.Precis is not None and item.Precis != "":
+                        AppendStyledParaToDoc(doc, item.Precis, style="ProgPrecis")
+    # Output the docx.Document() object as a Word file.
+    doc.save(fname)
+
+
+# Create the pocket program Word file
+def WritePocketProgramDocx(model: ProgramModel, reportsdir: str, timestamp: str) -> None:
+    doc=LoadTemplate("Template - Pocket Program.docx")     # The object holding the partly created Word document
+    for time in model.Times:
+        AppendStyledParaToDoc(doc, "")
+        AppendStyledParaToDoc(doc, str(time), style="ParaTimeTitle2")
+        for room in model.RoomNames:
+            item=model.ItemsByTimeAndRoom.get((time, room))
+            if item is not None and len(item.DisplayName) > 0:
+                para=doc.add_paragraph()
+                AppendStyledTextToPara(para, room+": ", charstyle="CharProgItemRoom")
+                AppendStyledTextToPara(para, item.DisplayName, charstyle="CharProgItemName")
+                if len(item.People) > 0:            # And the item's people list
+                    plist=item.DisplayPlist()
+                    AppendStyledParaToDoc(doc, plist, style="ParaPeopleList")
+                if item.Precis is not None and item.Precis != "":
+                    AppendStyledParaToDoc(doc, ScrubPrecis(item.Precis), style="ParaPrecis")
+    fname=os.path.join(reportsdir, "Pocket program.docx")
+    doc.save(fname)
+
+
+# Create the individual (one per person) tentcard Word document
+def WriteIndividualTentcards(model: ProgramModel, reportsdir: str, timestamp: str) -> None:
+    gSchedules=model.Schedules
+    doc=LoadTemplate("Template - Tentcards.docx")
+    for personname in SortedParticipantList(gSchedules):
+        if any([not x.IsDummy for x in gSchedules[personname]]):
+            section=doc.add_section()
+            section.orientation=WD_ORIENTATION.LANDSCAPE
+            section.page_width=Inches(11)
+            section.page_height=Inches(8.5)
+            section.top_margin=Inches(5)
+            section.bottom_margin=Inches(1)
+            section.right_margin=Inches(0.2)
+            section.left_margin=Inches(0.2)
+
+            para=doc.add_paragraph()
+            para.alignment=1
+            size=86
+            if len(personname) > 18:
+                size=86*18/len(personname)
+            AppendStyledParaToDoc(doc, personname, style="TentcardPerson")
+
+    doc.save(os.path.join(reportsdir, "Tentcards -- Individual.docx"))
+
+
+# Create the tentcards for each program item Word document
+def WriteItemTentcards(model: ProgramModel, reportsdir: str, timestamp: str) -> None:
+    doc=LoadTemplate("Template - Tentcards.docx")
+    for room in model.RoomNames:
+        for time in model.Times:
+            item=model.ItemsByTimeAndRoom.get((time, room))
+            if item is not None and len(item.DisplayName) > 0:
+                for person in item.People:
+                    # Do a tentcard for this person
+                    section=doc.add_section()
+                    section.orientation=WD_ORIENTATION.LANDSCAPE
+                    section.page_width=Inches(11)
+                    section.page_height=Inches(8.5)
+
+                    section.top_margin=Inches(1)
+                    section.right_margin=Inches(0.2)
+                    section.left_margin=Inches(0.2)
+                    #section.top_margin=Inches(5)
+                    section.bottom_margin=Inches(1)
+
+                    # Add the paragraph for this tentcard
+                    AppendStyledParaToDoc(doc, f"{time} --  {room}\n{item.DisplayName}\n", style="TentcardPerson")
+
+                    # Set the margins for the big person's name for the front of the tentcard
+                    AppendStyledTextToPara(doc.paragraphs[-1], "\n", size=230)
+                    size=86
+                    if len(person) > 18:
+                        size=86*18/len(person)
+                    AppendStyledParaToDoc(doc, person, style="TentcardPerson")
+
+    doc.save(os.path.join(reportsdir, "Tentcards -- By Program Item.docx"))
+
+
+#******
+# Do the room signs.  They'll go in reports/rooms/<name>.docx
+def WriteRoomSigns(model: ProgramModel, reportsdir: str, timestamp: str) -> None:
+    # Create the roomsigns subfolder if none exists
+    path=os.path.join(reportsdir, "roomsigns")
+    doc=LoadTemplate("Template - Roomsigns.docx")
+    if not os.path.exists(path):
+        os.mkdir(path)
+    for room in model.RoomNames:
+        inuse=False  # Make sure that this room is actually in use
+        if len(room.strip()) == 0:
+            continue
+        AppendStyledParaToDoc(doc, room, style="RoomName")  # Room name at top
+        for time in model.Times:
+            item=model.ItemsByTimeAndRoom.get((time, room))
+            if item is not None and len(item.DisplayName) > 0:
+                inuse=True
+                AppendStyledParaToDoc(doc, "")    # Skip a line
+                para=doc.add_paragraph()
+                AppendStyledTextToPara(para, f"{item.Time}:  ", charstyle="TimeOfItem")   # Add the time in bold followed by the item's title
+                AppendStyledTextToPara(para, item.DisplayName, charstyle="NameOfItem")
+                AppendStyledParaToDoc(doc, item.DisplayPlist(), style="Participants")        # Then, on a new line, the people list in italic
+        fname=os.path.join(path, room.replace("/", "-")+".docx")
+        SafeDelete(fname)
+        if inuse:
+            doc.save(fname)
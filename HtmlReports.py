@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import os
+
+from HelpersPackage import PyiResourcePath, MessageLog, UnicodeToHtml
+
+from ProgramModel import ProgramModel
+from ReportHelpers import SafeDelete, ScrubPrecis
+from Log import LogError
+
+
+#******
+# Generate web pages, one for each day.
+def WriteHtmlSchedules(model: ProgramModel, reportsdir: str, timestamp: str) -> None:
+    currentday=""
+    f=None
+    for time in model.Times:
+        # We generate a separate report for each day
+        # The times are sorted in ascending order.
+        # We will let the act of the time flipping over to a new day create the new file
+        sortday=time.NominalDayString
+        if sortday != currentday:
+            # Close the old file, if any
+            if f is not None:
+                f.write('</font></table>\n')
+                # Read and append the footer
+                try:
+                    with open(PyiResourcePath("control-WebpageFooter.txt")) as f2:
+                        f.writelines(f2.readlines())
+                except:
+                    MessageLog("Can't read 'control-WebpageFooter.txt' (1)")
+                f.close()
+            # And open the new file
+            currentday=sortday
+            fname=os.path.join(reportsdir, "Schedule - "+sortday+".html")
+            SafeDelete(fname)
+            f=open(fname, "w")
+            try:
+                with open(PyiResourcePath("control-WebpageHeader.txt")) as f2:
+                    try:
+                        f.writelines(f2.readlines())
+                    except:
+                        LogError("Failure copying 'control-WebpageHeader.txt'")
+            except:
+                MessageLog("Can't open 'control-WebpageHeader.txt'")
+            f.write("<h2>"+sortday+"</h2>\n")
+            f.write('<table border="0" cellspacing="0" cellpadding="2">\n')
+
+        f.write('<tr><td colspan="3">')
+        f.write(f'<p class="time">{time.NumericToTextTime()}</p>')
+        f.write('</td></tr>\n')
+        for room in model.RoomNames:
+            item=model.ItemsByTimeAndRoom.get((time, room))
+            if item is not None and len(item.DisplayName) > 0:
+                f.write('<tr><td width="40">&nbsp;</td><td colspan="2">')   # Two columns, the first 40 pixes wide and empty
+                f.write(f'<p><span class="room">{room}: </span><span class="item">{item.DisplayName}</span></p>')
+                f.write('</td></tr>')
+                if len(item.People) > 0:            # And the item's people list
+                    f.write('<tr><td width="40">&nbsp;</td><td width="40">&nbsp;</td><td width="600">')     # Three columns, the first two 40 pixes wide and empty; the third 600 pixels wide
+                    f.write(f'<p><span class="people">{UnicodeToHtml(item.DisplayPlist())}</span></p>')
+                    f.write('</td></tr>\n')
+                if item.Precis is not None and item.Precis != "":
+                    f.write('<tr><td width="40">&nbsp;</td><td width="40">&nbsp;</td><td width="600">')     # Same
+                    f.write(f'<p><span class="precis">{UnicodeToHtml(ScrubPrecis(item.Precis))}</span></p>')
+                    f.write('</td></tr>\n')
+    if f is not None:
+        # Read and append the footer
+        f.write('</table>\n')
+        try:
+            with open(PyiResourcePath("control-WebpageFooter.txt")) as f2:
+                f.writelines(f2.readlines())
+        except:
+            MessageLog("Can't read 'control-WebpageFooter.txt' (2)")
+        f.close()
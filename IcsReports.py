@@ -0,0 +1,276 @@
+from __future__ import annotations
+
+import os
+import re
+import json
+import hashlib
+from datetime import datetime, date, timedelta, timezone
+from typing import Callable
+from concurrent.futures import ThreadPoolExecutor
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from ProgramModel import ProgramModel, PersonOfInterest
+from Item import Item
+from NumericTime import NumericTime
+from ReportHelpers import ScrubPrecis, SortedParticipantList, ControlSetting
+from Log import Log, LogError
+
+# iCalendar (.ics) files of the schedule: one for each participant and one of the whole program, in the "Calendars" folder of the
+# reports directory.
+#
+# Each event's UID is made from the item's identity -- its title (and which half it is, for a split item) -- and not from its room or
+# time, so that importing a newer version of a calendar moves the event already in the calendar app rather than adding a duplicate.
+# (Items with the same title, such as the KKs, are told apart by the order they come in the schedule: the first is the first, and so on.)
+# Each event also has a SEQUENCE, which goes up by one each time the event changes, and the LAST-MODIFIED time of that change, so that
+# calendar apps apply the update.
+#
+# The program is regenerated after every edit, but most edits change only a few people's schedules, so a calendar is only rewritten
+# when its contents change.  "Calendars/calendar state.json" keeps the hash of each calendar's contents (apart from its DTSTAMPs, which
+# record when it was written) and each event's hash, SEQUENCE and LAST-MODIFIED.  Calendars of people no longer on the program are
+# removed.  The calendars are built and written by a pool of worker threads.
+#
+# Calendar apps need real dates, so the Control tab should give the date of the convention's first day:
+#   Calendar: starting date     e.g., 2026-02-13 (YYYY-MM-DD)   The date of the Starting day.  (Required: without it no calendars are written.)
+#   Calendar: time zone         e.g., America/New_York          The convention's time zone.  (If missing, times are local to whoever imports them.)
+#   Calendar: name              e.g., Boskone 63                The name calendar apps show for the calendars (default: Program)
+# When the time zone is given, event times are written in UTC ("...Z"), which every calendar app reads the same way without needing
+# a VTIMEZONE definition of the zone.
+
+_stateName="calendar state.json"
+_oldHashesName="calendar hashes.json"     # (Where earlier versions kept just the calendars' hashes)
+_stampMarker="\x00DTSTAMP\x00"     # Where the DTSTAMP goes; it's left out of the hash so that an unchanged calendar hashes the same
+_workers=min(8, os.cpu_count() or 1)
+
+
+class IcsSettings:
+    def __init__(self, model: ProgramModel):
+        control=model.Control
+        self.Name: str=ControlSetting(control, "Calendar: name", "Program")
+        self.TimeZone: str=ControlSetting(control, "Calendar: time zone", "").strip()
+        self.Zone: ZoneInfo|None=self._Zone(self.TimeZone)
+        self.StartingDate: date|None=self._StartingDate(model, ControlSetting(control, "Calendar: starting date", ""))
+
+    # The date of the Starting day, or None if the Control tab doesn't give a usable one.  (There's no safe guess: a calendar of the
+    # wrong weekend is worse than none.)
+    @staticmethod
+    def _StartingDate(model: ProgramModel, text: str) -> date|None:
+        if text.strip() == "":
+            LogError("ControlTab:Calendar: starting date is missing, so no calendars will be written")
+            return None
+        try:
+            start=date.fromisoformat(text.strip()[:10])
+        except ValueError:
+            LogError(f"Can't interpret ControlTab:Calendar: starting date='{text}' as YYYY-MM-DD, so no calendars will be written")
+            return None
+        if start.weekday() != ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"].index(model.Calendar.StartingDay):
+            LogError(f"Calendar: starting date {start} is a {start:%A}, but the Starting day is {model.Calendar.StartingDay}")
+        return start
+
+    @staticmethod
+    def _Zone(name: str) -> ZoneInfo|None:
+        if name == "":
+            return None
+        try:
+            return ZoneInfo(name)
+        except (ZoneInfoNotFoundError, ValueError):
+            LogError(f"Can't interpret ControlTab:Calendar: time zone='{name}'.  Times will be local to whoever imports the calendars")
+            return None
+
+
+# Escape text as an iCalendar TEXT value
+def IcsText(s: str) -> str:
+    return s.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\r\n", "\\n").replace("\n", "\\n")
+
+
+# Fold a content line so no line is longer than 75 octets (continuation lines start with a space)
+def FoldLine(line: str) -> list[str]:
+    out: list[str]=[]
+    current=""
+    size=0
+    for ch in line:
+        n=len(ch.encode("utf-8"))
+        if size+n > (75 if len(out) == 0 else 74):
+            out.append(current)
+            current=""
+            size=0
+        current+=ch
+        size+=n
+    out.append(current)
+    return [out[0]]+[" "+x for x in out[1:]]
+
+
+# The UID of each item's event (by item name): the same every time for the same item, wherever and whenever it is
+def EventUIDs(model: ProgramModel) -> dict[str, str]:
+    uids: dict[str, str]={}
+    occurrences: dict[tuple[str, bool], int]={}
+    for name, item in model.Items.items():      # (In ScheduleTab order)
+        identity=(item.DisplayName, "{#2}" in name)
+        occurrence=occurrences.get(identity, 0)
+        occurrences[identity]=occurrence+1
+        key=f"{identity[0]}|{'#2' if identity[1] else ''}|{occurrence}"
+        uids[name]=hashlib.sha1(key.encode("utf-8")).hexdigest()[:24]+"@programanalyzer"
+    return uids
+
+
+# The version of an item's event which goes in the calendars
+class EventVersion:
+    def __init__(self, uid: str, sequence: int, modified: str):
+        self.UID: str=uid
+        self.Sequence: int=sequence
+        self.Modified: str=modified     # When it last changed (UTC, as iCalendar writes it)
+
+
+# A date-time property value: in UTC if the convention's time zone is known, otherwise "floating" (local to wherever it's viewed)
+def _DateTime(settings: IcsSettings, t: NumericTime, hours: float=0.0) -> str:
+    dt=datetime.combine(settings.StartingDate, datetime.min.time())+timedelta(minutes=round(60*(t.Numeric+hours)))
+    if settings.Zone is not None:
+        return f":{dt.replace(tzinfo=settings.Zone).astimezone(timezone.utc):%Y%m%dT%H%M%SZ}"
+    return f":{dt:%Y%m%dT%H%M%S}"
+
+
+def _EventLines(settings: IcsSettings, item: Item, version: EventVersion, moderating: bool=False) -> list[str]:
+    description=f"Participants: {item.DisplayPlist()}" if len(item.People) > 0 else ""
+    if moderating:
+        description="You are the moderator.\n"+description
+    precis=ScrubPrecis(item.Precis or "").strip()
+    if precis != "":
+        description+=("\n\n" if description != "" else "")+precis
+    lines=["BEGIN:VEVENT",
+           f"UID:{version.UID}",
+           f"DTSTAMP:{_stampMarker}",
+           f"SEQUENCE:{version.Sequence}",
+           f"LAST-MODIFIED:{version.Modified}",
+           "DTSTART"+_DateTime(settings, item.Time),
+           "DTEND"+_DateTime(settings, item.Time, item.Length),
+           f"SUMMARY:{IcsText(item.DisplayName)}",
+           f"LOCATION:{IcsText(item.Room)}"]
+    if description != "":
+        lines.append(f"DESCRIPTION:{IcsText(description)}")
+    lines.append("END:VEVENT")
+    return lines
+
+
+# The text of a calendar (with the DTSTAMP marker in place of the time stamps)
+def CalendarText(settings: IcsSettings, title: str, events: list[list[str]]) -> str:
+    lines=["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//ProgramAnalyzer//Program schedule//EN", "CALSCALE:GREGORIAN", "METHOD:PUBLISH",
+           f"X-WR-CALNAME:{IcsText(title)}"]
+    if settings.Zone is not None:
+        lines.append(f"X-WR-TIMEZONE:{settings.TimeZone}")
+    for event in events:
+        lines.extend(event)
+    lines.append("END:VCALENDAR")
+    return "".join(folded+"\r\n" for line in lines for folded in FoldLine(line))
+
+
+def _ParticipantCalendar(model: ProgramModel, settings: IcsSettings, versions: dict[str, EventVersion], personname: str) -> str:
+    events=[]
+    for element in model.Schedules[personname]:
+        if element.IsDummy or len(element.DisplayName) == 0 or element.ItemName not in model.Items:
+            continue
+        item=model.Items[element.ItemName]
+        if item.Time is None or item.Time.Bogus:
+            continue
+        events.append(_EventLines(settings, item, versions[element.ItemName], moderating=element.IsMod))
+    return CalendarText(settings, f"{settings.Name}: {personname}", events)
+
+
+# The items which go in the calendars
+def _CalendarItems(model: ProgramModel) -> list[Item]:
+    return [item for item in model.Items.values() if item.Time is not None and not item.Time.Bogus and item.DisplayName != ""]
+
+
+def _ProgramCalendar(model: ProgramModel, settings: IcsSettings, versions: dict[str, EventVersion]) -> str:
+    items=sorted(_CalendarItems(model), key=lambda item: (item.Time.Numeric, item.Room))
+    return CalendarText(settings, settings.Name, [_EventLines(settings, item, versions[item.Name]) for item in items])
+
+
+# Each item's event version (by item name), and the events' new state.  An event whose contents differ from last time (as recorded in
+# oldEvents) gets the next SEQUENCE and is LAST-MODIFIED now.
+def EventVersions(model: ProgramModel, settings: IcsSettings, oldEvents: dict[str, dict], stamp: str) -> tuple[dict[str, EventVersion], dict[str, dict]]:
+    uids=EventUIDs(model)
+    versions: dict[str, EventVersion]={}
+    events: dict[str, dict]={}
+    for item in _CalendarItems(model):
+        uid=uids[item.Name]
+        lines=_EventLines(settings, item, EventVersion(uid, 0, ""))
+        contents=hashlib.sha256("\n".join(line for line in lines if not line.startswith(("SEQUENCE:", "LAST-MODIFIED:"))).encode("utf-8")).hexdigest()
+        old=oldEvents.get(uid)
+        if old is None:
+            event={"Hash": contents, "Sequence": 0, "Modified": stamp}
+        elif old["Hash"] != contents:
+            event={"Hash": contents, "Sequence": old["Sequence"]+1, "Modified": stamp}
+        else:
+            event=old
+        events[uid]=event
+        versions[item.Name]=EventVersion(uid, event["Sequence"], event["Modified"])
+    return versions, events
+
+
+# A participant's name made safe to use as a file name
+def CalendarFilename(name: str) -> str:
+    return re.sub(r'[<>:"/\\|?*\x00-\x1f]', "_", name).strip(". ")+".ics"
+
+
+# Build one calendar and write it if it has changed.  Returns (filename, hash, written?).
+def _WriteIfChanged(folder: str, fname: str, build: Callable[[], str], oldHash: str|None, stamp: str) -> tuple[str, str, bool]:
+    text=build()
+    newHash=hashlib.sha256(text.replace(_stampMarker, "").encode("utf-8")).hexdigest()
+    path=os.path.join(folder, fname)
+    if newHash == oldHash and os.path.exists(path):
+        return fname, newHash, False
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(text.replace(_stampMarker, stamp))
+    return fname, newHash, True
+
+
+def WriteCalendars(model: ProgramModel, reportsdir: str, timestamp: str) -> None:
+    settings=IcsSettings(model)
+    if settings.StartingDate is None:
+        return
+    folder=os.path.join(reportsdir, "Calendars")
+    os.makedirs(folder, exist_ok=True)
+    stateName=os.path.join(folder, _stateName)
+    oldHashes: dict[str, str]={}
+    oldEvents: dict[str, dict]={}
+    try:
+        if os.path.exists(stateName):
+            with open(stateName, encoding="utf-8") as f:
+                state=json.load(f)
+            oldHashes=state["Calendars"]
+            oldEvents=state["Events"]
+        elif os.path.exists(os.path.join(folder, _oldHashesName)):
+            with open(os.path.join(folder, _oldHashesName), encoding="utf-8") as f:
+                oldHashes=json.load(f)
+            os.remove(os.path.join(folder, _oldHashesName))
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        LogError(f"WriteCalendars: can't read '{stateName}' ({e}); rewriting every calendar")
+        oldHashes, oldEvents={}, {}
+
+    stamp=datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    versions, events=EventVersions(model, settings, oldEvents, stamp)
+
+    # What to build: the whole program, then each participant.  (The builders only read the model, so they can run side by side.)
+    jobs: dict[str, Callable[[], str]]={CalendarFilename(settings.Name): lambda: _ProgramCalendar(model, settings, versions)}
+    for personname in SortedParticipantList(model.Schedules):
+        if PersonOfInterest(personname, model.Schedules):
+            fname=CalendarFilename(personname)
+            if fname in jobs:
+                LogError(f"WriteCalendars: '{personname}' has the same calendar file name as someone else; skipped")
+                continue
+            jobs[fname]=lambda personname=personname: _ParticipantCalendar(model, settings, versions, personname)
+
+    with ThreadPoolExecutor(max_workers=_workers) as pool:
+        results=list(pool.map(lambda job: _WriteIfChanged(folder, job[0], job[1], oldHashes.get(job[0]), stamp), jobs.items()))
+
+    # Remove the calendars of people who are no longer on the program
+    newHashes={fname: h for fname, h, _ in results}
+    for fname in oldHashes:
+        if fname not in newHashes and os.path.exists(os.path.join(folder, fname)):
+            os.remove(os.path.join(folder, fname))
+
+    with open(stateName, "w", encoding="utf-8") as f:
+        json.dump({"Calendars": newHashes, "Events": events}, f, indent=1, ensure_ascii=False)
+    written=sum(1 for _, _, w in results if w)
+    updated=sum(1 for uid, event in events.items() if uid in oldEvents and event["Sequence"] != oldEvents[uid]["Sequence"])
+    Log(f"Calendars: {written} of {len(results)} written ({len(results)-written} unchanged), {len([f for f in oldHashes if f not in newHashes])} removed;"
+        f" {updated} events updated")
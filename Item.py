@@ -18,6 +18,7 @@ class Item:
         if Parms is None:
             Parms=ParmDict(CaseInsensitiveCompare=True)
         self.Parms: ParmDict=Parms
+        self.ResolvedNames: dict[str, str]={}   # Names as scheduled --> the People tab names they were automatically resolved to
         self.ItemText=ItemText  # This must be last as it relies on the rest of the object having been initialized
         self.IsContinuation: bool=False
         if "{cont}" in ItemText:
@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import os
+import re
+import json
+import difflib
+import hashlib
+import unicodedata
+from collections import defaultdict
+
+from HelpersPackage import ParmDict
+
+from Person import Person
+from Item import Item
+from ReportHelpers import ControlSetting
+from Log import Log, LogError
+
+# Matching the names in the schedule to the People tab.
+#
+# A scheduled name which isn't exactly a People tab name is looked up in an index built once from the People tab:
+#   Normalized names    case, accents, punctuation and spacing ignored: "José  Smith", "jose smith" and "Jose Smith." are all the same
+#   Aliases             the names in the People tab's alias column (separated by semicolons), e.g., "Chip Delany; Samuel R. Delany"
+#   Last names          failing those, the people with the same last name: if exactly one of them has the same first name, or a first
+#                       name matching an initial ("C. Cherryh" for "Carolyn Cherryh", or the other way round), middle names and initials
+#                       being ignored ("Samuel Delany" for "Samuel R. Delany"), it's that person
+# All are dictionary lookups, so resolving a name takes the same time however long the People tab is.  A scheduled name which resolves
+# to exactly one person is replaced by that person's People tab name throughout the model.  (Moderator flags written as "(Mod)" or
+# "(moderator)" rather than "(M)" are recognized, too.)
+#
+# Names which don't resolve -- misspellings, or initials and first names which fit more than one person -- are left for "Diag - People in
+# schedule but not in People", which lists them with ranked suggestions.  The candidates come from the last-name buckets: people with the same last name, or
+# (failing that) a similar one.  The suggestions are kept in "Name suggestions cache.json" in the reports directory and reused for as long
+# as the People tab's names and aliases are unchanged.
+#
+# This Control tab setting adjusts it:
+#   Names: alias column     alias       The People tab column holding other names people are scheduled under
+
+_defaultSettings: dict[str, str]={
+    "Names: alias column": "alias",
+}
+
+_cacheName="Name suggestions cache.json"
+_modVariants=re.compile(r"\(\s*(mod|moderator|moderating)\s*\)", re.IGNORECASE)
+
+
+# A name reduced to the form compared: lower case, no accents, punctuation or moderator flag, and single spaces
+def NormalizeName(name: str) -> str:
+    name=_modVariants.sub(" ", re.sub(r"\(m\)", " ", name, flags=re.IGNORECASE))
+    name="".join(ch for ch in unicodedata.normalize("NFKD", name) if not unicodedata.combining(ch))
+    return " ".join(re.sub(r"[^\w\s]", " ", name.lower()).split())
+
+
+class NameIndex:
+    def __init__(self, persons: dict[str, Person], aliasColumn: str="alias"):
+        self.Names: set[str]={name for name, person in persons.items() if person.Fullname != ""}
+        self.Normalized: dict[str, str]={}             # Normalized name or alias --> People tab name
+        self.Ambiguous: set[str]=set()                  # Normalized names or aliases belonging to more than one person
+        self.LastNames: defaultdict[str, list[str]]=defaultdict(list)     # Normalized last name --> People tab names
+        aliases: list[str]=[]
+
+        for name in sorted(self.Names):
+            self._Add(NormalizeName(name), name)
+            tokens=NormalizeName(name).split()
+            if len(tokens) > 0:
+                self.LastNames[tokens[-1]].append(name)
+            for alias in str(persons[name].Parms[aliasColumn, ""]).split(";"):
+                if alias.strip() != "":
+                    self._Add(NormalizeName(alias), name)
+                    aliases.append(f"{alias.strip()}={name}")
+
+        # Identifies the names and aliases the index was built from, so cached suggestions can be checked
+        self.Fingerprint: str=hashlib.sha1("\n".join(sorted(self.Names)+sorted(aliases)).encode("utf-8")).hexdigest()
+
+
+    def _Add(self, key: str, name: str) -> None:
+        if key == "" or key in self.Ambiguous:
+            return
+        if key in self.Normalized and self.Normalized[key] != name:
+            del self.Normalized[key]
+            self.Ambiguous.add(key)
+            return
+        self.Normalized[key]=name
+
+
+    # The People tab name a scheduled name refers to, or None if there isn't exactly one
+    def Resolve(self, name: str) -> str|None:
+        if name in self.Names:
+            return name
+        key=NormalizeName(name)
+        if key in self.Normalized or key in self.Ambiguous:
+            return self.Normalized.get(key)
+
+        # The one person with the same last name whose first name matches (ignoring middle names and initials)
+        tokens=key.split()
+        if len(tokens) < 2:
+            return None
+        matches=[candidate for candidate in self.LastNames.get(tokens[-1], []) if _FirstNamesMatch(tokens, NormalizeName(candidate).split())]
+        return matches[0] if len(matches) == 1 else None
+
+
+    # The people a name most likely refers to, best first, as (People tab name, score from 0 to 1)
+    def Suggestions(self, name: str, count: int=3, cutoff: float=0.6) -> list[tuple[str, float]]:
+        tokens=NormalizeName(name).split()
+        if len(tokens) == 0:
+            return []
+        candidates=list(self.LastNames.get(tokens[-1], []))
+        if len(candidates) == 0:
+            for last in difflib.get_close_matches(tokens[-1], self.LastNames.keys(), n=3, cutoff=0.75):
+                candidates.extend(self.LastNames[last])
+
+        scored=[]
+        for candidate in candidates:
+            other=NormalizeName(candidate).split()
+            score=difflib.SequenceMatcher(a=" ".join(tokens), b=" ".join(other)).ratio()
+            # The same first and last names (ignoring middle names), or an initial for the first name, are strong evidence; a different
+            # first name is evidence against
+            if len(tokens) > 1 and len(other) > 1:
+                sameLast=1.0 if tokens[-1] == other[-1] else 0.9
+                if tokens[0] == other[0]:
+                    score=max(score, 0.95*sameLast)
+                elif (len(tokens[0]) == 1 and other[0].startswith(tokens[0])) or (len(other[0]) == 1 and tokens[0].startswith(other[0])):
+                    score=max(score, 0.9*sameLast)
+                else:
+                    score*=0.85
+            if score >= cutoff:
+                scored.append((candidate, round(score, 3)))
+        scored.sort(key=lambda x: (-x[1], x[0]))
+        return scored[:count]
+
+
+# Do two normalized names (as lists of tokens) have the same first name, or a first name and its initial?
+def _FirstNamesMatch(tokens: list[str], other: list[str]) -> bool:
+    if len(tokens) < 2 or len(other) < 2:
+        return False
+    a, b=tokens[0], other[0]
+    return a == b or (len(a) == 1 and b.startswith(a)) or (len(b) == 1 and a.startswith(b))
+
+
+def AliasColumn(control: ParmDict) -> str:
+    return ControlSetting(control, "Names: alias column", _defaultSettings["Names: alias column"])
+
+
+# Replace each scheduled name which resolves to a People tab name by that name, in the items' people lists and moderators.
+# A name which resolves to someone already on the item is a second listing of that person, so it is dropped rather than rewritten.
+# Each item's ResolvedNames records what was done, for the Diag report.
+# (A caller resolving names repeatedly against the same People tab can pass the index to use.)
+# Returns the number of names replaced or dropped.
+def ResolveScheduleNames(items: dict[str, Item], persons: dict[str, Person], aliasColumn: str="alias", index: NameIndex|None=None) -> int:
+    count=0
+    for item in items.values():
+        people: list[str]=[]
+        for name in item.People:
+            if name in persons and persons[name].Fullname != "":
+                people.append(name)
+                continue
+            if index is None:
+                index=NameIndex(persons, aliasColumn)
+            resolved=index.Resolve(name)
+            if resolved is None or resolved == name:
+                people.append(name)
+                continue
+            if resolved in item.People or resolved in people:
+                Log(f"'{name}' on {item.Name} resolved to '{resolved}', who is already on it: dropped")
+            else:
+                people.append(resolved)
+                Log(f"'{name}' on {item.Name} resolved to '{resolved}'")
+            if item.ModName == name or (item.ModName == "" and _modVariants.search(name) is not None):
+                item.ModName=resolved
+            item.ResolvedNames[name]=resolved
+            count+=1
+        item.People[:]=people
+    return count
+
+
+# The suggestions for each of the names, reusing those in the reports directory's cache when the People tab's names haven't changed
+def CachedSuggestions(index: NameIndex, names: list[str], reportsdir: str) -> dict[str, list[tuple[str, float]]]:
+    fname=os.path.join(reportsdir, _cacheName)
+    cached: dict[str, list]={}
+    if os.path.exists(fname):
+        try:
+            with open(fname, encoding="utf-8") as f:
+                cache=json.load(f)
+            if cache.get("Fingerprint") == index.Fingerprint:
+                cached=cache["Suggestions"]
+        except (OSError, ValueError, KeyError) as e:
+            LogError(f"CachedSuggestions: can't read '{fname}' ({e}); recomputing")
+
+    suggestions={name: [tuple(x) for x in cached[name]] if name in cached else index.Suggestions(name) for name in names}
+    with open(fname, "w", encoding="utf-8") as f:
+        json.dump({"Fingerprint": index.Fingerprint, "Suggestions": suggestions}, f, ensure_ascii=False, indent=1)
+    Log(f"Name suggestions: {len(names)} unresolved names, {sum(1 for name in names if name in cached)} from the cache")
+    return suggestions
@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import os
+import re
+import zlib
+
+import numpy as np
+
+from ProgramModel import ProgramModel
+from DiagRules import DiagSettings
+from ReportHelpers import SafeDelete, ScrubPrecis, ControlSetting, ControlNumber
+from Log import Log, LogError
+
+# Find items entered twice under slightly different titles, and items with copy-and-pasted precis -- in this program, and (optionally)
+# between this program and the earlier programs stored in a ProgramDatabase.
+#
+# Comparing every pair of items is quadratic, which is too slow once earlier programs are included, so each title and precis is
+# summarized by a MinHash signature and the signatures are split into bands (locality-sensitive hashing): only items which agree on all
+# of some band are compared, and those are then compared exactly (the Jaccard similarity of their shingles).
+#   Titles are compared as sets of character 3-grams (they're too short for word shingles)
+#   Precis are compared as sets of 3-word shingles
+# Routine items (see DiagRules' "Diag: routine items") and the second halves of split items are skipped, since they're expected to repeat.
+# The results go to "Diag - Near-duplicate items.txt".
+#
+# These Control tab settings (setting name in column A, value in column B) adjust it:
+#   Duplicates: similarity          0.7     How similar (0 to 1) two titles or precis must be to be reported
+#   Duplicates: archive                     A ProgramDatabase file holding earlier programs to compare with
+#   Duplicates: this convention             The name this program is stored under in the archive (so it isn't compared with itself)
+
+_defaultSettings: dict[str, str]={
+    "Duplicates: similarity": "0.7",
+    "Duplicates: archive": "",
+    "Duplicates: this convention": "",
+}
+
+Permutations=128
+ChunkCells=4_000_000        # The most (permutation, shingle) hashes to compute at once
+_prime=(1 << 31)-1
+_maxBucket=200              # Buckets bigger than this are mostly noise; only their first members are paired
+
+
+# Shingle a title as character 3-grams of its words
+def TitleShingles(text: str) -> set[str]:
+    text=" "+" ".join(re.findall(r"[a-z0-9]+", text.lower()))+" "
+    return {text[i:i+3] for i in range(len(text)-2)} if len(text.strip()) > 0 else set()
+
+
+# Shingle a precis as runs of three words (or just the words, if there are fewer than three)
+def PrecisShingles(text: str) -> set[str]:
+    words=re.findall(r"[a-z0-9']+", text.lower())
+    if len(words) < 3:
+        return set(words)
+    return {" ".join(words[i:i+3]) for i in range(len(words)-2)}
+
+
+def Jaccard(a: set, b: set) -> float:
+    if len(a) == 0 or len(b) == 0:
+        return 0.0
+    return len(a & b)/len(a | b)
+
+
+class MinHashIndex:
+    def __init__(self, documents: list[set[str]], permutations: int=Permutations, seed: int=1):
+        self.Documents: list[set[str]]=documents
+        rng=np.random.default_rng(seed)
+        a=rng.integers(1, _prime, size=permutations, dtype=np.uint64)[:, np.newaxis]
+        b=rng.integers(0, _prime, size=permutations, dtype=np.uint64)[:, np.newaxis]
+
+        # The documents with shingles, and their shingles' hashes laid end to end
+        self.Rows: np.ndarray=np.array([i for i, doc in enumerate(documents) if len(doc) > 0], dtype=np.int64)
+        sizes=np.array([len(documents[i]) for i in self.Rows], dtype=np.int64)
+        hashes=np.fromiter((zlib.crc32(s.encode("utf-8")) for i in self.Rows for s in documents[i]), dtype=np.uint64, count=int(sizes.sum()))
+        ends=np.cumsum(sizes)
+        starts=ends-sizes
+
+        # Each signature entry is the least of the document's shingles' hashes under one permutation (a*x+b mod p).  Done a range of
+        # documents at a time, so that the permutations x shingles array stays small.
+        self.Signatures: np.ndarray=np.zeros((len(self.Rows), permutations), dtype=np.uint32)
+        lo=0
+        while lo < len(self.Rows):
+            hi=int(np.searchsorted(ends, starts[lo]+max(1, ChunkCells//permutations), side="right"))
+            hi=max(hi, lo+1)
+            values=(a*hashes[np.newaxis, starts[lo]:ends[hi-1]]+b) % _prime
+            self.Signatures[lo:hi]=np.minimum.reduceat(values, starts[lo:hi]-starts[lo], axis=1).T
+            lo=hi
+
+
+    # The pairs of documents (as indexes into documents) which agree on every row of at least one band
+    def CandidatePairs(self, bands: int, rows: int) -> set[tuple[int, int]]:
+        pairs: set[tuple[int, int]]=set()
+        for band in range(bands):
+            _, bucket=np.unique(self.Signatures[:, band*rows:(band+1)*rows], axis=0, return_inverse=True)
+            bucket=bucket.ravel()
+            order=np.argsort(bucket, kind="stable")
+            sizes=np.bincount(bucket)
+            groupStarts=np.concatenate([[0], np.cumsum(sizes)[:-1]])
+            for g in np.flatnonzero(sizes > 1):
+                members=self.Rows[order[groupStarts[g]:groupStarts[g]+min(sizes[g], _maxBucket)]]
+                i, j=np.triu_indices(len(members), 1)
+                pairs.update(zip(members[i].tolist(), members[j].tolist()))
+        return pairs
+
+
+# The banding of the signatures for a similarity threshold, as (bands, rows per band).  A pair of similarity s is a candidate with
+# probability 1-(1-s**rows)**bands; this picks the most rows per band (the fewest candidates to check) which still finds a pair at the
+# threshold 99% of the time.
+def Banding(similarity: float, permutations: int=Permutations) -> tuple[int, int]:
+    best=(permutations, 1)
+    for rows in range(1, permutations+1):
+        bands=permutations//rows
+        if 1-(1-similarity**rows)**bands < 0.99:
+            break
+        best=(bands, rows)
+    return best
+
+
+# A title and precis to compare, from this program or an archived one
+class DuplicateCandidate:
+    def __init__(self, title: str, precis: str, where: str):
+        self.Title: str=title
+        self.Precis: str=precis
+        self.Where: str=where        # How to show it in the report
+
+
+def ArchivedCandidates(fname: str, thisConvention: str, settings: DiagSettings) -> list[DuplicateCandidate]:
+    from ProgramDatabase import ProgramDatabase
+
+    if not os.path.exists(fname):
+        LogError(f"ControlTab:Duplicates: archive='{fname}' does not exist")
+        return []
+    with ProgramDatabase(fname) as db:
+        rows=db.Query("select convention, item, display_name, precis, time_text from items where convention != ? and is_continuation = 0", (thisConvention,))
+    return [DuplicateCandidate(row["display_name"], ScrubPrecis(row["precis"]), f"{row['convention']}: {row['time_text']} {row['item']}")
+            for row in rows if not any(word in row["item"] for word in settings.RoutineItems) and "{#2}" not in row["item"]]
+
+
+# The near-duplicate pairs among the candidates, as (first, second, title similarity, precis similarity), most similar first.
+# If firstArchived is given, the candidates from there on are archived and pairs of two archived items aren't wanted.
+def FindNearDuplicates(candidates: list[DuplicateCandidate], similarity: float, firstArchived: int|None=None) -> list[tuple[int, int, float, float]]:
+    titles=[TitleShingles(c.Title) for c in candidates]
+    precis=[PrecisShingles(c.Precis) for c in candidates]
+    bands, rows=Banding(similarity)
+    pairs=MinHashIndex(titles).CandidatePairs(bands, rows) | MinHashIndex(precis).CandidatePairs(bands, rows)
+    if firstArchived is not None:
+        pairs={(i, j) for i, j in pairs if i < firstArchived}
+
+    found=[]
+    for i, j in pairs:
+        titleSimilarity=Jaccard(titles[i], titles[j])
+        precisSimilarity=Jaccard(precis[i], precis[j])
+        if titleSimilarity >= similarity or precisSimilarity >= similarity:
+            found.append((i, j, titleSimilarity, precisSimilarity))
+    found.sort(key=lambda x: (-max(x[2], x[3]), x[0], x[1]))
+    Log(f"Near duplicates: {len(candidates)} items, {len(pairs)} candidate pairs, {len(found)} near-duplicates")
+    return found
+
+
+#*************************************************************************************************
+def WriteNearDuplicateItems(model: ProgramModel, reportsdir: str, timestamp: str) -> None:
+    settings=DiagSettings(model)
+    similarity=ControlNumber(model.Control, "Duplicates: similarity", _defaultSettings["Duplicates: similarity"])
+    archive=ControlSetting(model.Control, "Duplicates: archive", _defaultSettings["Duplicates: archive"])
+    candidates=[DuplicateCandidate(item.DisplayName, ScrubPrecis(item.Precis or ""), f"{item.Time} {item.Name}") for item in model.Items.values()
+                if item.DisplayName != "" and not settings.IsRoutine(item) and not item.IsContinuation and "{#2}" not in item.Name]
+    firstArchived=len(candidates)
+    if archive != "":
+        thisConvention=ControlSetting(model.Control, "Duplicates: this convention", _defaultSettings["Duplicates: this convention"])
+        candidates.extend(ArchivedCandidates(archive, thisConvention, settings))
+    found=FindNearDuplicates(candidates, similarity, firstArchived)
+
+    fname=os.path.join(reportsdir, "Diag - Near-duplicate items.txt")
+    SafeDelete(fname)
+    with open(fname, "w") as f:
+        print(f"Items whose titles or precis are at least {similarity:g} similar to another's (1 is identical)", file=f)
+        print(timestamp, file=f)
+        for heading, wanted in [("In this program:", lambda j: j < firstArchived), ("Like items in earlier programs:", lambda j: j >= firstArchived)]:
+            lines=[f"   {candidates[i].Where}  &  {candidates[j].Where}  (title {titleSimilarity:.2f}, precis {precisSimilarity:.2f})"
+                   for i, j, titleSimilarity, precisSimilarity in found if wanted(j)]
+            if heading.startswith("Like") and len(candidates) == firstArchived:
+                continue
+            print(heading, file=f)
+            for line in lines:
+                print(line, file=f)
+            if len(lines) == 0:
+                print("    None found", file=f)
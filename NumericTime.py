@@ -1,3 +1,5 @@
+from __future__ import annotations
+
 from typing import Tuple, Any
 
 import re
@@ -5,11 +7,10 @@ import math
 
 from HelpersPackage import IsInt, Int0
 from Log import LogError, Log
+from ConventionCalendar import ConventionCalendar, DefaultCalendar
 
 class NumericTime:
-    gDayList: list[str]=[]      # List of the day names starting with Day One of the convention schedule.  This must be initialized by a call to
     epsilon=0.001
-    startDay=0
 
     # This takes and of the following:
     #   "Saturday", 13.5
@@ -17,7 +18,9 @@ class NumericTime:
     #   2, 13.5
     #   "Saturday 13.5"
     #   "Saturday 1:30 pm"
-    def __init__(self, day: Any=-1, time: float=-1):
+    # Day names are those of the convention's calendar (if none is given, a Friday-Sunday convention is assumed)
+    def __init__(self, day: Any=-1, time: float=-1, calendar: ConventionCalendar|None=None):
+        self._calendar: ConventionCalendar=calendar if calendar is not None else DefaultCalendar
         if day == -1 and time == -1:
             Log("Empty NumericTime class initialized")
             self._day=0
@@ -62,7 +65,7 @@ class NumericTime:
         if isinstance(other, NumericTime):
             return abs(self._day-other._day) < self.epsilon and abs(self._time-other._time) < self.epsilon
         if isinstance(other, float) or isinstance(other, int):
-            return self.__eq__(NumericTime(other))
+            return self.__eq__(NumericTime(other, calendar=self._calendar))
         return NotImplemented
 
     def __lt__(self, other) -> bool:
@@ -78,30 +81,35 @@ class NumericTime:
     # We only add intervals to a NumericTime --it maes no sense to add Friday, 2pm to Saturday 10am!
     def __add__(self, other):
         if isinstance(other, float) or  isinstance(other, int):
-            return NumericTime(self.Numeric+other)
+            return NumericTime(self.Numeric+other, calendar=self._calendar)
         return NotImplemented
 
     # If it gets a number, it subtracts that many hours fromt eh NumericTime,  If it gets anothrer NumericTime, it yields the interval between them
     def __sub__(self, other):
         if isinstance(other, float) or  isinstance(other, int):
-            return NumericTime(self.Numeric-other)
+            return NumericTime(self.Numeric-other, calendar=self._calendar)
         if isinstance(other, NumericTime):
             return self.Numeric-other.Numeric
         return NotImplemented
 
     def __str__(self):
-        return f"{self.gDayList[self.Day]} {self.NumericToTextTime()}"
+        return f"{self._calendar.DayList[self.Day]} {self.NumericToTextTime()}"
 
     def __repr__(self):
         return str(self)
 
+    # Rebuild a NumericTime from its stored day number and (possibly fractional) hour without going through any parsing
     @classmethod
-    def SetStartingDay(cls, day: str):
-        daylist=["Sunday", "Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday", "Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"]
-        if day not in daylist:
-            return False
-        cls.gDayList=daylist[daylist.index(day):]
-        return True
+    def FromDayHour(cls, day: int, hour: float, calendar: ConventionCalendar|None=None) -> NumericTime:
+        nt=cls.__new__(cls)
+        nt._calendar=calendar if calendar is not None else DefaultCalendar
+        nt._day=day
+        nt._time=hour
+        return nt
+
+    @property
+    def Calendar(self) -> ConventionCalendar:
+        return self._calendar
 
     @property
     def Numeric(self) -> float:
@@ -113,11 +121,9 @@ class NumericTime:
 
 
     def StrToDayNumber(self, dstr: str) -> int:
-        dstr=dstr.lower()
-        daylist=[x.lower() for x in self.gDayList]
-        for i, day in enumerate(daylist):
-            if day.startswith(dstr):
-                return i
+        day=self._calendar.DayNumber(dstr)
+        if day is not None:
+            return day
         LogError(f"StrToDayNumber(): Can't interpret '{dstr}' as the name of a day")
         assert False
 
@@ -239,7 +245,7 @@ class NumericTime:
     # Return the name of the day corresponding to a numeric time
     @property
     def DayString(self) -> str:
-        return self.gDayList[int(self.Day)]
+        return self._calendar.DayList[int(self.Day)]
 
     # We sort days based on one day ending and the next beginning at 4am -- this puts late-night items with the previous day
     # Note that the return value is used for sorting, but not for dae display
@@ -247,4 +253,4 @@ class NumericTime:
     def NominalDayString(self) -> str:
         if self.Numeric > 4:
             return (self-4).DayString
-        return self.gDayList[0]     # This is wrong, but what can we do?
\ No newline at end of file
+        return self._calendar.DayList[0]     # This is wrong, but what can we do?
\ No newline at end of file
@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import os
+import re
+import math
+from collections import Counter
+
+import numpy as np
+
+from ProgramModel import ProgramModel
+from Availability import AvailabilityMatrix, UnderstaffedItems, ChunkCells
+from ReportHelpers import SafeDelete, ScrubPrecis, ControlSetting, ControlNumber
+from Log import Log
+
+# Suggest panelists for the items which have too few people on them.
+#
+# Each item is described by its title and (scrubbed) precis, and each person by the titles and precis of the items they're already on
+# plus their interest columns in the People tab.  All of these are turned into TF-IDF vectors, and a person's fit for an item is the
+# cosine similarity of the two.  The suggestions for an item are the best-fitting people who are available for it (they said yes, aren't
+# on anything at the time and aren't avoiding it -- see Availability), who aren't already on their maximum number of items, and whose fit
+# is weighted down a little for each item they already have, so that the work is spread around.
+#
+# The vectors are kept sparse.  The people's vectors are stored by term (like a CSC matrix), so the similarities of a whole batch of
+# items to everyone are found with a handful of array operations.
+#
+# These Control tab settings (setting name in column A, value in column B) adjust it:
+#   Recommend: interest columns     interests, topics, expertise    People tab columns describing the person's interests
+#   Recommend: suggestions          5                               The most people suggested for an item
+#   Recommend: maximum items        8                               People already on this many items aren't suggested
+#   Recommend: load weight          0.5                             How much a full load of items reduces a person's fit (0 to 1)
+
+_defaultSettings: dict[str, str]={
+    "Recommend: interest columns": "interests, topics, expertise",
+    "Recommend: suggestions": "5",
+    "Recommend: maximum items": "8",
+    "Recommend: load weight": "0.5",
+}
+
+_stopWords: set[str]=set("""about after again also among and any are aren't around because been before being between both but can can't could did
+    does doing don't down during each few for from further had has have having her here hers herself him himself his how into its itself just
+    let's more most much must not now off once only other our ours out over own same she should some such than that the their theirs them then
+    there these they this those through too under until very was were what when where which while who whom why will with would you your yours
+    panel discussion talk session item program""".split())
+
+
+# Split text into the words used as terms: lower case, at least three letters, and not too common to mean anything
+def Terms(text: str) -> list[str]:
+    return [word for word in re.findall(r"[a-z][a-z0-9']+", text.lower()) if len(word) >= 3 and word not in _stopWords]
+
+
+# The TF-IDF vectors of a set of documents, each as parallel arrays of term numbers and weights (L2-normalized)
+class TfidfIndex:
+    def __init__(self, documents: list[list[str]]):
+        self.Vocabulary: dict[str, int]={}
+        counts: list[Counter]=[Counter(doc) for doc in documents]
+        df: Counter=Counter()
+        for c in counts:
+            df.update(c.keys())
+        for term in sorted(df):
+            self.Vocabulary[term]=len(self.Vocabulary)
+        n=len(documents)
+        self.Idf: np.ndarray=np.array([math.log((1+n)/(1+df[term]))+1 for term in sorted(df)], dtype=np.float64)
+        self.Vectors: list[tuple[np.ndarray, np.ndarray]]=[self.Vector(c) for c in counts]
+
+    # The vector of one document (given as its term counts).  Terms not in the vocabulary are ignored.
+    def Vector(self, counts: Counter) -> tuple[np.ndarray, np.ndarray]:
+        terms=np.array([self.Vocabulary[t] for t in counts if t in self.Vocabulary], dtype=np.int64)
+        weights=np.array([1+math.log(counts[t]) for t in counts if t in self.Vocabulary], dtype=np.float64)
+        if len(terms) == 0:
+            return terms, weights
+        weights*=self.Idf[terms]
+        return terms, weights/np.linalg.norm(weights)
+
+
+# Vectors stored by term, so the similarity of one vector to all of them can be accumulated term by term
+class TermMajorMatrix:
+    def __init__(self, vectors: list[tuple[np.ndarray, np.ndarray]], termCount: int):
+        self.RowCount: int=len(vectors)
+        rows=np.concatenate([np.full(len(terms), i, dtype=np.int64) for i, (terms, _) in enumerate(vectors)]) if len(vectors) > 0 else np.zeros(0, dtype=np.int64)
+        terms=np.concatenate([terms for terms, _ in vectors]) if len(vectors) > 0 else np.zeros(0, dtype=np.int64)
+        weights=np.concatenate([weights for _, weights in vectors]) if len(vectors) > 0 else np.zeros(0)
+        order=np.argsort(terms, kind="stable")
+        self.Rows: np.ndarray=rows[order]
+        self.Weights: np.ndarray=weights[order]
+        self.TermStart: np.ndarray=np.zeros(termCount+1, dtype=np.int64)     # The entries for term t are TermStart[t]:TermStart[t+1]
+        np.cumsum(np.bincount(terms, minlength=termCount), out=self.TermStart[1:])
+
+    # The number of (entry, row entry) pairs finding a vector's similarities involves: the work (and temporary space) it takes
+    def Pairs(self, vector: tuple[np.ndarray, np.ndarray]) -> int:
+        terms=vector[0]
+        return int((self.TermStart[terms+1]-self.TermStart[terms]).sum())
+
+    # The similarities (dot products) of a batch of vectors with every row: a len(vectors) x RowCount matrix
+    def Similarities(self, vectors: list[tuple[np.ndarray, np.ndarray]]) -> np.ndarray:
+        if len(vectors) == 0 or self.RowCount == 0 or sum(len(terms) for terms, _ in vectors) == 0:
+            return np.zeros((len(vectors), self.RowCount))
+        batch=np.concatenate([np.full(len(terms), i, dtype=np.int64) for i, (terms, _) in enumerate(vectors)])
+        terms=np.concatenate([terms for terms, _ in vectors])
+        weights=np.concatenate([weights for _, weights in vectors])
+
+        # Pair each of the batch's (vector, term, weight) entries with every row entry for that term
+        starts=self.TermStart[terms]
+        lengths=self.TermStart[terms+1]-starts
+        total=int(lengths.sum())
+        entry=np.repeat(starts-np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths)+np.arange(total)
+        scores=np.bincount(np.repeat(batch, lengths)*self.RowCount+self.Rows[entry], weights=np.repeat(weights, lengths)*self.Weights[entry],
+                           minlength=len(vectors)*self.RowCount)
+        return scores.reshape(len(vectors), self.RowCount)
+
+
+class RecommenderSettings:
+    def __init__(self, model: ProgramModel):
+        control=model.Control
+        columns=ControlSetting(control, "Recommend: interest columns", _defaultSettings["Recommend: interest columns"])
+        self.InterestColumns: list[str]=[x.strip() for x in columns.split(",") if x.strip() != ""]
+        self.Suggestions: int=ControlNumber(control, "Recommend: suggestions", _defaultSettings["Recommend: suggestions"], int)
+        self.MaximumItems: int=ControlNumber(control, "Recommend: maximum items", _defaultSettings["Recommend: maximum items"], int)
+        self.LoadWeight: float=min(1.0, max(0.0, ControlNumber(control, "Recommend: load weight", _defaultSettings["Recommend: load weight"])))
+
+
+class PanelistRecommender:
+    def __init__(self, model: ProgramModel, availability: AvailabilityMatrix|None=None):
+        self.Model: ProgramModel=model
+        self.Settings: RecommenderSettings=RecommenderSettings(model)
+        self.Availability: AvailabilityMatrix=availability if availability is not None else AvailabilityMatrix(model)
+        people=self.Availability.People
+
+        # Each person's item count, counted as in "Peoples' item counts"
+        self.ItemCounts: np.ndarray=np.array([sum(not x.IsDummy for x in model.Schedules.get(name, [])) for name in people], dtype=np.int64)
+
+        # The documents: every item, then every person
+        self._itemNames: list[str]=list(model.Items)
+        self._itemRow: dict[str, int]={name: i for i, name in enumerate(self._itemNames)}
+        itemTerms=[self._ItemTerms(model.Items[name]) for name in self._itemNames]
+        personTerms=[]
+        for name in people:
+            terms=[term for itemName in dict.fromkeys(x.ItemName for x in model.Schedules.get(name, []) if not x.IsDummy and x.ItemName in self._itemRow)
+                   for term in itemTerms[self._itemRow[itemName]]]
+            parms=model.Persons[name].Parms
+            for col in self.Settings.InterestColumns:
+                terms.extend(Terms(str(parms[col, ""])))
+            personTerms.append(terms)
+
+        self.Index: TfidfIndex=TfidfIndex(itemTerms+personTerms)
+        self._itemVectors=self.Index.Vectors[:len(itemTerms)]
+        self._people: TermMajorMatrix=TermMajorMatrix(self.Index.Vectors[len(itemTerms):], len(self.Index.Vocabulary))
+        Log(f"Panelist recommender: {len(self._itemNames)} items, {len(people)} people, {len(self.Index.Vocabulary)} terms")
+
+
+    @staticmethod
+    def _ItemTerms(item) -> list[str]:
+        return Terms(item.DisplayName+" "+ScrubPrecis(item.Precis or ""))
+
+
+    # The suggestions for each of the items, best first, as (person, similarity) lists keyed by item name
+    def Recommend(self, names: list[str]) -> dict[str, list[tuple[str, float]]]:
+        people=self.Availability.People
+        settings=self.Settings
+        suggestions: dict[str, list[tuple[str, float]]]={}
+        if len(people) == 0:
+            return {name: [] for name in names}
+
+        # Lightly-loaded people get their full fit; a full load reduces it by the load weight.  People at their maximum are out.
+        load=1.0-settings.LoadWeight*np.minimum(self.ItemCounts/max(1, settings.MaximumItems), 1.0)
+        eligible=self.ItemCounts < settings.MaximumItems
+
+        for batch in self._Batches(names):
+            similarity=self._people.Similarities([self._itemVectors[self._itemRow[name]] for name in batch])      # items x people
+            score=np.where(self.Availability.FreeMatrix(batch) & eligible & (similarity > 0), similarity*load, -1.0)
+            count=min(settings.Suggestions, len(people))
+            best=np.argpartition(-score, count-1, axis=1)[:, :count] if count < len(people) else np.tile(np.arange(len(people)), (len(batch), 1))
+            for j, name in enumerate(batch):
+                ranked=sorted(best[j], key=lambda i: (-score[j, i], people[i]))
+                suggestions[name]=[(people[i], float(similarity[j, i])) for i in ranked if score[j, i] > 0]
+        return suggestions
+
+
+    # Split the items into batches small enough that neither the items x people matrices nor the term pairs get too big
+    def _Batches(self, names: list[str]) -> list[list[str]]:
+        maxItems=max(1, ChunkCells//max(1, len(self.Availability.People)))
+        batches: list[list[str]]=[[]]
+        pairs=0
+        for name in names:
+            p=self._people.Pairs(self._itemVectors[self._itemRow[name]])
+            if len(batches[-1]) > 0 and (len(batches[-1]) >= maxItems or pairs+p > ChunkCells):
+                batches.append([])
+                pairs=0
+            batches[-1].append(name)
+            pairs+=p
+        return [batch for batch in batches if len(batch) > 0]
+
+
+#*************************************************************************************************
+def WritePanelistSuggestions(model: ProgramModel, reportsdir: str, timestamp: str) -> None:
+    recommender=PanelistRecommender(model)
+    names=UnderstaffedItems(model)
+    suggestions=recommender.Recommend(names)
+    itemCounts=dict(zip(recommender.Availability.People, recommender.ItemCounts.tolist()))
+
+    fname=os.path.join(reportsdir, "Suggested panelists.txt")
+    SafeDelete(fname)
+    with open(fname, "w") as f:
+        print("Suggested panelists for the items with too few people on them", file=f)
+        print("(People who are free then, best match to the item's title and precis first.  Shown with the match (0-1) and the number of items they're already on.)\n", file=f)
+        print(timestamp, file=f)
+        for name in names:
+            item=model.Items[name]
+            print(f"{item.Time}  {item.Room}  {item.Name}: {len(item.People)}", file=f)
+            if len(suggestions[name]) == 0:
+                print("    No one free then has a matching background", file=f)
+                continue
+            for person, similarity in suggestions[name]:
+                print(f"    {person} ({similarity:.2f}, {itemCounts[person]} item{'s' if itemCounts[person] != 1 else ''})", file=f)
+        if len(names) == 0:
+            print("None found", file=f)
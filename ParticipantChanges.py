@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import os
+import json
+import hashlib
+
+from ProgramModel import ProgramModel
+from TextReports import ParticipantScheduleXML
+from ReportHelpers import SafeDelete, SortedParticipantList
+from Log import Log, LogError
+
+# Which participants' schedules have changed since they were last sent their schedules?
+#
+# Each participant's schedule is saved -- one record per item of its time, room, name, whether they moderate it and who else is on it --
+# along with a hash of their entry in "Program participant schedules.xml".  Each run compares each participant's hash to the one saved
+# when the schedules were last sent (a dictionary lookup apiece), and for those which differ compares the records to say what changed.
+# It writes
+#   Changed participant schedules.txt                   Who is new, who is gone and what changed in each changed schedule
+#   Program participant schedules - changed.xml         The "Program participant schedules.xml" entries of just the new and changed people
+# so that only the people whose schedules changed need to be sent them again.
+#
+# Regenerating the reports (including every regeneration in watch mode) doesn't move the baseline: the changes pile up until they're
+# sent.  Each run saves the schedules its reports describe in "Participant schedules pending.json", and once they have been sent
+#   ProgramAnalyzer.py sent
+# makes those the new baseline, "Participant schedules sent.json".
+# (Until the schedules have first been marked as sent there's nothing to compare to, and everyone counts as new.)
+
+_sentName="Participant schedules sent.json"
+_pendingName="Participant schedules pending.json"
+
+
+# One person's schedule as records of [time, room, item, moderator?, [the other people on it]]
+def ScheduleRecords(model: ProgramModel, personname: str) -> list[list]:
+    records=[]
+    for element in model.Schedules[personname]:
+        if element.IsDummy or len(element.DisplayName) == 0:
+            continue
+        item=model.Items.get(element.ItemName)
+        others=[p for p in item.People if p != personname] if item is not None else []
+        records.append([str(element.Time), element.Room, element.ItemName, element.IsMod, others])
+    return records
+
+
+# What changed between two versions of a person's schedule, as lines of text
+def DescribeChanges(old: list[list], new: list[list]) -> list[str]:
+    lines=[]
+    oldByItem={rec[2]: rec for rec in old}
+    newByItem={rec[2]: rec for rec in new}
+    for name, rec in newByItem.items():
+        if name not in oldByItem:
+            lines.append(f"+ {rec[0]}: {name} [{rec[1]}]{' (moderator)' if rec[3] else ''}")
+    for name, rec in oldByItem.items():
+        if name not in newByItem:
+            lines.append(f"- {rec[0]}: {name} [{rec[1]}]")
+    for name, rec in newByItem.items():
+        if name not in oldByItem or oldByItem[name] == rec:
+            continue
+        was=oldByItem[name]
+        changes=[]
+        if was[0] != rec[0] or was[1] != rec[1]:
+            changes.append(f"moved from {was[0]} [{was[1]}] to {rec[0]} [{rec[1]}]")
+        if was[3] != rec[3]:
+            changes.append("now moderating" if rec[3] else "no longer moderating")
+        added=[p for p in rec[4] if p not in was[4]]
+        removed=[p for p in was[4] if p not in rec[4]]
+        if len(added) > 0:
+            changes.append("joined by "+", ".join(added))
+        if len(removed) > 0:
+            changes.append("no longer with "+", ".join(removed))
+        lines.append(f"~ {name}: "+("; ".join(changes) if len(changes) > 0 else "details changed"))
+    if len(lines) == 0:
+        lines.append("~ Other details (email, equipment or precis) changed")
+    return lines
+
+
+# Each participant's state (their XML entry's hash and their schedule's records), and their XML entries
+def ParticipantStates(model: ProgramModel) -> tuple[dict[str, dict], dict[str, str]]:
+    state: dict[str, dict]={}
+    blocks: dict[str, str]={}
+    for personname in SortedParticipantList(model.Schedules):
+        blocks[personname]=ParticipantScheduleXML(model, personname)
+        state[personname]={"Hash": hashlib.sha1(blocks[personname].encode("utf-8")).hexdigest(), "Items": ScheduleRecords(model, personname)}
+    return state, blocks
+
+
+# Read a saved state file, returning {"Generated": timestamp, "People": {name: state}} (None if there is none or it can't be read)
+def _ReadState(fname: str) -> dict|None:
+    if not os.path.exists(fname):
+        return None
+    try:
+        with open(fname, encoding="utf-8") as f:
+            saved=json.load(f)
+    except (OSError, ValueError) as e:
+        LogError(f"ParticipantChanges: can't read '{fname}' ({e})")
+        return None
+    if not isinstance(saved, dict) or not isinstance(saved.get("People"), dict) or not isinstance(saved.get("Generated"), str):
+        LogError(f"ParticipantChanges: '{fname}' is not a saved participant schedules state")
+        return None
+    return saved
+
+
+def _WriteState(fname: str, timestamp: str, state: dict[str, dict]) -> None:
+    with open(fname, "w", encoding="utf-8") as f:
+        json.dump({"Generated": timestamp, "People": state}, f, ensure_ascii=False)
+
+
+#*************************************************************************************************
+def WriteChangedParticipantSchedules(model: ProgramModel, reportsdir: str, timestamp: str) -> None:
+    sent=_ReadState(os.path.join(reportsdir, _sentName))
+    state, blocks=ParticipantStates(model)
+
+    old=sent["People"] if sent is not None else {}
+    added=[name for name in state if name not in old]
+    changed=[name for name in state if name in old and old[name]["Hash"] != state[name]["Hash"]]
+    removed=[name for name in old if name not in state]
+
+    fname=os.path.join(reportsdir, "Changed participant schedules.txt")
+    SafeDelete(fname)
+    with open(fname, "w") as f:
+        print("Participants whose schedules have changed since they were last sent\n", file=f)
+        print(timestamp, file=f)
+        if sent is None:
+            print("The schedules have not been marked as sent (ProgramAnalyzer.py sent), so everyone is new", file=f)
+        else:
+            print(f"Compared with the schedules marked as sent ({sent['Generated'].strip()})", file=f)
+        print(f"{len(added)} new, {len(changed)} changed, {len(removed)} no longer on the program, {len(state)-len(added)-len(changed)} unchanged\n", file=f)
+        for name in added:
+            print(f"{name} (new)", file=f)
+        for name in changed:
+            print(name, file=f)
+            for line in DescribeChanges(old[name]["Items"], state[name]["Items"]):
+                print("    "+line, file=f)
+        for name in removed:
+            print(f"{name} (no longer on the program)", file=f)
+
+    fname=os.path.join(reportsdir, "Program participant schedules - changed.xml")
+    SafeDelete(fname)
+    changedSet=set(added) | set(changed)
+    with open(fname, "w") as xml:
+        for personname in state:
+            if personname in changedSet:
+                xml.write(blocks[personname])
+
+    # What these reports describe, ready to become the baseline once it has been sent
+    _WriteState(os.path.join(reportsdir, _pendingName), timestamp, state)
+    Log(f"Changed participant schedules: {len(added)} new, {len(changed)} changed, {len(removed)} removed")
+
+
+# Record that the participants have been sent the schedules of the last run, so that later runs report only what changes after this.
+# (If there has been no run, it's the schedules as they are now.)  The changed schedules reports are then rewritten against the new baseline.
+def MarkParticipantSchedulesSent(model: ProgramModel, reportsdir: str, timestamp: str) -> None:
+    pendingName=os.path.join(reportsdir, _pendingName)
+    pending=_ReadState(pendingName)
+    if pending is None:
+        state, _=ParticipantStates(model)
+        pending={"Generated": timestamp, "People": state}
+    _WriteState(os.path.join(reportsdir, _sentName), pending["Generated"], pending["People"])
+    Log(f"Participant schedules marked as sent: {len(pending['People'])} people, as of the run {pending['Generated'].strip()}")
+    WriteChangedParticipantSchedules(model, reportsdir, timestamp)
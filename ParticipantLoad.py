@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import os
+import csv
+
+import numpy as np
+
+from ProgramModel import ProgramModel
+from ReportHelpers import SafeDelete, ControlNumber
+from Log import Log, LogError
+
+# Who has too much to do?  The conflict report only finds items which overlap; this finds the schedules which are merely punishing:
+#   Items in a row      the longest run of items each starting (nearly) as soon as the one before ends (items which overlap are conflicts,
+#                       which Diag reports, and break a run)
+#   Hours per day       the most hours of items on any one (nominal) day
+#   Minimum break       the shortest time between the end of one item and the start of the next on the same day
+#   Tight transfers     back-to-back items in rooms further apart than the break between them allows
+# Participants exceeding any limit are listed, worst first, in "Overloaded participants.txt"; everyone's figures are in "Participant load.csv".
+#
+# Every schedule is handled in a single sweep: all the schedule elements are put in flat arrays, sorted by person and then time, and each
+# element compared with the next.
+#
+# These Control tab settings (setting name in column A, value in column B) adjust it:
+#   Load: maximum in a row          3       More items in a row than this is too many
+#   Load: maximum hours per day     4       More hours of items on a day than this is too many
+#   Load: back-to-back minutes      15      Items separated by less than this are back-to-back
+#   Load: walk minutes              0       The walking time between rooms which aren't listed below
+#   Walk: <room> / <room>           5       The walking time between two rooms (either way), e.g., "Walk: Ballroom / Salon C" = 10
+
+_defaultSettings: dict[str, str]={
+    "Load: maximum in a row": "3",
+    "Load: maximum hours per day": "4",
+    "Load: back-to-back minutes": "15",
+    "Load: walk minutes": "0",
+}
+
+_epsilon=0.001
+
+
+class LoadSettings:
+    def __init__(self, model: ProgramModel):
+        control=model.Control
+        self.MaximumInARow: int=ControlNumber(control, "Load: maximum in a row", _defaultSettings["Load: maximum in a row"], int)
+        self.MaximumHoursPerDay: float=ControlNumber(control, "Load: maximum hours per day", _defaultSettings["Load: maximum hours per day"])
+        self.BackToBackHours: float=ControlNumber(control, "Load: back-to-back minutes", _defaultSettings["Load: back-to-back minutes"])/60
+        self.WalkMinutes: float=ControlNumber(control, "Load: walk minutes", _defaultSettings["Load: walk minutes"])
+
+
+# The room-to-room walking times (in minutes) from the Control tab's "Walk: <room> / <room>" settings
+def WalkingMinutes(model: ProgramModel, rooms: list[str], default: float) -> np.ndarray:
+    index={room.lower(): i for i, room in enumerate(rooms)}
+    walk=np.full((len(rooms), len(rooms)), default, dtype=float)
+    np.fill_diagonal(walk, 0)
+    for key in model.Control.keys():
+        if not key.lower().startswith("walk:"):
+            continue
+        pair=[room.strip().lower() for room in key[5:].split("/")]
+        if len(pair) != 2 or pair[0] not in index or pair[1] not in index:
+            LogError(f"ControlTab:{key}: expected 'Walk: <room> / <room>' naming two rooms in the schedule")
+            continue
+        try:
+            minutes=float(model.Control[key])
+        except ValueError:
+            LogError(f"ControlTab:{key}='{model.Control[key]}' is not a number of minutes")
+            continue
+        walk[index[pair[0]], index[pair[1]]]=minutes
+        walk[index[pair[1]], index[pair[0]]]=minutes
+    return walk
+
+
+class ParticipantLoad:
+    def __init__(self, model: ProgramModel):
+        self.Model: ProgramModel=model
+        self.Settings: LoadSettings=LoadSettings(model)
+        settings=self.Settings
+
+        self.Rooms: list[str]=[room for room in model.RoomNames[1:] if room != ""]
+        elements=[x for schedule in model.Schedules.values() for x in schedule if not x.IsDummy and x.Time is not None and not x.Time.Bogus]
+        for x in elements:
+            if x.Room not in self.Rooms:
+                self.Rooms.append(x.Room)
+        roomIndex={room: i for i, room in enumerate(self.Rooms)}
+        self.People: list[str]=list(dict.fromkeys(x.PersonName for x in elements))
+        personIndex={name: i for i, name in enumerate(self.People)}
+        self.Walk: np.ndarray=WalkingMinutes(model, self.Rooms, settings.WalkMinutes)
+
+        # Every schedule element, sorted by person and then by time
+        person=np.array([personIndex[x.PersonName] for x in elements], dtype=np.int64)
+        start=np.array([x.Time.Numeric for x in elements], dtype=float)
+        order=np.lexsort((start, person))
+        self._elements=[elements[i] for i in order]
+        self.Person: np.ndarray=person[order]
+        self.Start: np.ndarray=start[order]
+        self.End: np.ndarray=self.Start+np.array([x.Length for x in self._elements], dtype=float)
+        self.Room: np.ndarray=np.array([roomIndex[x.Room] for x in self._elements], dtype=np.int64)
+        self.Day: np.ndarray=np.maximum(0, np.searchsorted(model.Calendar.NominalStarts, self.Start+_epsilon, side="right")-1)
+        n=len(self.People)
+
+        # Compare each element with the next one (link k joins elements k and k+1) where both are the same person's on the same day
+        sameDay=(self.Person[1:] == self.Person[:-1]) & (self.Day[1:] == self.Day[:-1])
+        self.Break: np.ndarray=self.Start[1:]-self.End[:-1]                 # In hours; negative for overlapping items
+        backToBack=sameDay & (self.Break >= -_epsilon) & (self.Break < settings.BackToBackHours-_epsilon)      # (Overlaps are conflicts, not runs)
+        self.TightTransfer: np.ndarray=sameDay & (self.Break >= -_epsilon) & (self.Break*60 < self.Walk[self.Room[:-1], self.Room[1:]]-_epsilon)
+
+        # Runs of back-to-back items: each element not linked to the one before starts a new run
+        startsRun=np.ones(len(self.Person), dtype=bool)
+        startsRun[1:]=~backToBack
+        run=np.cumsum(startsRun)-1
+        runLength=np.bincount(run)
+        self.RunStart: np.ndarray=np.flatnonzero(startsRun)                  # The first element of each run
+        self.InARow: np.ndarray=np.zeros(n, dtype=np.int64)
+        np.maximum.at(self.InARow, self.Person[self.RunStart], runLength)
+        self._runLength=runLength
+
+        # Hours per day, and the busiest day
+        days=int(self.Day.max())+1 if len(self.Day) > 0 else 1
+        hours=np.bincount(self.Person*days+self.Day, weights=self.End-self.Start, minlength=n*days).reshape(n, days)
+        self.BusiestDay: np.ndarray=hours.argmax(axis=1) if n > 0 else np.zeros(0, dtype=np.int64)
+        self.HoursPerDay: np.ndarray=hours.max(axis=1) if n > 0 else np.zeros(0)
+
+        # The shortest break between two items on the same day (inf if there are none), and the number of tight transfers
+        self.MinimumBreak: np.ndarray=np.full(n, np.inf)
+        gaps=sameDay & (self.Break >= -_epsilon)
+        np.minimum.at(self.MinimumBreak, self.Person[:-1][gaps], self.Break[gaps])
+        self.TightTransfers: np.ndarray=np.bincount(self.Person[:-1][self.TightTransfer], minlength=n)
+
+        # How far over the limits each person is: the excess items in a row and hours per day, plus the tight transfers
+        self.Score: np.ndarray=(np.maximum(0, self.InARow-settings.MaximumInARow)+np.maximum(0, self.HoursPerDay-settings.MaximumHoursPerDay)
+                                +self.TightTransfers)
+        Log(f"Participant load: {n} people, {len(self._elements)} schedule entries")
+
+
+    # The overloaded people, worst first
+    def Overloaded(self) -> list[int]:
+        over=np.flatnonzero(self.Score > 0)
+        return sorted(over.tolist(), key=lambda i: (-self.Score[i], self.People[i]))
+
+
+    # The elements of a person's longest run of back-to-back items
+    def LongestRun(self, i: int) -> list:
+        runs=np.flatnonzero((self.Person[self.RunStart] == i) & (self._runLength == self.InARow[i]))
+        if len(runs) == 0:
+            return []
+        first=self.RunStart[runs[0]]
+        return self._elements[first:first+self.InARow[i]]
+
+
+    # A person's tight transfers as (from element, to element, break minutes, walking minutes)
+    def Transfers(self, i: int) -> list[tuple]:
+        links=np.flatnonzero(self.TightTransfer & (self.Person[:-1] == i))
+        return [(self._elements[k], self._elements[k+1], self.Break[k]*60, self.Walk[self.Room[k], self.Room[k+1]]) for k in links]
+
+
+#*************************************************************************************************
+def WriteOverloadedParticipants(model: ProgramModel, reportsdir: str, timestamp: str) -> None:
+    load=ParticipantLoad(model)
+    settings=load.Settings
+    calendar=model.Calendar
+
+    fname=os.path.join(reportsdir, "Overloaded participants.txt")
+    SafeDelete(fname)
+    with open(fname, "w") as f:
+        print("Participants with too many items in a row, too many hours in a day or too little time to get between rooms, worst first\n", file=f)
+        print(f"(Limits: {settings.MaximumInARow} items in a row, {settings.MaximumHoursPerDay:g} hours a day; items less than {60*settings.BackToBackHours:g} minutes apart are back-to-back)\n", file=f)
+        print(timestamp, file=f)
+        overloaded=load.Overloaded()
+        for i in overloaded:
+            print(f"{load.People[i]}: {load.InARow[i]} in a row, {load.HoursPerDay[i]:g} hours on {calendar.DayName(int(load.BusiestDay[i]))}"
+                  +(f", minimum break {60*load.MinimumBreak[i]:g} minutes" if np.isfinite(load.MinimumBreak[i]) else ""), file=f)
+            if load.InARow[i] > settings.MaximumInARow:
+                for x in load.LongestRun(i):
+                    print(f"    {x.Time}  {x.Room}: {x.DisplayName}", file=f)
+            for a, b, breakMinutes, walkMinutes in load.Transfers(i):
+                print(f"    {a.Room} --> {b.Room} at {b.Time}: {breakMinutes:g} minutes to make a {walkMinutes:g} minute walk", file=f)
+        if len(overloaded) == 0:
+            print("    None found", file=f)
+
+    fname=os.path.join(reportsdir, "Participant load.csv")
+    with open(fname, mode='w', encoding='UTF8', newline="") as f:
+        writer=csv.writer(f, delimiter=',', quotechar='"')
+        writer.writerow(["Person", "Most in a row", "Most hours in a day", "Busiest day", "Minimum break (minutes)", "Tight transfers", "Overload score"])
+        for i, name in enumerate(load.People):
+            writer.writerow([name, load.InARow[i], f"{load.HoursPerDay[i]:g}", calendar.DayName(int(load.BusiestDay[i])),
+                             f"{60*load.MinimumBreak[i]:g}" if np.isfinite(load.MinimumBreak[i]) else "", load.TightTransfers[i], f"{load.Score[i]:g}"])
@@ -2,6 +2,7 @@ import re as RegEx
 
 from HelpersPackage import ParmDict, YesNoMaybe
 from NumericTime import NumericTime
+from ConventionCalendar import ConventionCalendar, DefaultCalendar
 
 
 # ======================================================
@@ -17,13 +18,14 @@ class Avoidment:
     def Pretty(self) -> str:
         out=""
         avs=[(self.Start, self.End)]    # This will be a list of NumericTime tuples
+        calendar=self.Start.Calendar
         if self.Start.Day != self.End.Day:  # If the avoidance spans more than one day, break it into single-day avoidances
-            avs=[(self.Start, NumericTime(f"{self.Start.Day} 12:59 pm"))]
+            avs=[(self.Start, NumericTime(f"{self.Start.Day} 12:59 pm", calendar=calendar))]
             for day in range(self.Start.Day+1, self.End.Day+1):
                 if day == self.End.Day:
-                    avs.append((NumericTime(f"{day} 12:01 am"), self.End))
+                    avs.append((NumericTime(f"{day} 12:01 am", calendar=calendar), self.End))
                 else:
-                    avs.append((NumericTime(f"{day} 12:01 am"), NumericTime(f"{day} 12:59 pm")))
+                    avs.append((NumericTime(f"{day} 12:01 am", calendar=calendar), NumericTime(f"{day} 12:59 pm", calendar=calendar)))
 
         for tpl in avs:
             ntstart=tpl[0]
@@ -59,16 +61,106 @@ class Avoidment:
 
 
 # ======================================================
+# The People tab, stored by column: one list of values per column, with the column names resolved case-insensitively once.
+# A value of None means the person has no value for that column.
+# The table also carries the convention's calendar, which is needed to interpret the people's Avoid entries.
+class PeopleTable:
+    __slots__=("Columns", "Data", "_index", "Calendar")
+
+    def __init__(self, columnLabels: list[str], rows: list[list], calendar: ConventionCalendar|None=None):
+        self.Calendar: ConventionCalendar=calendar if calendar is not None else DefaultCalendar
+        self.Columns: list[str]=list(columnLabels)
+        self.Data: list[list]=[list(col) for col in zip(*rows)] if len(rows) > 0 else [[] for _ in self.Columns]
+        self._index: dict[str, int]={}
+        for i, label in enumerate(self.Columns):
+            self._index[label.lower()]=i
+
+    @property
+    def RowCount(self) -> int:
+        return len(self.Data[0]) if len(self.Data) > 0 else 0
+
+    # The column's number (-1 if there is no such column)
+    def Index(self, label: str) -> int:
+        return self._index.get(label.lower(), -1)
+
+    # The column's values (None if there is no such column)
+    def Column(self, label: str) -> list|None:
+        i=self.Index(label)
+        return self.Data[i] if i >= 0 else None
+
+    # Replace a column's values, adding the column if it's new
+    def SetColumn(self, label: str, values: list) -> None:
+        i=self.Index(label)
+        if i >= 0:
+            self.Data[i]=values
+            return
+        self.Columns.append(label)
+        self.Data.append(values)
+        self._index[label.lower()]=len(self.Columns)-1
+
+
+# One row of a PeopleTable, looked at as a (read-only) case-insensitive ParmDict
+class PeopleTableRow:
+    __slots__=("_table", "_row")
+
+    def __init__(self, table: PeopleTable, row: int):
+        self._table=table
+        self._row=row
+
+    # Like ParmDict: row["col"] is None if the column is missing, row["col", default] supplies a default
+    def __getitem__(self, key):
+        default=None
+        if isinstance(key, tuple):
+            key, default=key
+        i=self._table.Index(key)
+        if i < 0:
+            return default
+        val=self._table.Data[i][self._row]
+        return default if val is None else val
+
+    def __contains__(self, key: str) -> bool:
+        i=self._table.Index(key)
+        return i >= 0 and self._table.Data[i][self._row] is not None
+
+    def Exists(self, key: str) -> bool:
+        return key in self
+
+    def keys(self) -> list[str]:
+        return [label for label, col in zip(self._table.Columns, self._table.Data) if col[self._row] is not None]
+
+    def items(self) -> list[tuple[str, str]]:
+        return [(label, col[self._row]) for label, col in zip(self._table.Columns, self._table.Data) if col[self._row] is not None]
+
+    def values(self) -> list[str]:
+        return [val for _, val in self.items()]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        return len(self.keys())
+
+
+# ======================================================
+# A person is a light-weight view of one row of the PeopleTable.
+# (People who aren't in the People tab -- and people rebuilt from older data -- may instead carry their own ParmDict.)
 class Person:
-    def __init__(self, Fullname: str="", Parms: ParmDict=None):
-        self.ListScheduleElement=[]
+    __slots__=("Fullname", "_parms", "_table", "_row")
+
+    def __init__(self, Fullname: str="", Parms: ParmDict=None, Table: PeopleTable=None, Row: int=-1):
         self.Fullname=Fullname
+        self._parms: ParmDict|None=Parms
+        self._table: PeopleTable|None=Table
+        self._row: int=Row
 
-        # Parms is a dictionary of *all* columns in the People tab.  If it is not supplied, just create an empty ParmDict()
-        if Parms is None:
-            Parms=ParmDict()
-        self.Parms: ParmDict=Parms
-        pass
+    # All the person's columns in the People tab.  If there is no table row or ParmDict, an empty ParmDict.
+    @property
+    def Parms(self) -> ParmDict|PeopleTableRow:
+        if self._table is not None:
+            return PeopleTableRow(self._table, self._row)
+        if self._parms is None:
+            self._parms=ParmDict()
+        return self._parms
 
     @property
     def RespondedYes(self) -> bool:
@@ -86,19 +178,25 @@ class Person:
     def Avoid(self) -> list[Avoidment]:
         if "avoid" not in self.Parms:
             return []
-        return ParseAvoid(self.Parms["avoid"])
+        return ParseAvoid(self.Parms["avoid"], self._table.Calendar if self._table is not None else None)
 
 
 # Parse the Avoid column for a person into times to be avoided.
-def ParseAvoid(avstring: str) -> list[Avoidment]:
+def ParseAvoid(avstring: str, calendar: ConventionCalendar|None=None) -> list[Avoidment]:
+    if calendar is None:
+        calendar=DefaultCalendar
+    firstDay=calendar.DayName(0)
+    lastDay=calendar.LastDayName
+
     # The contents are a list of comma-separated times or time-ranges.  First create the list of individual items and remove excess spaces.
     avstrl=[x.strip() for x in avstring.split(",")]
 
     # Individual avoid strings can be of the following forms:
     # All are case-insensitive. Times are numeric int or float, 24-hour clock
-    # Arrive: [day] [time]      (If day is missing, Friday is assumed)
-    # [Leave, Depart]: [day] [time]      (If day is missing, Sunday is assumed)
+    # Arrive: [day] [time]      (If day is missing, the convention's first day is assumed)
+    # [Leave, Depart]: [day] [time]      (If day is missing, the convention's last day is assumed)
     # [Day]: float-float | dinner | evening
+    # [Daily, Every, All]: float-float | dinner | evening     (Every day of the convention)
     out: list[Avoidment]=[]   # A list of start-end tuples
     for avs in avstrl:
         avl=[x.strip().lower() for x in avs.split(" ")]
@@ -108,59 +206,44 @@ def ParseAvoid(avstring: str) -> list[Avoidment]:
         match command:
             case "arrive":
                 # [day] time
-                day="fri"       #TODO: This and other day references really ought to depend on the starting and ending days of the convention
+                day=firstDay
                 time=""
                 if len(avl) > 1:
                     day=avl[0]
                     time=avl[1]
                 else:
                     time=avl[0]
-                out.append(Avoidment(NumericTime(day+" 12:01 am"), NumericTime(day+" "+time), avs))
+                out.append(Avoidment(NumericTime(day+" 12:01 am", calendar=calendar), NumericTime(day+" "+time, calendar=calendar), avs))
 
             case "leave" | "depart":
 
                 # [day] time
-                day="sun"
+                day=lastDay
                 time=""
                 if len(avl) > 1:
                     day=avl[0]
                     time=avl[1]
                 else:
                     time=avl[0]
-                out.append(Avoidment(NumericTime(day+" "+time), NumericTime("Sun 11:59pm"), avs))
+                out.append(Avoidment(NumericTime(day+" "+time, calendar=calendar), NumericTime(lastDay+" 11:59pm", calendar=calendar), avs))
 
-            case "fri" | "friday":
-                # [time-time] | "dinner" | "evening" | "all day"
-                ret=ProcessTimeRange(avl, "fri")
-                if ret is None:
-                    continue
-                ret.Description=avs
-                out.append(ret)
-
-            case "sat" | "saturday":
-                # [time-time] | "dinner" | "evening" | "all day"
-                ret=ProcessTimeRange(avl, "sat")
-                if ret is None:
-                    continue
-                ret.Description=avs
-                out.append(ret)
+            case "daily" | "every" | "all":
+                for day in calendar.ConventionDayNames:
+                    # [time-time] | "dinner" | "evening"
+                    ret=ProcessTimeRange(avl, day, calendar)
+                    if ret is None:
+                        continue
+                    ret.Description=avs
+                    out.append(ret)
 
-            case "sun" | "sunday":
+            case _ if calendar.IsDayName(command):
                 # [time-time] | "dinner" | "evening" | "all day"
-                ret=ProcessTimeRange(avl, "sun")
+                ret=ProcessTimeRange(avl, command, calendar)
                 if ret is None:
                     continue
                 ret.Description=avs
                 out.append(ret)
 
-            case "daily" | "every" | "all":
-                for day in ["fri", "sat", "sun"]:   # A bit of a kludge, but we don't know the actual con days this deep in Person
-                    # [time-time] | "dinner" | "evening"
-                    ret=ProcessTimeRange(avl, day)
-                    if ret is None:
-                        continue
-                    ret.Description=avs
-                    out.append(ret)
             case None:
                 raise ValueError(f"ParseAvoid: invalid avoid string '{avs}'")
 
@@ -170,7 +253,7 @@ def ParseAvoid(avstring: str) -> list[Avoidment]:
 
 
 
-def ProcessTimeRange(avl: list[str], day: str="") -> Avoidment | None:
+def ProcessTimeRange(avl: list[str], day: str="", calendar: ConventionCalendar|None=None) -> Avoidment | None:
     range=()
     if avl[0] == "dinner":
         range=(18, 20)
@@ -185,5 +268,5 @@ def ProcessTimeRange(avl: list[str], day: str="") -> Avoidment | None:
             range=(float(m.groups()[0]), float(m.groups()[1]))
     if len(range) == 0:
         return None
-    return Avoidment(NumericTime(f"{day} {range[0]}"), NumericTime(f"{day} {range[1]}"), "")
+    return Avoidment(NumericTime(f"{day} {range[0]}", calendar=calendar), NumericTime(f"{day} {range[1]}", calendar=calendar), "")
 
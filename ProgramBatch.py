@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import os
+import time
+import argparse
+import traceback
+from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from Log import Log, LogError
+
+# Run ProgramAnalyzer for several conventions (or archived years) at once.
+#
+#   ProgramAnalyzer.py batch Boskone/parameters.txt Arisia/parameters.txt Archive/2023/parameters.txt --workers 3
+#
+# Each convention is run just as "ProgramAnalyzer.py --parameters <file>" would run it from the directory holding its parameters file,
+# so its source spreadsheet, templates and reports directory are found relative to that directory.
+#
+# The conventions are spread over one pool of worker processes.  Each worker imports the heavy libraries once and keeps the Word
+# templates it has read (see DocxReports.LoadTemplate), so a worker running several conventions pays those costs only once.
+# Each convention's times carry its own ConventionCalendar, so nothing one convention's Control tab sets up is seen by another.
+
+
+@dataclass(order=False)
+class BatchResult:
+    Parameters: str=""          # The parameters file, as given
+    Succeeded: bool=False
+    ReportsDir: str=""          # The full path of the convention's reports directory
+    Seconds: float=0.0
+    Message: str=""             # Why it failed
+
+
+# Runs in the worker process before its first convention: import what the command needs once, rather than once per convention
+def _InitWorker(command: str) -> None:
+    # (The source's library -- openpyxl or the Google client -- is imported by the first convention which needs it, and then stays loaded)
+    import ProgramAnalyzer
+    if command in ["all", "docx"]:
+        import DocxReports
+
+
+# Run one convention.  This is the unit of work given to the pool, so it must not let anything escape but its BatchResult.
+def RunConvention(parmfile: str, command: str, traceMemory: bool=False) -> BatchResult:
+    from ProgramAnalyzer import Analyze
+
+    result=BatchResult(Parameters=parmfile)
+    start=time.perf_counter()
+    cwd=os.getcwd()
+    try:
+        os.chdir(os.path.dirname(os.path.abspath(parmfile)))
+        args=argparse.Namespace(command=command, parameters=os.path.basename(parmfile), snapshot=None, profile=False, trace_memory=traceMemory)
+        reportsdir=Analyze(args)
+        if reportsdir is None:
+            result.Message="The schedule could not be interpreted"
+        else:
+            result.Succeeded=True
+            result.ReportsDir=os.path.abspath(reportsdir)
+    except SystemExit as e:         # The analyzer exits on fatal errors in the spreadsheet or parameters
+        result.Message=f"Stopped with exit code {e.code}"
+    except Exception as e:
+        result.Message=f"{type(e).__name__}: {e}"
+        LogError(f"RunConvention({parmfile}): {traceback.format_exc()}")
+    finally:
+        os.chdir(cwd)
+    result.Seconds=time.perf_counter()-start
+    return result
+
+
+# Run the conventions named by parmfiles, at most workers at a time.  Returns their results in the order given.
+def RunBatch(parmfiles: list[str], command: str="all", workers: int|None=None, traceMemory: bool=False) -> list[BatchResult]:
+    missing=[p for p in parmfiles if not os.path.isfile(p)]
+    results: dict[str, BatchResult]={p: BatchResult(Parameters=p, Message="No such parameters file") for p in missing}
+    todo=[p for p in dict.fromkeys(parmfiles) if p not in results]
+
+    if workers is None:
+        workers=os.cpu_count() or 1
+    workers=max(1, min(workers, len(todo)))
+    Log(f"Batch: {len(todo)} conventions on {workers} worker{'s' if workers != 1 else ''}")
+
+    start=time.perf_counter()
+    if workers == 1:
+        # Not worth starting a pool: just run them here, one after another
+        _InitWorker(command)
+        for parmfile in todo:
+            results[parmfile]=RunConvention(parmfile, command, traceMemory)
+            LogBatchResult(results[parmfile])
+    elif len(todo) > 0:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_InitWorker, initargs=(command,)) as pool:
+            futures={pool.submit(RunConvention, parmfile, command, traceMemory): parmfile for parmfile in todo}
+            for future in as_completed(futures):
+                parmfile=futures[future]
+                try:
+                    results[parmfile]=future.result()
+                except Exception as e:      # The worker process died (RunConvention itself doesn't raise)
+                    results[parmfile]=BatchResult(Parameters=parmfile, Message=f"{type(e).__name__}: {e}")
+                LogBatchResult(results[parmfile])
+
+    ordered=[results[p] for p in dict.fromkeys(parmfiles)]
+    succeeded=sum(1 for r in ordered if r.Succeeded)
+    Log(f"Batch: {succeeded} of {len(ordered)} conventions succeeded in {time.perf_counter()-start:.2f}s")
+    for result in ordered:
+        if not result.Succeeded:
+            LogError(f"Batch: '{result.Parameters}' failed: {result.Message}")
+    return ordered
+
+
+def LogBatchResult(result: BatchResult) -> None:
+    if result.Succeeded:
+        Log(f"Batch: '{result.Parameters}' done in {result.Seconds:.2f}s; reports in '{result.ReportsDir}'")
+    else:
+        LogError(f"Batch: '{result.Parameters}' failed after {result.Seconds:.2f}s: {result.Message}")
@@ -0,0 +1,395 @@
+from __future__ import annotations
+
+import os
+import sys
+import sqlite3
+import argparse
+from datetime import datetime
+
+from ProgramModel import ProgramModel
+from DiagRules import DiagSettings
+from NumericTime import NumericTime
+from ConventionCalendar import ConventionCalendar
+from Log import Log, LogError
+
+# An SQLite store for parsed programs, so that questions about a program (or a run of years of programs) can be asked in SQL
+# rather than by writing another loop over gItems and gSchedules.
+#
+# Each program is stored under a convention name (e.g., "Boskone 2025"); storing a program again under the same name replaces it.
+# Times are stored as numeric hours from the start of the convention's first day (as NumericTime.Numeric) along with their display text.
+#
+# The count and checking reports are available as views (see _views), all of which include a convention column:
+#   select * from missing_moderators where convention='Boskone 2025'
+# The checking views use each convention's own Diag settings (its minimum participants and routine items; see DiagRules), which are stored
+# with its program, so they find what that convention's Diag reports found.
+#
+# From the command line:
+#   python ProgramDatabase.py program.db conventions
+#   python ProgramDatabase.py program.db views
+#   python ProgramDatabase.py program.db view double_bookings --convention "Boskone 2025"
+#   python ProgramDatabase.py program.db who --room "Salon A" --start "Sat 6 pm" --end "Sat 11 pm"
+#   python ProgramDatabase.py program.db moderators --min-items 5
+#   python ProgramDatabase.py program.db sql "select room, count(*) from items group by room"
+
+DatabaseVersion=2
+
+_schema="""
+create table if not exists conventions (
+    convention text primary key,
+    starting_day text not null,
+    loaded text not null
+);
+create table if not exists rooms (
+    convention text not null,
+    room text not null,
+    position integer not null,
+    primary key (convention, room)
+);
+create table if not exists items (
+    convention text not null,
+    item text not null,             -- The item's unique name (as used as the key of gItems)
+    display_name text not null,
+    time real not null,             -- Hours from the start of the first day
+    time_text text not null,
+    day text not null,
+    length real not null,
+    room text not null,
+    moderator text not null,
+    precis text not null,
+    people_count integer not null,
+    is_continuation integer not null,
+    primary key (convention, item)
+);
+create index if not exists items_time on items (convention, time);
+create index if not exists items_room on items (convention, room, time);
+create table if not exists item_parms (
+    convention text not null,
+    item text not null,
+    parm text not null,             -- Lower case
+    value text not null
+);
+create index if not exists item_parms_parm on item_parms (convention, parm);
+create table if not exists people (
+    convention text not null,
+    person text not null,
+    email text not null,
+    response text not null,
+    responded_yes integer not null,
+    primary key (convention, person)
+);
+create table if not exists person_parms (
+    convention text not null,
+    person text not null,
+    parm text not null,             -- Lower case
+    value text not null
+);
+create index if not exists person_parms_person on person_parms (convention, person);
+create table if not exists assignments (
+    convention text not null,
+    item text not null,
+    person text not null,
+    is_moderator integer not null,
+    time real not null,
+    length real not null,
+    room text not null
+);
+create index if not exists assignments_person on assignments (convention, person, time);
+create index if not exists assignments_item on assignments (convention, item);
+create index if not exists assignments_time on assignments (convention, time);
+create table if not exists avoids (
+    convention text not null,
+    person text not null,
+    start real not null,
+    end real not null,
+    description text not null
+);
+create index if not exists avoids_person on avoids (convention, person);
+create table if not exists diag_settings (
+    convention text primary key,
+    minimum_participants integer not null
+);
+create table if not exists routine_items (
+    convention text not null,
+    word text not null              -- Items whose names contain this are routine
+);
+"""
+
+# The tables holding one convention's rows, in the order they are filled
+_tables=["rooms", "items", "item_parms", "people", "person_parms", "assignments", "avoids", "diag_settings", "routine_items"]
+
+# Items which are expected to have few people, no moderator and no precis (as DiagSettings.IsRoutine)
+_routine="exists (select 1 from routine_items r where r.convention=i.convention and instr(i.item, r.word))"
+_minimumParticipants="(select d.minimum_participants from diag_settings d where d.convention=i.convention)"
+_solo="exists (select 1 from item_parms p where p.convention=i.convention and p.item=i.item and p.parm='solo')"
+# Two (time, length) spans overlap (as ReportHelpers.TimesOverlap, including ignoring bogus times and overlaps of less than 0.001 hour)
+def _Overlap(t1: str, l1: str, t2: str, l2: str) -> str:
+    return f"({t1} >= 0.001 and {t2} >= 0.001 and case when {t1} < {t2} then {t1}+{l1} > {t2}+0.001 else {t2}+{l2} > {t1}+0.001 end)"
+
+_views: dict[str, str]={
+    # Items' people counts
+    "item_people_counts": "select convention, time, time_text, item, people_count from items",
+
+    # Peoples' item counts: everyone who said yes or who is scheduled
+    "person_item_counts": """
+        select pe.convention, pe.person, count(a.item) as items, sum(coalesce(a.is_moderator, 0)) as moderating, pe.responded_yes
+        from people pe left join assignments a on a.convention=pe.convention and a.person=pe.person
+        group by pe.convention, pe.person
+        having pe.responded_yes or count(a.item) > 0""",
+
+    "moderator_item_counts": """
+        select convention, person, count(*) as items, sum(is_moderator) as moderating
+        from assignments group by convention, person having sum(is_moderator) > 0""",
+
+    "people_not_in_people": """
+        select distinct a.convention, a.person from assignments a
+        where not exists (select 1 from people pe where pe.convention=a.convention and pe.person=a.person)""",
+
+    "response_not_yes": """
+        select distinct pe.convention, pe.person, pe.response from people pe
+        join assignments a on a.convention=pe.convention and a.person=pe.person
+        where not pe.responded_yes""",
+
+    "yes_but_not_scheduled": """
+        select pe.convention, pe.person from people pe
+        where pe.responded_yes and not exists (select 1 from assignments a where a.convention=pe.convention and a.person=pe.person)""",
+
+    "suspect_emails": """
+        select convention, person, email from people
+        where email != '' and (email glob '*[, ]*' or email not glob '?*@?*.?*' or email glob '*@*@*')""",
+
+    "double_bookings": f"""
+        select a.convention, a.person, a.item as item1, a.room as room1, b.item as item2, b.room as room2, a.time, i.time_text
+        from assignments a
+        join assignments b on b.convention=a.convention and b.person=a.person and b.rowid > a.rowid
+        join items i on i.convention=a.convention and i.item=a.item
+        where {_Overlap("a.time", "a.length", "b.time", "b.length")}""",
+
+    "avoid_conflicts": f"""
+        select a.convention, a.person, a.item, a.room, a.time, i.time_text, v.description
+        from assignments a
+        join avoids v on v.convention=a.convention and v.person=a.person
+        join items i on i.convention=a.convention and i.item=a.item
+        where {_Overlap("a.time", "a.length", "v.start", "v.end-v.start")}""",
+
+    "low_participant_counts": f"""
+        select i.convention, i.time, i.time_text, i.item, i.people_count from items i
+        where i.item != '' and i.people_count < {_minimumParticipants} and not {_routine} and not {_solo}""",
+
+    "missing_moderators": f"""
+        select i.convention, i.time, i.time_text, i.item, i.people_count from items i
+        where i.moderator = '' and not {_routine} and not {_solo}""",
+
+    "missing_precis": f"""
+        select i.convention, i.time, i.time_text, i.item, i.people_count from items i
+        where i.precis = '' and not {_routine}""",
+
+    "equipment_requirements": """
+        select i.convention, i.time, i.time_text, i.room, i.item, p.value as equipment from items i
+        join item_parms p on p.convention=i.convention and p.item=i.item and p.parm='equipment'""",
+}
+
+
+#*************************************************************************************************
+class ProgramDatabase:
+    def __init__(self, fname: str):
+        self.Filename: str=fname
+        self.Connection=sqlite3.connect(fname)
+        self.Connection.row_factory=sqlite3.Row
+        version=self.Connection.execute("pragma user_version").fetchone()[0]
+        if version not in (0, 1, DatabaseVersion):
+            self.Connection.close()
+            raise ValueError(f"ProgramDatabase: '{fname}' is version {version}; this program handles version {DatabaseVersion}")
+        with self.Connection:
+            self.Connection.executescript(_schema)
+            if version == 1:
+                # Version 1 didn't store the Diag settings: its views used the defaults, so that's what its programs were checked with
+                self.Connection.execute("insert into diag_settings select convention, 3 from conventions")
+                self.Connection.executemany("insert into routine_items select convention, ? from conventions", [(word,) for word in ["Reading", "KK", "Kaffe", "Autograph"]])
+            for name, sql in _views.items():
+                self.Connection.execute(f"drop view if exists {name}")
+                self.Connection.execute(f"create view {name} as {sql}")
+            self.Connection.execute(f"pragma user_version={DatabaseVersion}")
+
+    def Close(self) -> None:
+        self.Connection.close()
+
+    def __enter__(self) -> ProgramDatabase:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.Close()
+
+
+    #----------------------------------------------
+    # Store a parsed program under a convention name, replacing any program already stored under that name
+    def Store(self, convention: str, model: ProgramModel) -> None:
+        with self.Connection:
+            c=self.Connection
+            for table in _tables+["conventions"]:
+                c.execute(f"delete from {table} where convention=?", (convention,))
+            c.execute("insert into conventions values (?, ?, ?)", (convention, model.Calendar.StartingDay, datetime.now().isoformat(timespec="seconds")))
+            settings=DiagSettings(model)
+            c.execute("insert into diag_settings values (?, ?)", (convention, settings.MinimumParticipants))
+            c.executemany("insert into routine_items values (?, ?)", [(convention, word) for word in settings.RoutineItems])
+
+            # (The schedule's header row can have blank columns, e.g., for notes, and may name a room twice; each room is stored once, at its first column)
+            rooms: dict[str, int]={}
+            for i, room in enumerate(model.RoomNames[1:], start=1):
+                if room.strip() != "" and not room.startswith("#"):
+                    rooms.setdefault(room, i)
+            c.executemany("insert into rooms values (?, ?, ?)", [(convention, room, i) for room, i in rooms.items()])
+
+            c.executemany("insert into items values (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                          [(convention, name, item.DisplayName, item.Time.Numeric, str(item.Time), item.Time.DayString, item.Length, item.Room,
+                            item.ModName, item.Precis or "", len(item.People), item.IsContinuation) for name, item in model.Items.items()])
+            c.executemany("insert into item_parms values (?, ?, ?, ?)",
+                          [(convention, name, key.lower(), str(item.Parms[key])) for name, item in model.Items.items() for key in item.Parms.keys()])
+
+            # (Reports add empty Persons for scheduled people who aren't in the People tab; those aren't people.)
+            persons={name: person for name, person in model.Persons.items() if person.Fullname != ""}
+            c.executemany("insert into people values (?, ?, ?, ?, ?)",
+                          [(convention, name, person.Parms["email"] if person.Parms.Exists("email") else "",
+                            person.Response if person.Parms.Exists("response") else "", person.RespondedYes) for name, person in persons.items()])
+            c.executemany("insert into person_parms values (?, ?, ?, ?)",
+                          [(convention, name, key.lower(), str(person.Parms[key])) for name, person in persons.items() for key in person.Parms.keys()])
+
+            c.executemany("insert into assignments values (?, ?, ?, ?, ?, ?, ?)",
+                          [(convention, name, person, person == item.ModName, item.Time.Numeric, item.Length, item.Room)
+                           for name, item in model.Items.items() for person in item.People])
+
+            avoids=[]
+            for name, person in persons.items():
+                try:
+                    avoids.extend((convention, name, av.Start.Numeric, av.End.Numeric, str(av)) for av in person.Avoid)
+                except ValueError as e:
+                    LogError(f"ProgramDatabase: {name}: {e}")
+            c.executemany("insert into avoids values (?, ?, ?, ?, ?)", avoids)
+        Log(f"Program stored in '{self.Filename}' as '{convention}'")
+
+
+    #----------------------------------------------
+    # Queries
+
+    def Query(self, sql: str, parameters: tuple|dict=()) -> list[sqlite3.Row]:
+        return self.Connection.execute(sql, parameters).fetchall()
+
+    def Conventions(self) -> list[str]:
+        return [row["convention"] for row in self.Query("select convention from conventions order by convention")]
+
+    # The rows of one of the views (or of all conventions if convention is None)
+    def View(self, name: str, convention: str|None=None) -> list[sqlite3.Row]:
+        if name not in _views:
+            raise ValueError(f"ProgramDatabase: there is no view named '{name}'")
+        if convention is None:
+            return self.Query(f"select * from {name}")
+        return self.Query(f"select * from {name} where convention=?", (convention,))
+
+    # Convert a time as written in the spreadsheet (e.g., "Sat 6 pm") to a convention's numeric hours.  Raises ValueError if it can't.
+    def ParseTime(self, convention: str, text: str) -> float:
+        row=self.Query("select starting_day from conventions where convention=?", (convention,))
+        if len(row) == 0:
+            raise ValueError(f"ProgramDatabase: no convention named '{convention}'")
+        try:
+            return NumericTime(text, calendar=ConventionCalendar(row[0]["starting_day"])).Numeric
+        except (AssertionError, AttributeError):    # (NumericTime asserts on a day it doesn't know, and leaves empty text unset)
+            raise ValueError(f"ProgramDatabase: can't interpret '{text}' as a time")
+
+    # The people on items in a room (or in any room if room is None) between two times.  Times may be spreadsheet-style text or numeric hours.
+    def WhoIsOn(self, convention: str, room: str|None=None, start: str|float|None=None, end: str|float|None=None) -> list[sqlite3.Row]:
+        if isinstance(start, str):
+            start=self.ParseTime(convention, start)
+        if isinstance(end, str):
+            end=self.ParseTime(convention, end)
+        sql="""select a.person, a.item, a.room, i.time_text, a.is_moderator from assignments a
+               join items i on i.convention=a.convention and i.item=a.item where a.convention=?"""
+        parameters: list=[convention]
+        if room is not None:
+            sql+=" and a.room=?"
+            parameters.append(room)
+        if start is not None:
+            sql+=" and a.time+a.length > ?"
+            parameters.append(start+0.001)
+        if end is not None:
+            sql+=" and a.time < ?"
+            parameters.append(end-0.001)
+        return self.Query(sql+" order by a.time, a.room, a.person", tuple(parameters))
+
+    # Moderators with at least minItems items
+    def BusyModerators(self, convention: str|None=None, minItems: int=1) -> list[sqlite3.Row]:
+        sql="select * from moderator_item_counts where items >= ?"
+        parameters: tuple=(minItems,)
+        if convention is not None:
+            sql+=" and convention=?"
+            parameters=(minItems, convention)
+        return self.Query(sql+" order by items desc, person", parameters)
+
+
+#*************************************************************************************************
+# Store a model in a database file, creating it if necessary
+def StoreProgram(fname: str, convention: str, model: ProgramModel) -> None:
+    with ProgramDatabase(fname) as db:
+        db.Store(convention, model)
+
+
+def _PrintRows(rows: list[sqlite3.Row]) -> None:
+    if len(rows) == 0:
+        print("(no rows)")
+        return
+    print("\t".join(rows[0].keys()))
+    for row in rows:
+        print("\t".join("" if v is None else str(v) for v in row))
+
+
+def main(argv: list[str]|None=None):
+    parser=argparse.ArgumentParser(description="Query the program database")
+    parser.add_argument("database")
+    parser.add_argument("--convention", default=None, help="The convention to query (default: the only one, if there is only one)")
+    subparsers=parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("conventions", help="List the conventions stored")
+    subparsers.add_parser("views", help="List the views")
+    view=subparsers.add_parser("view", help="Show a view")
+    view.add_argument("name", choices=list(_views))
+    who=subparsers.add_parser("who", help="Who is on items in a room and/or time range")
+    who.add_argument("--room", default=None)
+    who.add_argument("--start", default=None, help='e.g., "Sat 6 pm"')
+    who.add_argument("--end", default=None)
+    moderators=subparsers.add_parser("moderators", help="Moderators and their item counts")
+    moderators.add_argument("--min-items", type=int, default=1)
+    sql=subparsers.add_parser("sql", help="Run a query")
+    sql.add_argument("query")
+    args=parser.parse_args(argv)
+
+    if not os.path.exists(args.database):
+        parser.error(f"'{args.database}' does not exist")
+    with ProgramDatabase(args.database) as db:
+        convention=args.convention
+        if convention is None and args.command == "who":
+            conventions=db.Conventions()
+            if len(conventions) != 1:
+                parser.error(f"--convention is required: the database holds {', '.join(conventions) if len(conventions) > 0 else 'no conventions'}")
+            convention=conventions[0]
+
+        match args.command:
+            case "conventions":
+                _PrintRows(db.Query("select * from conventions order by convention"))
+            case "views":
+                print("\n".join(_views))
+            case "view":
+                _PrintRows(db.View(args.name, convention))
+            case "who":
+                try:
+                    _PrintRows(db.WhoIsOn(convention, args.room, args.start, args.end))
+                except ValueError as e:
+                    parser.error(str(e))
+            case "moderators":
+                _PrintRows(db.BusyModerators(convention, args.min_items))
+            case "sql":
+                try:
+                    _PrintRows(db.Query(args.query))
+                except sqlite3.Error as e:
+                    print(f"SQL error: {e}", file=sys.stderr)
+                    exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import os
+import csv
+import json
+
+from HelpersPackage import ParmDict, ReadListAsParmDict, MessageLog, GetParmFromParmDict
+from Log import Log, LogError
+from SheetsLoader import SheetsLoader, SheetsLoadError
+
+# The spreadsheet tabs we read.  The keys are the names of the parameters in parameters.txt which give this year's name for each tab.
+TabParmNames: list[str]=["ScheduleTab", "PrecisTab", "PeopleTab", "ControlTab"]
+
+
+# Read parameters.txt.  This includes the names of the specific tabs to be used.
+def ReadParameters(fname: str="parameters.txt") -> ParmDict:
+    parms=ReadListAsParmDict(fname)
+    if parms is None or len(parms) == 0:
+        MessageLog(f"Can't open/read {os.getcwd()}/{fname}\nProgramAnalyzer terminated.")
+        exit(999)
+    return parms
+
+
+# Create the reports subfolder if none exists and return its name
+def PrepareReportsDir(parms: ParmDict) -> str:
+    reportsdir=GetParmFromParmDict(parms, "reportsdir", "Reports")
+    if not os.path.exists(reportsdir):
+        os.mkdir(reportsdir)
+        Log(f"Reports directory {os.getcwd()}/{reportsdir} created ")
+    return reportsdir
+
+
+# Load the cells of all the tabs we use, keyed by the tab's parameter name (ScheduleTab, etc.)
+# Are we getting the program from Google docs, from a directory of CSV/TSV files or from an Excel spreadsheet?
+def LoadProgramCells(parms: ParmDict) -> dict[str, list[list[str]]|None]:
+    source=GetParmFromParmDict(parms, "source", "Google")
+    if source.lower() == "google":
+        return LoadCellsFromGoogle(parms)
+    if os.path.isdir(source):
+        return LoadCellsFromDirectory(parms, source)
+    return LoadCellsFromXLSX(parms, source)
+
+
+# Read all the tabs from Google.  The service (and an httpFactory giving each loader thread its own http object) may be supplied, e.g., for
+# testing with a StubSheetsService; otherwise they are built from the credentials in parameters.txt.
+# If the sheet can't be read, exits -- or, if exitOnError is False, raises SheetsLoadError.
+#
+# These parameters.txt settings tune the loading:
+#   googleworkers       Tabs read at once (default 4)
+#   googletimeout       Seconds before a request times out (default 30)
+#   googleretries       Retries of a request which timed out or failed with HTTP 429 or 5xx (default 4)
+#   googlebackoff       Seconds before the first retry, doubling with each retry (default 0.5)
+#   googledeadline      Seconds allowed for reading the whole sheet (default: no limit)
+def LoadCellsFromGoogle(parms: ParmDict, service=None, httpFactory=None, exitOnError: bool=True) -> dict[str, list[list[str]]|None]:
+    Log("Loading program from Google docs")
+    if service is None:
+        service, httpFactory=ConnectToGoogleSheets(parms)
+
+    deadline=GetParmFromParmDict(parms, "googledeadline", "")
+    loader=SheetsLoader(service, GetParmFromParmDict(parms, "SheetID"), httpFactory=httpFactory,   # SheetID is the ID of the specific spreadsheet we're reading
+                        workers=int(GetParmFromParmDict(parms, "googleworkers", "4")),
+                        retries=int(GetParmFromParmDict(parms, "googleretries", "4")),
+                        backoff=float(GetParmFromParmDict(parms, "googlebackoff", "0.5")),
+                        deadline=float(deadline) if deadline != "" else None)
+
+    # Convert the generic names of the tabs to the specific names to be used this year
+    tabnames={tab: GetParmFromParmDict(parms, tab) for tab in TabParmNames}
+    try:
+        cells=loader.ReadTabs(list(dict.fromkeys(tabnames.values())))
+    except SheetsLoadError as e:
+        if not exitOnError:
+            raise
+        LogError(f"LoadCellsFromGoogle: {e}")
+        exit(999)
+    return {tab: CleanGoogleCells(cells[tabname], tabname) for tab, tabname in tabnames.items()}
+
+
+# Read the credentials and build a Google API service (e.g., "sheets", "v4" or "drive", "v3")
+def ConnectToGoogle(parms: ParmDict, api: str, version: str):
+    # The Google client libraries are slow to import, so only pull them in when we actually read from Google
+    from googleapiclient.discovery import build
+
+    service=build(api, version, credentials=ReadGoogleCredentials(parms))
+    Log("Service established", Flush=True)
+    return service
+
+
+# Build the Sheets service, along with a factory for the separate (thread-safe) http objects the concurrent loader needs
+def ConnectToGoogleSheets(parms: ParmDict):
+    from googleapiclient.discovery import build
+    import google_auth_httplib2
+    import httplib2
+
+    credentials=ReadGoogleCredentials(parms)
+    timeout=float(GetParmFromParmDict(parms, "googletimeout", "30"))
+    service=build("sheets", "v4", credentials=credentials)
+    Log("Service established", Flush=True)
+    return service, lambda: google_auth_httplib2.AuthorizedHttp(credentials, http=httplib2.Http(timeout=timeout))
+
+
+# Read the service account's credentials from the JSON file named by the credentials parameter
+def ReadGoogleCredentials(parms: ParmDict):
+    from google.oauth2 import service_account
+
+    with open(GetParmFromParmDict(parms, "credentials")) as jsonsource:
+        info=json.load(jsonsource)
+        Log("Json read")
+
+    if info is None:
+        MessageLog("Json file is empty")
+        exit(999)
+    Log("Spreadsheet credentials read")
+
+    credentials=service_account.Credentials.from_service_account_info(info)
+    Log("Credentials established", Flush=True)
+    return credentials
+
+
+# Read all the tabs from an Excel spreadsheet.
+# The parameters.txt setting xlsxreader chooses how:
+#   openpyxl    (the default) with openpyxl
+#   expat       with XLSXReader, which is much quicker.  If the tabs have cells it can't read exactly as openpyxl would, openpyxl is used instead.
+def LoadCellsFromXLSX(parms: ParmDict, source: str) -> dict[str, list[list[str]]|None]:
+    Log(f"Loading program from '{source}'")
+    if GetParmFromParmDict(parms, "xlsxreader", "openpyxl").lower() == "expat":
+        from XLSXReader import XLSXWorkbook, XLSXUnsupported
+        try:
+            with XLSXWorkbook(source) as workbook:
+                return {tab: ReadSheetFromXLSXTab(workbook, parms, tab) for tab in TabParmNames}
+        except XLSXUnsupported as e:
+            Log(f"LoadCellsFromXLSX: {e}, so reading '{source}' with openpyxl")
+
+    import openpyxl
+    workbook=openpyxl.load_workbook(source)
+    return {tab: ReadSheetFromXLSXTab(workbook, parms, tab) for tab in TabParmNames}
+
+
+# Tidy the cells of a Google docs spreadsheet tab into a list of lists of strings
+# Ignore rows beginning with #
+def CleanGoogleCells(cells: list[list[str]], tabname: str) -> list[list[str]]|None:
+    if not cells:
+        LogError(f"ReadSheetFromGoogleTab: No cells found in tab{tabname}")
+        return None
+
+    rows=[p for p in cells if len(p) > 0 and "".join(p)[0] != "#"]  # Drop empty lines and lines with a "#" alone in column 1.
+    return rows
+
+
+def ReadSheetFromXLSXTab(workbook, parms: ParmDict, parmname: str) -> list[list[str]]:
+
+    # Convert the generic name of the tab to the specific name to be used this year
+    tabname=GetParmFromParmDict(parms, parmname)
+    if tabname not in workbook.sheetnames:
+        LogError(f"ReadSheetFromTab: Can't locate {tabname} tab in spreadsheet")
+        raise ValueError(f"No cells found in tab '{tabname}'")
+
+    rows=workbook[tabname].values
+    rows=[list(row) for row in rows]        # Turn rows (supplied as tuples by values) into lists
+    rows=[["" if cell is None else cell for cell in row] for row in rows]   # Turn None values into empty strings
+    return TidyRows(rows)
+
+
+# Tidy a tab's rows of cells the way the Google Sheets API returns them: no empty rows, no rows starting with "#", all strs and no trailing empty cells
+def TidyRows(rows: list[list]) -> list[list[str]]:
+    rows=[row for row in rows if any([cell != "" for cell in row])]         # Eliminate entirely empty rows
+    rows=[[str(cell) for cell in row] for row in rows]              # Some cells seem to come through as ints -- turn them into strs
+    rows=[row for row in rows if "".join(row)[0] != "#"]            # Ignore rows where the 1st character is a "#"
+    trimmedRows=[]      # Remove trailing empty cells (Probably not needed, but better duplicates what Googledocs returns.)
+    for row in rows:
+        # Remove trailing empty cells
+        while row[-1] == "":
+            row.pop()
+        trimmedRows.append(row)
+    return trimmedRows
+
+
+#*************************************************************************************************
+# Read all the tabs from a directory holding each tab as a CSV or TSV file (as exported for automated runs).
+# A tab's file is named by its parameter (ScheduleTab, etc.): either the file's name or the tab's name, to which .csv or .tsv is added.
+# A .tsv file is tab-separated; anything else comma-separated.  The files are UTF-8, with or without a byte order mark.
+# A caller which reads the same directory repeatedly (e.g., watch mode) can pass a cache of its own (see ReadSheetFromDelimitedFile).
+def LoadCellsFromDirectory(parms: ParmDict, source: str, cache: DelimitedFileCache|None=None) -> dict[str, list[list[str]]|None]:
+    Log(f"Loading program from the files in '{source}'")
+    return {tab: ReadSheetFromDelimitedFile(source, parms, tab, cache) for tab in TabParmNames}
+
+
+# The file holding a tab in a directory of CSV/TSV files, or None if there isn't one
+def DelimitedFilePath(directory: str, tabname: str) -> str|None:
+    for fname in [tabname, tabname+".csv", tabname+".tsv"]:
+        path=os.path.join(directory, fname)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+# The rows of each file read, keyed by its full path, with the modification time and size they were read at
+DelimitedFileCache=dict[str, tuple[tuple[int, int], list[list[str]]]]
+
+
+# Read one tab's file.  If a cache is passed, a file which hasn't changed since it was last read into that cache isn't read again.
+# (The cache belongs to the caller, so it lasts only as long as the caller does and holds only the files the caller reads.)
+def ReadSheetFromDelimitedFile(directory: str, parms: ParmDict, parmname: str, cache: DelimitedFileCache|None=None) -> list[list[str]]:
+    tabname=GetParmFromParmDict(parms, parmname)
+    path=DelimitedFilePath(directory, tabname)
+    if path is None:
+        LogError(f"ReadSheetFromDelimitedFile: Can't locate a file for the {tabname} tab in '{directory}'")
+        raise ValueError(f"No cells found in tab '{tabname}'")
+
+    path=os.path.abspath(path)
+    st=os.stat(path)
+    cached=cache.get(path) if cache is not None else None
+    if cached is None or cached[0] != (st.st_mtime_ns, st.st_size):
+        # The csv module parses the file as it's read, a buffer at a time
+        delimiter="\t" if os.path.splitext(path)[1].lower() == ".tsv" else ","
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            cached=((st.st_mtime_ns, st.st_size), TidyRows(list(csv.reader(f, delimiter=delimiter))))
+        if cache is None:
+            return cached[1]
+        cache[path]=cached
+    return [list(row) for row in cached[1]]     # (A copy, since the cells are tidied in place later on)
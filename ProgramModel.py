@@ -0,0 +1,557 @@
+from __future__ import annotations
+
+import re
+from collections import defaultdict
+
+from HelpersPackage import ParmDict, MessageLog, SquareUpMatrix, RemoveEmptyRowsFromMatrix, SearchAndReplace
+
+from ScheduleElement import ScheduleElement
+from Item import Item
+from Person import Person, PeopleTable
+from Log import Log, LogError
+from NumericTime import NumericTime
+from NameResolver import NameIndex, ResolveScheduleNames, AliasColumn
+from ConventionCalendar import ConventionCalendar, DefaultCalendar
+from RunProfile import RunProfile, ProfileStage
+
+
+# The parsed program: everything the reports are generated from
+class ProgramModel:
+    def __init__(self, Items: dict[str, Item]=None, Persons: defaultdict[str, Person]=None, Schedules: defaultdict[str, list[ScheduleElement]]=None,
+                 Times: list[NumericTime]=None, RoomNames: list[str]=None, UnmatchedPrecis: list[str]|None=None, Control: ParmDict=None,
+                 Calendar: ConventionCalendar=None):
+        # Note that time and room are redundant and could be pulled out of the Items dictionary
+        self.Items: dict[str, Item]=Items if Items is not None else {}  # A dictionary keyed by item name containing an Item (time, room, people-list, moderator)
+        self.Persons: defaultdict[str, Person]=Persons if Persons is not None else defaultdict(Person)   # A dict of Persons keyed by the people key (full name)
+        self.Schedules: defaultdict[str, list[ScheduleElement]]=Schedules if Schedules is not None else defaultdict(list)  # Keyed by a person's name containing a ScheduleElement list
+        self.Times: list[NumericTime]=Times if Times is not None else []   # A list of times found in the spreadsheet.
+        self.RoomNames: list[str]=RoomNames if RoomNames is not None else []     # The list of room names corresponding to the columns in the schedule
+        self.UnmatchedPrecis: list[str]|None=UnmatchedPrecis     # Titles from the precis tab with no corresponding item (None if there was no precis tab)
+        self.Control: ParmDict=Control if Control is not None else ParmDict(CaseInsensitiveCompare=True)   # The Control tab's settings (column A --> column B)
+        # The convention's days, which all the times refer to.  (The model sets the convention days from its times, so it has its own calendar
+        # rather than changing a shared one such as DefaultCalendar.)
+        Calendar=Calendar if Calendar is not None else DefaultCalendar
+        self.Calendar: ConventionCalendar=Calendar.Copy() if Calendar.Frozen else Calendar
+        self.ScheduleGrid: ScheduleGrid|None=None      # Where the items came from in the ScheduleTab (None if the model wasn't built from it)
+        self.ItemsByTimeAndRoom: dict[tuple, Item]={}
+        self.IndexItems()
+
+    # (Re)build the (time, room) --> item index
+    def IndexItems(self) -> None:
+        self.ItemsByTimeAndRoom={(item.Time, item.Room): item for item in self.Items.values()}
+
+    # The sizes of the parts of the model, for logging and profiling
+    # (Take these before running reports, since they add empty Persons for scheduled people who aren't in the People tab.)
+    def Counts(self) -> dict[str, int]:
+        return {"items": len(self.Items), "people": len(self.Persons), "schedule elements": sum(len(s) for s in self.Schedules.values()),
+                "times": len(self.Times), "rooms": max(len(self.RoomNames)-1, 0)}
+
+
+# Build the whole model from the cells of the four tabs (keyed by tab parameter name, as returned by LoadProgramCells)
+# Returns None if the schedule can't be interpreted at all.
+def BuildProgramModel(cells: dict[str, list[list[str]]|None], profile: RunProfile|None=None) -> ProgramModel|None:
+    with ProfileStage(profile, "control"):
+        calendar=CalendarFromControlTab(cells["ControlTab"])
+        control=BuildControl(cells["ControlTab"])
+
+    with ProfileStage(profile, "people"):
+        persons=BuildPersons(cells["PeopleTab"], calendar)
+
+    with ProfileStage(profile, "clean"):
+        scheduleRows=CleanScheduleCells(cells["ScheduleTab"])
+    if scheduleRows is None:
+        return None
+    roomNames=scheduleRows[0]
+    grid=ScheduleGrid(scheduleRows)
+    with ProfileStage(profile, "parse"):
+        items, times=BuildItems(scheduleRows[1:], roomNames, calendar, grid)
+
+    with ProfileStage(profile, "schedule build"):
+        ResolveScheduleNames(items, persons, AliasColumn(control))
+        schedules=BuildSchedules(persons, items)
+
+    # Make sure times are sorted into ascending order.
+    # The simple sort works because the times are stored as numeric hours since start of first day.
+    times.sort()
+
+    with ProfileStage(profile, "precis"):
+        unmatched=ApplyPrecis(items, cells["PrecisTab"])
+
+    model=ProgramModel(Items=items, Persons=persons, Schedules=schedules, Times=times, RoomNames=roomNames, UnmatchedPrecis=unmatched, Control=control,
+                       Calendar=calendar)
+    model.ScheduleGrid=grid
+    return model
+
+
+# Bring an existing model up to date after some of the tabs have changed, re-parsing only what depends on the changed tabs.
+# (A change to the Control tab's starting day changes every time in the schedule, so it forces a complete rebuild.)
+# An edit to the ScheduleTab's cells is patched into the model (see PatchScheduleItems) unless the People tab changed, too.
+# Returns None if the schedule can't be interpreted at all.
+def UpdateProgramModel(model: ProgramModel, cells: dict[str, list[list[str]]|None], changedTabs: set[str]) -> ProgramModel|None:
+    if "ControlTab" in changedTabs:
+        return BuildProgramModel(cells)
+
+    # Reports look people up in the Persons defaultdict, which leaves behind empty Persons for scheduled people who are not in
+    # the People tab.  Those must not survive into the next round of reports.
+    if "PeopleTab" in changedTabs:
+        model.Persons=BuildPersons(cells["PeopleTab"], model.Calendar)
+        if model.ScheduleGrid is not None:
+            model.ScheduleGrid.NameIndex=None
+    else:
+        for name in [name for name, person in model.Persons.items() if person.Fullname == ""]:
+            del model.Persons[name]
+
+    rebuilt=patched=False
+    if "ScheduleTab" in changedTabs:
+        scheduleRows=CleanScheduleCells(cells["ScheduleTab"])
+        if scheduleRows is None:
+            return None
+        if "PeopleTab" not in changedTabs and PatchScheduleItems(model, scheduleRows):
+            patched=True
+        else:
+            model.RoomNames=scheduleRows[0]
+            model.ScheduleGrid=ScheduleGrid(scheduleRows)
+            model.Items, model.Times=BuildItems(scheduleRows[1:], model.RoomNames, model.Calendar, model.ScheduleGrid)
+            model.Times.sort()
+            rebuilt=True
+    if "PrecisTab" in changedTabs and not rebuilt:
+        for item in model.Items.values():
+            item.Precis=""
+
+    if rebuilt or "PeopleTab" in changedTabs:
+        ResolveScheduleNames(model.Items, model.Persons, AliasColumn(model.Control))
+        model.Schedules=BuildSchedules(model.Persons, model.Items)
+
+    if "ScheduleTab" in changedTabs or "PrecisTab" in changedTabs:
+        model.UnmatchedPrecis=ApplyPrecis(model.Items, cells["PrecisTab"])
+
+    if not patched:
+        model.IndexItems()
+    return model
+
+
+# Patch the changes between the ScheduleTab's cleaned rows and the ones the model was built from into the model's items, times, schedules
+# and (time, room) index, leaving the rest of the model alone.  The result is the same as building the items and schedules afresh: the
+# cells which changed are re-read, along with every other cell of the same family (see ScheduleGrid), so that the "{room time}" and "{#2}"
+# uniquifying comes out as it would have; and the items and schedule elements are kept in the order the ScheduleTab gives them.
+# Returns False (having changed nothing) if the model has no grid to patch, or if the rooms or the layout of time and people rows have
+# changed, in which case the items must be built from scratch.
+def PatchScheduleItems(model: ProgramModel, scheduleRows: list[list[str]]) -> bool:
+    grid=model.ScheduleGrid
+    if grid is None or scheduleRows[0] != grid.Rows[0] or len(scheduleRows) != len(grid.Rows):
+        return False
+    rows=scheduleRows[1:]
+    oldRows=grid.Rows[1:]
+    if any((len(new[0]) == 0) != (len(old[0]) == 0) for new, old in zip(rows, oldRows)):
+        return False
+    roomNames=scheduleRows[0]
+
+    # Find the item cells which changed: those whose time/items cell or people cell differ, or all of a time row's cells if its time does
+    def PeopleCell(row: int, col: int, cells: list[list[str]]) -> str|None:
+        if row+1 < len(cells) and len(cells[row+1][0]) == 0:
+            return cells[row+1][col]
+        return None
+
+    changed: list[tuple[int, int]]=[]
+    for row in grid.Times:
+        if rows[row] == oldRows[row] and (row+1 >= len(rows) or rows[row+1] == oldRows[row+1]):
+            continue
+        if rows[row][0] != oldRows[row][0]:
+            grid.Times[row]=NumericTime(rows[row][0], calendar=model.Calendar)
+        for col in range(1, len(roomNames)):
+            if rows[row][0] != oldRows[row][0] or rows[row][col] != oldRows[row][col] or PeopleCell(row, col, rows) != PeopleCell(row, col, oldRows):
+                changed.append((row, col))
+    grid.Rows=scheduleRows
+    if len(changed) == 0:
+        return True
+
+    # Take out the items made from the changed cells and the rest of their families
+    families={CellFamily(cells[row][col]) for row, col in changed for cells in (rows, oldRows) if cells[row][col].strip() != ""}
+    redo=set(changed).union(*(grid.Families.get(family, set()) for family in families))
+    removed: dict[str, Item]={}
+    for row, col in redo:
+        for name in grid.RemoveCell(row, col, oldRows[row][col] if (row, col) in changed else rows[row][col]):
+            if name in model.Items:
+                removed[name]=model.Items.pop(name)
+
+    # Put them back in ScheduleTab order, and then put all the items in that order
+    scratchTimes: list[NumericTime]=[]     # (The times are collected below)
+    for row, col in sorted(redo):
+        names=AddCellItems(model.Items, scratchTimes, grid.Times[row], roomNames[col], rows[row][col], PeopleCell(row, col, rows))
+        grid.AddCell(row, col, rows[row][col], names)
+    added={name: model.Items[name] for cell in sorted(redo) for name in grid.Cells.get(cell, [])}
+    model.Items={name: model.Items[name] for cell in sorted(grid.Cells) for name in grid.Cells[cell]}
+
+    model.Times=sorted(set(grid.Times.values()) | {item.Time for item in model.Items.values()})
+    model.Calendar.SetConventionDaysFromTimes([t.Numeric for t in model.Times])
+
+    # Patch the schedules of the people on the removed and added items
+    if grid.NameIndex is None:
+        grid.NameIndex=NameIndex(model.Persons, AliasColumn(model.Control))
+    ResolveScheduleNames(added, model.Persons, index=grid.NameIndex)
+    people: set[str]=set()
+    for item in removed.values():
+        for element in ItemScheduleElements(item):
+            if element.PersonName not in people:
+                people.add(element.PersonName)
+                model.Schedules[element.PersonName]=[x for x in model.Schedules[element.PersonName] if x.IsDummy or x.ItemName not in removed]
+    for item in added.values():
+        for element in ItemScheduleElements(item):
+            model.Schedules[element.PersonName].append(element)
+            people.add(element.PersonName)
+    order={name: i for i, name in enumerate(model.Items)}
+    for person in people:
+        model.Schedules[person].sort(key=lambda x: -1 if x.IsDummy else order[x.ItemName])
+    for person in [person for person, schedule in model.Schedules.items() if len(schedule) == 0]:
+        del model.Schedules[person]
+
+    # And the (time, room) index.  If two items share a time and room (e.g., the ScheduleTab has a time twice), which of them is indexed
+    # depends on the order of all the items, so then it's simplest to index them afresh.
+    for item in removed.values():
+        if model.ItemsByTimeAndRoom.get((item.Time, item.Room)) is item:
+            del model.ItemsByTimeAndRoom[(item.Time, item.Room)]
+    for item in added.values():
+        model.ItemsByTimeAndRoom[(item.Time, item.Room)]=item
+    if len(model.ItemsByTimeAndRoom) != len(model.Items):
+        model.IndexItems()
+
+    Log(f"Schedule tab: {len(changed)} changed cells patched ({len(redo)} cells re-read, {len(removed)} items removed, {len(added)} added)")
+    return True
+
+
+#***********************************************************************
+# Read parameters from the Control sheet
+# The convention's calendar starts with the Control tab's starting day.  (The number of days it runs is set once the schedule is read.)
+def CalendarFromControlTab(parameterCells: list[list[str]]) -> ConventionCalendar:
+    startingDay="Friday"
+    for row in parameterCells:
+        if row[0] == "Starting day":
+            if len(row) > 1:
+                startingDay=row[1].strip()
+
+    calendar=ConventionCalendar.FromStartingDay(startingDay)
+    if calendar is None:
+        LogError("Can't interpret ControlTab:Starting day='"+startingDay+"'.  Will use 'Friday'")
+        calendar=ConventionCalendar("Friday")
+    return calendar
+
+
+# The Control tab's settings: the setting's name in column A and its value in column B
+def BuildControl(parameterCells: list[list[str]]|None) -> ParmDict:
+    control=ParmDict(CaseInsensitiveCompare=True)
+    for row in parameterCells or []:
+        if len(row) > 1 and str(row[0]).strip() != "":
+            control[str(row[0]).strip()]=str(row[1]).strip()
+    return control
+
+
+#***********************************************************************
+# Analyze the People cells and build the dict of Persons
+def BuildPersons(peopleCells: list[list[str]], calendar: ConventionCalendar|None=None) -> defaultdict[str, Person]:
+    gPersons: defaultdict[str, Person]=defaultdict(Person)   # A dict of Persons keyed by the people key (full name)
+
+    # Start by removing empty rows and padding all rows out to make the array rectangular
+    peopleCells=SquareUpMatrix(RemoveEmptyRowsFromMatrix(peopleCells))
+    columnLabels=peopleCells[0]
+
+    # Check for duplicate column headers -- this is always a fatal error.
+    for item in columnLabels:
+        if columnLabels.count(item) != 1:
+            MessageLog(f"'{item}' appears other than once as a column header.  Terminating.")
+            exit(999)
+
+    # Store the rows by column, then form everyone's Fullname at once.
+    # If there is a "full name" column, use that.  Otherwise create a fullname out of fname+lname.  (Either or both may be missing or empty.)
+    table=PeopleTable(columnLabels, peopleCells[1:], calendar)
+    blank=[""]*table.RowCount
+    fullnames=[full if full != "" else (first.strip()+" "+last.strip()).strip()
+               for full, first, last in zip(table.Column("full name") or blank, table.Column("fname") or blank, table.Column("lname") or blank)]
+    table.SetColumn("Fullname", fullnames)
+
+    for irow, fullname in enumerate(fullnames):
+        if fullname == "":
+            LogError(f"*** Can't find or construct a non-null full name for row {irow+1}")
+            LogError("      Col Names: "+str(columnLabels))
+            LogError("      Row Data:  "+str(peopleCells[irow+1]))
+            continue
+        gPersons[fullname]=Person(fullname, Table=table, Row=irow)       # A view of the person's row, indexed by the full name
+
+    return gPersons
+
+
+#***********************************************************************
+# Clean up the schedule tab's cells
+# Returns a list of rows whose first row is the room names (with the time column's header first) and the rest are the time and people rows,
+# or None if the tab is empty or there are no room names.
+def CleanScheduleCells(scheduleCells: list[list[str]]|None) -> list[list[str]]|None:
+    # When we find a row with data in column 0, we have found a new time. This is a time row.
+    # A time row contains items.
+    # A time row will normally be followed by a people row containing the participants for those items.
+    # A people row does *not* have content in column 0.
+
+    # The rows for a particular time con be a single row or two rows, in which case the 2nd row contains the people scheduled on that item.
+    # Rows that are blank or start with a # as the 1st character of column 0 are ignored
+    # Compress out the ignored rows
+    cleanedScheduleCells: list[list[str]]=[]
+    for row in scheduleCells or []:
+        if len(row) == 0:  # Ignore empty rows
+            continue
+        # Skip rows where the first character in the row is a "#"
+        s="".join([r.strip() for r in row])
+        if len(s) > 0 and s[0] == "#":
+            continue
+        # Cells which start with a "#" are treated as blank (but not in the header row -- see column filtering below)
+        if cleanedScheduleCells:
+            row=["" if cell.strip().startswith("#") else cell for cell in row]
+        cleanedScheduleCells.append(row)
+
+    if len(cleanedScheduleCells) == 0:
+        LogError("The schedule tab is empty.")
+        return None
+    cleanedScheduleCells=SquareUpMatrix(cleanedScheduleCells)
+
+    # Now compress out non-room and non-time columns
+    # This will leave one time column on the left followed by all the room columns
+    # We will drop columns even if they have something in them if they are not headed by a room name
+    # We work in the transposed cleanedScheduleCells, since it's much easier to delete rows than columns
+    temp=[list(col) for col in zip(*cleanedScheduleCells)]  # Transpose the array so we can temporarily deal with columns as rows, which is easier
+    cleanedScheduleCells=[temp[0]]    # Copy over the time row
+    for row in temp[1:]:
+        s="".join([r.strip() for r in row])     # String all the cells in the row (col) together
+        if len(s) > 0 and s[0] == "#":
+            continue
+        cleanedScheduleCells.append(row)
+    cleanedScheduleCells=[list(row) for row in zip(*cleanedScheduleCells)]  # And transpose it back
+
+    # Move the room names line out of cleanedScheduleCells
+    roomNames=[r.strip() for r in cleanedScheduleCells[0]] # Get the room names which are in the first row of the scheduleCells tab
+    if len(roomNames) == 0:
+        LogError("Room names line (1st row of the schedule tab) is blank.")
+        return None
+
+    # Copy the needed cells while casting them into strs
+    return [roomNames]+[[str(x) for x in row] for row in cleanedScheduleCells[1:]]
+
+
+#***********************************************************************
+# Where each item came from in the cleaned schedule rows, kept with the model so that an edited ScheduleTab can be patched into it
+# (see PatchScheduleItems) rather than parsed again from scratch.  Rows are numbered as in the rows passed to BuildItems (i.e., without the
+# room names row) and columns as in the room names.
+class ScheduleGrid:
+    def __init__(self, scheduleRows: list[list[str]]):
+        self.Rows: list[list[str]]=scheduleRows     # The cleaned schedule rows, room names first
+        self.Times: dict[int, NumericTime]={}       # The row of each time/items row --> its time
+        self.Cells: dict[tuple[int, int], list[str]]={}     # (row, column) of an item cell --> the names of the items made from it
+        self.Families: defaultdict[str, set[tuple[int, int]]]=defaultdict(set)     # An item's display name --> the cells with that display name
+        self.NameIndex: NameIndex|None=None         # For resolving the names on patched items (valid until the People tab changes)
+
+
+    # Record the items made from a cell.  Cells with the same display name are a family: whether (and how) an item's name is uniquified
+    # depends on the earlier members of its family, and on nothing else.
+    def AddCell(self, row: int, col: int, text: str, names: list[str]) -> None:
+        if len(names) > 0:
+            self.Cells[(row, col)]=names
+            self.Families[CellFamily(text)].add((row, col))
+
+
+    def RemoveCell(self, row: int, col: int, text: str) -> list[str]:
+        if (row, col) not in self.Cells:
+            return []
+        self.Families[CellFamily(text)].discard((row, col))
+        return self.Cells.pop((row, col))
+
+
+def CellFamily(text: str) -> str:
+    return Item(ItemText=text.strip()).DisplayName
+
+
+#***********************************************************************
+# Build the items from the cleaned schedule rows
+# Returns the items dict and the (unsorted) list of times found.  The times are in the calendar's days, and the calendar's convention days are set
+# to cover them.  If a grid is supplied, where each item came from is recorded in it.
+def BuildItems(cleanedScheduleCells: list[list[str]], gRoomNames: list[str], calendar: ConventionCalendar|None=None, grid: ScheduleGrid|None=None) -> tuple[dict[str, Item], list[NumericTime]]:
+    gItems: dict[str, Item]={}
+    gTimes: list[NumericTime]=[]
+
+    # Now we have just the schedule rows.  They are of two types:
+    #       A time/items row which contains a time in column 0 and may contain items in some or all of the rest of the columns
+    #       A people row which follows a time row and has column 0 empty. This may contain a list of people for each of the items
+    # Process them.
+    rowIndex=0
+    while rowIndex < len(cleanedScheduleCells):
+        # The first row must be a time/items row.
+        row=cleanedScheduleCells[rowIndex]
+        if len(row[0]) == 0:     # Time/items rows have content in the 1st column. Is it a time/items row?
+            LogError("Error reading schedule tab: The row below is a people row; we were expecting a time/items row:")
+            LogError("       row="+" ".join(row))
+            rowIndex+=1
+            continue
+        rowFirst=row
+        firstIndex=rowIndex
+        rowIndex+=1
+
+        # Possibly followed by a people row
+        rowSecond=None
+        if rowIndex < len(cleanedScheduleCells):
+            row=cleanedScheduleCells[rowIndex]   # Peek ahead to the next row
+            if len(row[0]) == 0:
+                # We found a people row
+                rowSecond=row
+                rowIndex+=1
+
+        # Get the time from rowFirst and add it to gTimes
+        time=NumericTime(rowFirst[0], calendar=calendar)
+        if time not in gTimes:
+            gTimes.append(time)  # We want to allow duplicate time rows, just-in-case
+        if grid is not None:
+            grid.Times[firstIndex]=time
+
+        # Looking at the rest of the row, there may be text in one or more of the room columns that defines an item
+        for col, roomName in enumerate(gRoomNames):
+            if col == 0:    # Time is in col 0, so we don't want to look at that
+                continue
+            names=AddCellItems(gItems, gTimes, time, roomName, rowFirst[col], rowSecond[col] if rowSecond is not None else None)
+            if grid is not None:
+                grid.AddCell(firstIndex, col, rowFirst[col], names)
+
+    if calendar is not None:
+        calendar.SetConventionDaysFromTimes([t.Numeric for t in gTimes])
+    return gItems, gTimes
+
+
+# Add the item(s) defined by one cell of a time/items row, and the cell below it in the people row (if there is one)
+# Returns the names of the items added.
+def AddCellItems(gItems: dict[str, Item], gTimes: list[NumericTime], time: NumericTime, roomName: str, itemCell: str, peopleCell: str|None) -> list[str]:
+    # This has to be an item name since it's a cell containing text in a row that starts with a time and in a column that starts with a room
+    itemName=itemCell.strip()
+    if len(itemName) == 0 or itemName.startswith("#"):  # It is only an item if the cell contains text
+        return []
+
+    # In some cases, the item may have a generic name, e.g.,  "Reading", "Autographs".  This name will be used in multiple places, but
+    # We require a unique name to track the isons of people with items.  If an item name is already in gItems, we uniquify the next use of that item name
+    # by appending rom/day/time to it.
+    # Note that anything in {curly brackets} is ignored when printing, etc.
+    lst, val=SearchAndReplace("(<.*?>)", itemName, "")
+    itemNameStripped=val.strip()
+    if itemNameStripped in gItems:
+        itemName+=" {"+roomName+" "+str(time)+"}"
+        Log(f"Item Name decorated {itemName}")
+
+    # Was there a people row following this time/items row?
+    if peopleCell is None:  # We have an item with no people on it.
+        return [AddItemWithoutPeople(gItems, time, roomName, itemName, 1.0)]
+
+    # We indicate items which go for an hour, but have some people in one part and some in another using a special notation in the people list.
+    # Robert A. Heinlein, [0.5] John W. Campbell puts RAH on the hour and JWC a half-hour later.
+    # There is much messiness in this.
+    # We look for the [##] in the people list.  If we find it, we divide the people list in half and create two items with separate plists.
+    r=re.match(r"(.*)\[([0-9.]*)](.*)", str(peopleCell))
+    if r is None:
+        return [AddItemWithPeople(gItems, time, roomName, itemName, str(peopleCell))]
+
+    # Sometimes the first person can have a trailing comma, e.g., Socrates, [0.0] Plato.  Drop it.
+    plist1=r.groups()[0].strip().removesuffix(",")
+    deltaT=float(r.groups()[1].strip())
+    plist2=r.groups()[2].strip()
+    names=[AddItemWithPeople(gItems, time, roomName, itemName, plist1, length=deltaT)]
+    newTime=time+deltaT
+    if newTime not in gTimes:
+        gTimes.append(newTime)
+    # This second instance will need to have a distinct item name, so add {#2} to the item name
+    names.append(AddItemWithPeople(gItems, newTime, roomName, itemName+" {#2}", plist2, length=1.0-deltaT))   #TODO: Do we want to handle divisions other thin into 1/2?
+    return names
+
+
+#***********************************************************************
+# Extract information from Items, etc., to be used to process schedules
+def BuildSchedules(gPersons: dict[str, Person], gItems: dict[str, Item]) -> defaultdict[str, list[ScheduleElement]]:
+    gSchedules: defaultdict[str, list[ScheduleElement]]=defaultdict(list)  # A dictionary keyed by a person's name containing a ScheduleElement list
+    # ScheduleElement is the (time, room, item, moderator) tuples of an item that that person is on.
+
+    # Used so that the gSchedules XML contains entries for unscheduled people which will be used in ProgramMailAnalyzer to handle things like invitations
+    for person in gPersons:
+        gSchedules[person]=[ScheduleElement(PersonName=person, IsDummy=True, )]
+
+    for item in gItems.values():
+        for element in ItemScheduleElements(item):
+            gSchedules[element.PersonName].append(element)
+
+    return gSchedules
+
+
+# The schedule elements for the people on an item
+def ItemScheduleElements(item: Item) -> list[ScheduleElement]:
+    elements: list[ScheduleElement]=[]
+    for personName in item.People:  # For each person listed on this item
+        ismod, personName=CheckModFlag(personName)
+        elements.append(ScheduleElement(PersonName=personName, Time=item.Time, Length=item.Length, Room=item.Room, ItemName=item.Name, IsMod=ismod))  # The time, room, item name, and moderator flag
+    return elements
+
+
+#***********************************************************************
+# Analyze the Precis cells and add the information to gItems
+# Returns the list of precis titles which have no corresponding item, or None if there is no precis tab
+def ApplyPrecis(gItems: dict[str, Item], precisCells: list[list[str]]|None) -> list[str]|None:
+    if precisCells is None:
+        return None
+
+    # The first row is column labels. So ignore it.
+    # The rest of the rows of the tab contains the title in the first column and the precis in the second
+    unmatched: list[str]=[]
+    for row in precisCells[1:]:
+        row=[r.strip() for r in row]    # Get rid of leading and trailing blanks
+        if len(row) > 1 and len(row[0]) > 0 and len(row[1]) > 0: # If both the item name and the precis exist, store them in the precis table.
+            itemname=row[0]
+            if itemname in gItems:
+                gItems[itemname].Precis=row[1]
+            else:
+                unmatched.append(itemname)
+    return unmatched
+
+
+def PersonOfInterest(personname: str, gschedules: dict[str, list[ScheduleElement]]) -> bool:
+    return sum(not x.IsDummy for x in gschedules[personname]) > 0
+
+
+# Take a name string which may contain the (M) moderater flag and split it into isMon and the name by itself
+# Generate the name of a person stripped if any "(M)" or "(m)" flags
+def CheckModFlag(s: str) -> tuple[bool, str]:
+    if "(m)" in s.lower():
+        return True, s.replace("(M)", "").replace("(m)", "").strip()
+    return False, s
+
+
+#.......
+# Add an item with a list of people to the gItems dict, and add the item to each of the persons who are on it
+# Returns the item's (possibly uniquified) name
+def AddItemWithPeople(gItems: dict[str, Item], time: NumericTime, roomName: str, itemName: str, plistText: str, length: float=1.0) -> str:
+
+    # Ignore anything following a "#" as a comment
+    if "#" in plistText:
+        plistText=plistText[:plistText.index("#")]
+    plist=[p.strip() for p in plistText.split(",") ]    # Get the people as a list with excess spaces removed
+    plist=[p for p in plist if len(p) > 0]              # Ignore empty entries
+    modName=""
+    peopleList: list[str]=[]
+    for person in plist:  # For each person listed on this item
+        ismod, name=CheckModFlag(person)
+        if ismod:
+            modName=name
+        peopleList.append(name)
+    # And add the item with its list of people to the items table.
+    if itemName in gItems:  # If the item's name is already in use, add a uniquifier of room+day/time
+        itemName='{'+f"{itemName}  {roomName} {time}"+'}'
+    item=Item(ItemText=itemName, Time=time, Length=length, Room=roomName, People=peopleList, ModName=modName)
+    gItems[item.Name]=item
+    return item.Name
+
+
+#.......
+# Add an item with a list of people, and add the item to each of the persons
+# Returns the item's (possibly uniquified) name
+def AddItemWithoutPeople(gItems: dict[str, Item], time: NumericTime, roomName: str, itemName: str, length: float=0) -> str:
+    if itemName in gItems:  # If the item's name is already in use, add a uniquifier of room+day/time
+        itemName=itemName+'  {'+f"{roomName} {time}"+'}'
+    item=Item(ItemText=itemName, Time=time, Room=roomName, Length=length)
+    gItems[item.Name]=item
+    return item.Name
@@ -0,0 +1,424 @@
+from __future__ import annotations
+
+import sys
+import math
+import mmap
+import struct
+import itertools
+from array import array
+from collections import defaultdict
+
+from HelpersPackage import ParmDict
+
+from Item import Item
+from Person import Person, PeopleTable
+from ScheduleElement import ScheduleElement
+from NumericTime import NumericTime
+from ConventionCalendar import ConventionCalendar
+from ProgramModel import ProgramModel
+from Log import Log, LogError
+
+# A binary snapshot of the parsed program (gItems, gPersons, gSchedules, gTimes and gRoomNames) which can be reloaded without
+# touching Google Sheets or openpyxl.
+#
+# File layout (all numbers little-endian):
+#   Header:         magic (8 bytes), format version (uint16), number of sections (uint16)
+#   Section table:  one entry per section of name (16 bytes, NUL-padded), offset (uint64), length (uint64)
+#   Sections:       each section is a number of columns (uint32, then 4 bytes of padding) followed by the columns, each of which is
+#                   name (32 bytes, NUL-padded), kind (1 byte), 7 bytes of padding, number of values (uint64), length of data (uint64), and
+#                   then the data, padded to a multiple of 8 bytes.  The kinds of column are:
+#                       q   int64s
+#                       d   float64s (NaN for None)
+#                       ?   one byte per bool
+#                       s   strings: count+1 int64 offsets into the text, one byte per value which is 1 if it's None, padding to a
+#                           multiple of 8, and then the values' text, UTF-8, end to end
+#
+# Only plain data is stored -- nothing in a snapshot is executed or unpickled -- so a snapshot does not depend on the layout of the
+# Item/Person/ScheduleElement classes and is safe to open whatever its source.  The columns are read in place from the mapped file: a
+# section's column table is decoded when the section is first accessed, numbers are read straight out of the mapping and strings are
+# decoded one at a time as they're used.  (The objects are rebuilt only when first accessed.)
+#
+# Change SnapshotVersion whenever the layout (including the sections and columns stored) changes: a snapshot of another version is
+# refused rather than read with guessed defaults.
+
+SnapshotMagic=b"PASNAP\r\n"
+SnapshotVersion=3
+
+_header=struct.Struct("<8sHH")
+_sectionEntry=struct.Struct("<16sQQ")
+_sectionHeader=struct.Struct("<I4x")
+_columnEntry=struct.Struct("<32s1s7xQQ")
+
+
+#*************************************************************************************************
+# Writing
+
+def WriteSnapshot(fname: str, gItems: dict[str, Item], gPersons: dict[str, Person], gSchedules: dict[str, list[ScheduleElement]],
+                  gTimes: list[NumericTime], gRoomNames: list[str], control: ParmDict|None=None, calendar: ConventionCalendar|None=None) -> None:
+    if calendar is None:
+        calendar=gTimes[0].Calendar if len(gTimes) > 0 else ConventionCalendar()
+
+    keys=[] if control is None else list(control.keys())
+    sections: dict[str, dict[str, tuple[str, list]]]={
+        "calendar": {"DayList": ("s", list(calendar.DayList)), "ConventionDays": ("q", [calendar.ConventionDays])},
+        "rooms": {"RoomNames": ("s", list(gRoomNames))},
+        "times": _TimeColumns(gTimes),
+        "items": _ItemsToColumns(gItems),
+        "persons": _PersonsToColumns(gPersons),
+        "schedules": _SchedulesToColumns(gSchedules),
+        "control": {"Key": ("s", keys), "Value": ("s", [control[key] for key in keys])},
+    }
+
+    blobs=[(name, _EncodeSection(cols)) for name, cols in sections.items()]
+
+    # The sections start immediately after the header and the section table
+    offset=_header.size+len(blobs)*_sectionEntry.size
+    table=b""
+    for name, blob in blobs:
+        table+=_sectionEntry.pack(name.encode("ascii"), offset, len(blob))
+        offset+=len(blob)
+
+    with open(fname, "wb") as f:
+        f.write(_header.pack(SnapshotMagic, SnapshotVersion, len(blobs)))
+        f.write(table)
+        for _, blob in blobs:
+            f.write(blob)
+    Log(f"Program snapshot written to '{fname}'")
+
+
+def _EncodeSection(cols: dict[str, tuple[str, list]]) -> bytes:
+    out=[_sectionHeader.pack(len(cols))]
+    for name, (kind, values) in cols.items():
+        data=_EncodeColumn(kind, values)
+        out.append(_columnEntry.pack(name.encode("ascii"), kind.encode("ascii"), len(values), len(data)))
+        out.append(data)
+    return b"".join(out)
+
+
+def _EncodeColumn(kind: str, values: list) -> bytes:
+    if kind == "q":
+        data=_LittleEndian(array("q", values)).tobytes()
+    elif kind == "d":
+        data=_LittleEndian(array("d", [math.nan if v is None else v for v in values])).tobytes()
+    elif kind == "?":
+        data=bytes(1 if v else 0 for v in values)
+    elif kind == "s":
+        text=[b"" if v is None else v.encode("utf-8") for v in values]
+        nulls=bytes(1 if v is None else 0 for v in values)
+        data=_LittleEndian(array("q", itertools.accumulate((len(t) for t in text), initial=0))).tobytes()+nulls+_Padding(len(nulls))+b"".join(text)
+    else:
+        raise ValueError(f"WriteSnapshot: unknown column kind '{kind}'")
+    return data+_Padding(len(data))
+
+
+def _Padding(length: int) -> bytes:
+    return b"\0"*(-length % 8)
+
+
+# The array in little-endian byte order (as stored in the file)
+def _LittleEndian(a: array) -> array:
+    if sys.byteorder != "little":
+        a.byteswap()
+    return a
+
+
+# Times are stored as two columns, the day (0 if there's no time) and the hour (NaN if there's no time)
+def _TimeColumns(times: list[NumericTime|None], prefix: str="") -> dict[str, tuple[str, list]]:
+    return {prefix+"Day": ("q", [0 if t is None else t.Day for t in times]), prefix+"Hour": ("d", [None if t is None else t.Hour for t in times])}
+
+
+def _ItemsToColumns(gItems: dict[str, Item]) -> dict[str, tuple[str, list]]:
+    items=list(gItems.values())
+    return {"Key": ("s", list(gItems.keys())),
+            "ItemText": ("s", [item.ItemText for item in items]),
+            **_TimeColumns([item.Time for item in items], "Time"),
+            "Length": ("d", [item.Length for item in items]),
+            "Room": ("s", [item.Room for item in items]),
+            "PeopleCount": ("q", [len(item.People) for item in items]),       # (Each item's people, end to end, are in People)
+            "People": ("s", [person for item in items for person in item.People]),
+            "ModName": ("s", [item.ModName for item in items]),
+            "Precis": ("s", [item.Precis for item in items]),
+            "ResolvedCount": ("q", [len(item.ResolvedNames) for item in items]),     # (And likewise their resolved names)
+            "ResolvedFrom": ("s", [name for item in items for name in item.ResolvedNames.keys()]),
+            "ResolvedTo": ("s", [name for item in items for name in item.ResolvedNames.values()])}
+
+
+def _PersonsToColumns(gPersons: dict[str, Person]) -> dict[str, tuple[str, list]]:
+    # All the people from the People tab share the same columns, so the parms are stored as one list of column names plus each column's
+    # values, one per person (column by column, end to end), with None marking a column which a person does not have.
+    columns: list[str]=[]
+    for person in gPersons.values():
+        for key in person.Parms.keys():
+            if key not in columns:
+                columns.append(key)
+
+    persons=list(gPersons.values())
+    return {"Key": ("s", list(gPersons.keys())),
+            "Fullname": ("s", [person.Fullname for person in persons]),
+            "Columns": ("s", columns),
+            "Values": ("s", [person.Parms[c] if person.Parms.Exists(c) else None for c in columns for person in persons])}
+
+
+def _SchedulesToColumns(gSchedules: dict[str, list[ScheduleElement]]) -> dict[str, tuple[str, list]]:
+    elements=[se for schedule in gSchedules.values() for se in schedule]
+    return {"Key": ("s", list(gSchedules.keys())),
+            "Count": ("q", [len(schedule) for schedule in gSchedules.values()]),      # (Each person's elements, end to end, are in the rest)
+            "PersonName": ("s", [se.PersonName for se in elements]),
+            **_TimeColumns([se.Time for se in elements], "Time"),
+            "Length": ("d", [se.Length for se in elements]),
+            "Room": ("s", [se.Room for se in elements]),
+            "ItemName": ("s", [se.ItemName for se in elements]),
+            "IsMod": ("?", [se.IsMod for se in elements]),
+            "IsDummy": ("?", [se.IsDummy for se in elements])}
+
+
+#*************************************************************************************************
+# Reading
+
+# The least data a column of count values of the kind can have (the text of strings aside)
+def _MinimumColumnSize(kind: str, count: int) -> int:
+    if kind == "q" or kind == "d":
+        return 8*count
+    if kind == "?":
+        return count
+    if kind == "s":
+        return 8*(count+1)+count+(-count % 8)
+    raise ValueError(f"ProgramSnapshot: unknown column kind '{kind}'")
+
+
+# One column of a section, read in place from the mapped file
+class _Column:
+    def __init__(self, kind: str, count: int, data: memoryview):
+        self.Kind: str=kind
+        self._count: int=count
+        self._views: list[memoryview]=[data]        # Every view of the mapping, so that they can all be released
+        if kind == "q" or kind == "d":
+            self._values=self._Numbers(kind, data[:8*count])
+        elif kind == "?":
+            self._values=self._View(data[:count])
+        elif kind == "s":
+            self._offsets=self._Numbers("q", data[:8*(count+1)])
+            self._nulls=self._View(data[8*(count+1):8*(count+1)+count])
+            self._text=self._View(data[8*(count+1)+count+(-count % 8):])
+        else:
+            raise ValueError(f"ProgramSnapshot: unknown column kind '{kind}'")
+
+    def _View(self, view: memoryview) -> memoryview:
+        self._views.append(view)
+        return view
+
+    def _Numbers(self, kind: str, view: memoryview):
+        if sys.byteorder == "little":
+            return self._View(self._View(view).cast(kind))
+        values=array(kind, bytes(view))     # (A copy, in this machine's byte order)
+        values.byteswap()
+        return values
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, i: int):
+        if self.Kind == "s":
+            if self._nulls[i]:
+                return None
+            return str(self._text[self._offsets[i]:self._offsets[i+1]], "utf-8")
+        if self.Kind == "?":
+            return self._values[i] != 0
+        value=self._values[i]
+        if self.Kind == "d" and math.isnan(value):
+            return None
+        return value
+
+    def __iter__(self):
+        return (self[i] for i in range(self._count))
+
+    # Give up the views of the mapping (so that it can be closed)
+    def Release(self) -> None:
+        for view in reversed(self._views):
+            view.release()
+        self._views=[]
+
+
+# Open a snapshot file.  Nothing beyond the header and section table is decoded until one of the properties is accessed.
+def LoadSnapshot(fname: str) -> ProgramSnapshot:
+    return ProgramSnapshot(fname)
+
+
+class ProgramSnapshot:
+    def __init__(self, fname: str):
+        self.Filename: str=fname
+        self._file=open(fname, "rb")
+        try:
+            self._map=mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:     # A zero-length file can't be mapped
+            self._file.close()
+            raise ValueError(f"ProgramSnapshot: '{fname}' is empty")
+        self._columns: dict[str, dict[str, _Column]]={}
+
+        if len(self._map) < _header.size:
+            self.Close()
+            raise ValueError(f"ProgramSnapshot: '{fname}' is not a program snapshot")
+        magic, version, count=_header.unpack_from(self._map, 0)
+        if magic != SnapshotMagic:
+            self.Close()
+            raise ValueError(f"ProgramSnapshot: '{fname}' is not a program snapshot")
+        if version != SnapshotVersion:
+            self.Close()
+            raise ValueError(f"ProgramSnapshot: '{fname}' is snapshot version {version}; this program reads version {SnapshotVersion}")
+
+        self._sections: dict[str, tuple[int, int]]={}
+        if len(self._map) < _header.size+count*_sectionEntry.size:
+            self.Close()
+            raise ValueError(f"ProgramSnapshot: '{fname}' is damaged (it has been cut short)")
+        for i in range(count):
+            name, offset, length=_sectionEntry.unpack_from(self._map, _header.size+i*_sectionEntry.size)
+            if offset+length > len(self._map):
+                self.Close()
+                raise ValueError(f"ProgramSnapshot: '{fname}' is damaged (it has been cut short)")
+            self._sections[name.rstrip(b"\0").decode("ascii")]=(offset, length)
+
+        self._items: dict[str, Item]|None=None
+        self._persons: defaultdict[str, Person]|None=None
+        self._schedules: defaultdict[str, list[ScheduleElement]]|None=None
+        self._times: list[NumericTime]|None=None
+        self._itemsByTimeAndRoom: dict[tuple, Item]|None=None
+        self._calendar: ConventionCalendar|None=None
+
+
+    def __enter__(self) -> ProgramSnapshot:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.Close()
+
+    # Release the mapping.  Anything already rebuilt remains usable.
+    def Close(self) -> None:
+        for cols in self._columns.values():
+            for column in cols.values():
+                column.Release()
+        self._columns={}
+        if self._map is not None:
+            self._map.close()
+            self._map=None
+        self._file.close()
+
+
+    # Find one section's columns (once)
+    def _Section(self, name: str) -> dict[str, _Column]:
+        if name not in self._columns:
+            if name not in self._sections:
+                LogError(f"ProgramSnapshot: section '{name}' missing from '{self.Filename}'")
+                raise ValueError(f"Snapshot section '{name}' missing")
+            if self._map is None:
+                raise ValueError(f"ProgramSnapshot: '{self.Filename}' has been closed")
+            offset, length=self._sections[name]
+            end=offset+length
+            (count,)=_sectionHeader.unpack_from(self._map, offset)
+            offset+=_sectionHeader.size
+            cols: dict[str, _Column]={}
+            for _ in range(count):
+                colname, kind, values, size=_columnEntry.unpack_from(self._map, offset)
+                offset+=_columnEntry.size
+                if offset+size > end or size < _MinimumColumnSize(kind.decode("ascii"), values):
+                    raise ValueError(f"ProgramSnapshot: section '{name}' of '{self.Filename}' is damaged")
+                cols[colname.rstrip(b"\0").decode("ascii")]=_Column(kind.decode("ascii"), values, memoryview(self._map)[offset:offset+size])
+                offset+=size
+            self._columns[name]=cols
+        return self._columns[name]
+
+
+    @property
+    def DayList(self) -> list[str]:
+        return list(self._Section("calendar")["DayList"])
+
+    # The calendar every time in the snapshot refers to
+    @property
+    def Calendar(self) -> ConventionCalendar:
+        if self._calendar is None:
+            cols=self._Section("calendar")
+            self._calendar=ConventionCalendar(cols["DayList"][0], cols["ConventionDays"][0])
+        return self._calendar
+
+    @property
+    def RoomNames(self) -> list[str]:
+        return list(self._Section("rooms")["RoomNames"])
+
+    @property
+    def Times(self) -> list[NumericTime]:
+        if self._times is None:
+            cols=self._Section("times")
+            self._times=[_Time(cols, "", i, self.Calendar) for i in range(len(cols["Day"]))]
+        return self._times
+
+    @property
+    def Items(self) -> dict[str, Item]:
+        if self._items is None:
+            cols=self._Section("items")
+            people=list(cols["People"])
+            resolved=list(zip(cols["ResolvedFrom"], cols["ResolvedTo"]))
+            self._items={}
+            start=resolvedStart=0
+            for i, key in enumerate(cols["Key"]):
+                end=start+cols["PeopleCount"][i]
+                resolvedEnd=resolvedStart+cols["ResolvedCount"][i]
+                self._items[key]=Item(ItemText=cols["ItemText"][i], Time=_Time(cols, "Time", i, self.Calendar), Length=cols["Length"][i], Room=cols["Room"][i],
+                                      People=people[start:end], ModName=cols["ModName"][i], Precis=cols["Precis"][i])
+                self._items[key].ResolvedNames=dict(resolved[resolvedStart:resolvedEnd])
+                start, resolvedStart=end, resolvedEnd
+        return self._items
+
+    @property
+    def Persons(self) -> defaultdict[str, Person]:
+        if self._persons is None:
+            cols=self._Section("persons")
+            columns=list(cols["Columns"])
+            keys=list(cols["Key"])
+            values=list(cols["Values"])
+            rows=[[values[c*len(keys)+row] for c in range(len(columns))] for row in range(len(keys))]
+            table=PeopleTable(columns, rows, self.Calendar)     # (A None value is a column the person doesn't have)
+            self._persons=defaultdict(Person)
+            for row, (key, fullname) in enumerate(zip(keys, cols["Fullname"])):
+                self._persons[key]=Person(fullname, Table=table, Row=row)
+        return self._persons
+
+    @property
+    def Schedules(self) -> defaultdict[str, list[ScheduleElement]]:
+        if self._schedules is None:
+            cols=self._Section("schedules")
+            self._schedules=defaultdict(list)
+            i=0
+            for key, count in zip(cols["Key"], cols["Count"]):
+                self._schedules[key]=[ScheduleElement(PersonName=cols["PersonName"][j], Time=_Time(cols, "Time", j, self.Calendar), Length=cols["Length"][j],
+                                                      Room=cols["Room"][j], ItemName=cols["ItemName"][j], IsMod=cols["IsMod"][j], IsDummy=cols["IsDummy"][j])
+                                      for j in range(i, i+count)]
+                i+=count
+        return self._schedules
+
+    # The Control tab's settings
+    @property
+    def Control(self) -> ParmDict:
+        control=ParmDict(CaseInsensitiveCompare=True)
+        cols=self._Section("control")
+        for key, value in zip(cols["Key"], cols["Value"]):
+            control[key]=value
+        return control
+
+    @property
+    def ItemsByTimeAndRoom(self) -> dict[tuple, Item]:
+        if self._itemsByTimeAndRoom is None:
+            self._itemsByTimeAndRoom={(item.Time, item.Room): item for item in self.Items.values()}
+        return self._itemsByTimeAndRoom
+
+    # Rebuild the whole program as a ProgramModel so the reports can be regenerated from it.
+    # The snapshot doesn't record the unmatched precis, so the precis-without-items check is skipped for a snapshot.
+    def ToModel(self) -> ProgramModel:
+        return ProgramModel(Items=self.Items, Persons=self.Persons, Schedules=self.Schedules, Times=self.Times, RoomNames=self.RoomNames, Control=self.Control,
+                            Calendar=self.Calendar)
+
+
+# The i'th time of a pair of time columns (see _TimeColumns)
+def _Time(cols: dict[str, _Column], prefix: str, i: int, calendar: ConventionCalendar) -> NumericTime|None:
+    hour=cols[prefix+"Hour"][i]
+    if hour is None:
+        return None
+    return NumericTime.FromDayHour(cols[prefix+"Day"][i], hour, calendar)
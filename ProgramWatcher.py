@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import os
+import time
+import hashlib
+import json
+
+from HelpersPackage import ParmDict, GetParmFromParmDict
+
+from ProgramLoader import TabParmNames, LoadCellsFromXLSX, LoadCellsFromGoogle, LoadCellsFromDirectory, DelimitedFilePath, DelimitedFileCache, ConnectToGoogle, ConnectToGoogleSheets
+from ProgramModel import ProgramModel, BuildProgramModel, UpdateProgramModel
+from ReportRegistry import ReportsForCommand
+from ReportHelpers import MakeTimestamp
+from Log import Log, LogError
+
+# Watch mode: keep the parsed program in memory, poll the spreadsheet for changes and, when it changes, re-parse only the tabs
+# which changed and regenerate only the reports which depend on them.
+
+
+#*************************************************************************************************
+# Program sources.  Each has Revision(), which is cheap and changes whenever the spreadsheet does, and Load(), which reads all the tabs.
+
+# An XLSX file: the revision is its modification time and size
+class XLSXProgramSource:
+    def __init__(self, parms: ParmDict, path: str):
+        self.Parms: ParmDict=parms
+        self.Path: str=path
+
+    def Revision(self):
+        st=os.stat(self.Path)
+        return st.st_mtime_ns, st.st_size
+
+    def Load(self) -> dict[str, list[list[str]]|None]:
+        return LoadCellsFromXLSX(self.Parms, self.Path)
+
+
+# A directory of CSV/TSV files, one per tab: the revision is the tab files' modification times and sizes
+# The source keeps the rows it last read, so a poll re-reads only the files which changed.
+class DirectoryProgramSource:
+    def __init__(self, parms: ParmDict, path: str):
+        self.Parms: ParmDict=parms
+        self.Path: str=path
+        self._cache: DelimitedFileCache={}
+
+    def Revision(self):
+        revision=[]
+        for tab in TabParmNames:
+            fname=DelimitedFilePath(self.Path, GetParmFromParmDict(self.Parms, tab))
+            if fname is not None:
+                st=os.stat(fname)
+                revision.append((fname, st.st_mtime_ns, st.st_size))
+        return tuple(revision)
+
+    def Load(self) -> dict[str, list[list[str]]|None]:
+        return LoadCellsFromDirectory(self.Parms, self.Path, self._cache)
+
+
+# A Google sheet: the revision is the file's Drive version number
+# The services may be supplied (e.g., a StubSheetsService for offline testing); otherwise they are built from the credentials in parameters.txt
+class GoogleProgramSource:
+    def __init__(self, parms: ParmDict, sheetsService=None, driveService=None, httpFactory=None):
+        self.Parms: ParmDict=parms
+        self.SheetID: str=GetParmFromParmDict(parms, "SheetID")
+        self._sheets=sheetsService
+        self._httpFactory=httpFactory
+        if sheetsService is None:
+            self._sheets, self._httpFactory=ConnectToGoogleSheets(parms)
+        self._drive=driveService if driveService is not None else ConnectToGoogle(parms, "drive", "v3")
+
+    def Revision(self):
+        return self._drive.files().get(fileId=self.SheetID, fields="version").execute()["version"]
+
+    def Load(self) -> dict[str, list[list[str]]|None]:
+        return LoadCellsFromGoogle(self.Parms, self._sheets, self._httpFactory, exitOnError=False)     # (Run() logs the failure and tries again later)
+
+
+def MakeProgramSource(parms: ParmDict):
+    source=GetParmFromParmDict(parms, "source", "Google")
+    if source.lower() == "google":
+        return GoogleProgramSource(parms)
+    if os.path.isdir(source):
+        return DirectoryProgramSource(parms, source)
+    return XLSXProgramSource(parms, source)
+
+
+# A fingerprint of a tab's contents, used to decide which tabs changed
+def TabHash(cells: list[list[str]]|None) -> str:
+    return hashlib.sha1(json.dumps(cells).encode("utf-8")).hexdigest()
+
+
+#*************************************************************************************************
+class ProgramWatcher:
+    def __init__(self, source, reportsdir: str, command: str="all", interval: float=30.0):
+        self.Source=source
+        self.ReportsDir: str=reportsdir
+        self.Command: str=command           # Which reports to keep up to date (as for the command line: all, check, reports, docx or html)
+        self.Interval: float=interval       # Seconds between polls
+        self.Model: ProgramModel|None=None
+        self._revision=None
+        self._tabHashes: dict[str, str]={}
+
+
+    # Check the source once.  If it has changed, bring the model and the affected reports up to date.
+    # Returns True if any reports were regenerated.
+    def Poll(self) -> bool:
+        start=time.perf_counter()
+        revision=self.Source.Revision()
+        pollTime=time.perf_counter()-start
+        if revision == self._revision:
+            return False
+
+        start=time.perf_counter()
+        cells=self.Source.Load()
+        loadTime=time.perf_counter()-start
+        self._revision=revision
+
+        hashes={tab: TabHash(cells[tab]) for tab in TabParmNames}
+        changedTabs={tab for tab in TabParmNames if self._tabHashes.get(tab) != hashes[tab]}
+        if len(changedTabs) == 0:
+            Log("Watch: spreadsheet revision changed, but none of the tabs we use did")
+            return False
+
+        start=time.perf_counter()
+        if self.Model is None:
+            self.Model=BuildProgramModel(cells)
+        else:
+            self.Model=UpdateProgramModel(self.Model, cells, changedTabs)
+        parseTime=time.perf_counter()-start
+        if self.Model is None:
+            LogError("Watch: the schedule tab could not be interpreted; waiting for the next change")
+            self._tabHashes={}      # Force a complete rebuild once it is fixed
+            return False
+        self._tabHashes=hashes
+
+        reports=[r for r in ReportsForCommand(self.Command) if r.AffectedBy(changedTabs)]
+        timestamp=MakeTimestamp()
+        reportTimes: list[tuple[str, float]]=[]
+        for report in reports:
+            start=time.perf_counter()
+            report.Function(self.Model, self.ReportsDir, timestamp)
+            reportTimes.append((report.Name, time.perf_counter()-start))
+
+        Log(f"Watch: changed tabs: {', '.join(sorted(changedTabs))};  poll {pollTime:.3f}s, load {loadTime:.3f}s, parse {parseTime:.3f}s, "
+            f"{len(reports)} reports {sum(t for _, t in reportTimes):.3f}s", Flush=True)
+        for name, t in reportTimes:
+            Log(f"          {name}: {t:.3f}s")
+        return True
+
+
+    # Poll until stopped.  (cycles > 0 stops after that many polls, which is mostly useful for testing.)
+    def Run(self, cycles: int=0) -> None:
+        Log(f"Watching for changes every {self.Interval} seconds")
+        count=0
+        while True:
+            try:
+                self.Poll()
+            except Exception as e:
+                LogError(f"Watch: exception {e} while polling; will try again")
+            count+=1
+            if 0 < cycles <= count:
+                return
+            time.sleep(self.Interval)
@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import io
+import os
+import re
+import sys
+import glob
+import json
+import shutil
+import tarfile
+import zipfile
+import argparse
+import tempfile
+import subprocess
+
+from SyntheticProgram import SyntheticProgram, WriteParametersFile
+from Benchmark import BenchmarkSizes
+from Log import Log, LogError
+
+# Golden-output regression check: run a reference version of ProgramAnalyzer and a candidate version on the same workbooks and compare
+# every file they write.  The reports are the product, so a change meant only to make things faster must leave every one of them alone.
+#
+#   python RegressionCheck.py --reference HEAD                          The working tree against the last commit, on synthetic programs
+#   python RegressionCheck.py --reference v1.4 --parameters Archive/Boskone62/parameters.txt --sizes small
+#   python RegressionCheck.py --reference ../old-copy --candidate .     Either version may be a git revision or a directory
+#
+# Each run is made in a fresh directory holding a parameters.txt and the Word templates and web page header/footer of the version being
+# run (or, for an archived convention, the ones beside its parameters file).  Before comparing, the things which differ from run to run
+# are normalized: the "Generated:" timestamp lines and the iCalendar DTSTAMPs, and in Word documents the creation/modification times.
+# A .docx file is compared part by part (its XML, not the zip).  "Run profile.json" isn't compared, but the two runs' times are shown.
+#
+# For each differing file the first divergence is shown.  The exit status is 0 if every file matched and 1 if any didn't.
+
+_ignored={"Run profile.json", "Run profile.pstats"}
+_normalizations: list[tuple[re.Pattern, bytes]]=[
+    (re.compile(rb"Generated: [^\n\\\"<]*"), b"Generated: <timestamp>"),
+    (re.compile(rb"DTSTAMP:[0-9TZ]+"), b"DTSTAMP:<timestamp>"),
+    (re.compile(rb"<dcterms:(created|modified)([^>]*)>[^<]*</dcterms:\1>"), rb"<dcterms:\1\2><timestamp></dcterms:\1>"),
+]
+_supportFiles=["Template - *.docx", "control-*.txt"]
+
+
+# Make a version of the code available as a directory: a directory is used as is, anything else is taken to be a git revision of this repository
+def CodeDirectory(version: str, workdir: str) -> str:
+    if os.path.isdir(version):
+        return os.path.abspath(version)
+    repo=os.path.dirname(os.path.abspath(__file__))
+    result=subprocess.run(["git", "-C", repo, "archive", "--format=tar", version], capture_output=True)
+    if result.returncode != 0:
+        LogError(f"RegressionCheck: '{version}' is neither a directory nor a git revision: {result.stderr.decode(errors='replace').strip()}")
+        exit(999)
+    codedir=os.path.join(workdir, "code-"+re.sub(r"[^A-Za-z0-9_.-]", "_", version))
+    with tarfile.open(fileobj=io.BytesIO(result.stdout)) as tar:
+        tar.extractall(codedir)
+    return codedir
+
+
+# A case to run: a name and the lines of its parameters.txt (less reportsdir) and the directories its support files come from, in order
+class RegressionCase:
+    def __init__(self, name: str, parameters: list[str], supportDirs: list[str]):
+        self.Name: str=name
+        self.Parameters: list[str]=parameters
+        self.SupportDirs: list[str]=supportDirs
+
+
+def SyntheticCase(size: str, seed: int, workdir: str) -> RegressionCase:
+    workbook=os.path.join(workdir, f"synthetic-{size}.xlsx")
+    tabs=SyntheticProgram(seed=seed, **BenchmarkSizes[size]).WriteWorkbook(workbook)
+    fname=os.path.join(workdir, f"synthetic-{size}.txt")
+    WriteParametersFile(fname, workbook, tabs)
+    with open(fname) as f:
+        lines=[line.rstrip("\n") for line in f if not line.startswith("reportsdir=")]
+    return RegressionCase(f"synthetic {size}", lines, [])
+
+
+# An archived convention, given by its parameters.txt.  Its workbook is read where it is, and nothing is written beside it.
+def ArchivedCase(parmfile: str) -> RegressionCase:
+    folder=os.path.dirname(os.path.abspath(parmfile))
+    lines=[]
+    with open(parmfile) as f:
+        for line in f:
+            line=line.rstrip("\n")
+            key, _, value=line.partition("=")
+            key=key.strip().lower()
+            if key in ["reportsdir", "snapshot", "database"]:
+                continue
+            if key == "source":
+                if value.strip().lower() == "google":
+                    LogError(f"RegressionCheck: '{parmfile}' reads from Google; only workbooks and directories of CSV/TSV files can be checked")
+                    exit(999)
+                line=f"source={os.path.join(folder, value.strip())}"
+            lines.append(line)
+    return RegressionCase(os.path.relpath(folder), lines, [folder])
+
+
+# Run one version of ProgramAnalyzer on a case.  Returns the reports directory and the run's total time (None if it's unknown).
+def RunCase(case: RegressionCase, codedir: str, rundir: str, command: str) -> tuple[str, float|None]:
+    os.makedirs(rundir)
+    for folder in [codedir]+case.SupportDirs:
+        for pattern in _supportFiles:
+            for fname in glob.glob(os.path.join(folder, pattern)):
+                shutil.copy(fname, rundir)
+    with open(os.path.join(rundir, "parameters.txt"), "w") as f:
+        for line in case.Parameters:
+            print(line, file=f)
+        print("reportsdir=Reports", file=f)
+
+    env=dict(os.environ, PYTHONHASHSEED="0", PYTHONPATH=os.pathsep.join([codedir]+[p for p in [os.environ.get("PYTHONPATH")] if p]))
+    result=subprocess.run([sys.executable, os.path.join(codedir, "ProgramAnalyzer.py"), command], cwd=rundir, env=env, capture_output=True, text=True)
+    with open(os.path.join(rundir, "run.log"), "w") as f:
+        f.write(result.stdout+result.stderr)
+    if result.returncode != 0:
+        LogError(f"RegressionCheck: {case.Name}: {codedir} exited with status {result.returncode}; see {os.path.join(rundir, 'run.log')}")
+
+    reportsdir=os.path.join(rundir, "Reports")
+    try:
+        with open(os.path.join(reportsdir, "Run profile.json")) as f:
+            return reportsdir, json.load(f).get("total wall")
+    except (OSError, ValueError):
+        return reportsdir, None
+
+
+def Normalize(data: bytes) -> bytes:
+    for pattern, replacement in _normalizations:
+        data=pattern.sub(replacement, data)
+    return data
+
+
+# The comparable parts of a file: a Word document's XML parts, or else the file itself
+def FileParts(fname: str) -> dict[str, bytes]:
+    with open(fname, "rb") as f:
+        data=f.read()
+    if fname.endswith(".docx"):
+        try:
+            with zipfile.ZipFile(io.BytesIO(data)) as z:
+                return {name: Normalize(z.read(name)) for name in sorted(z.namelist()) if name.endswith(".xml") or name.endswith(".rels")}
+        except zipfile.BadZipFile:
+            pass
+    return {"": Normalize(data)}
+
+
+# Describe where two byte strings first differ: the line (for text) and a little of each around it
+def FirstDivergence(a: bytes, b: bytes) -> str:
+    n=min(len(a), len(b))
+    i=next((i for i in range(n) if a[i] != b[i]), n)
+    if i == n:
+        return f"one is a prefix of the other (lengths {len(a)} and {len(b)})"
+    line=a.count(b"\n", 0, i)+1
+    lo=max(0, i-40)
+    return f"at byte {i} (line {line}):\n        reference: {a[lo:i+40]!r}\n        candidate: {b[lo:i+40]!r}"
+
+
+# Compare two reports directories.  Returns a list of problems, each with its first divergence.
+def CompareReports(reference: str, candidate: str) -> list[str]:
+    def Files(folder: str) -> set[str]:
+        return {os.path.relpath(os.path.join(root, f), folder) for root, _, files in os.walk(folder) for f in files if f not in _ignored}
+
+    referenceFiles=Files(reference)
+    candidateFiles=Files(candidate)
+    problems=[f"missing from the candidate: {f}" for f in sorted(referenceFiles-candidateFiles)]
+    problems.extend(f"not written by the reference: {f}" for f in sorted(candidateFiles-referenceFiles))
+    for f in sorted(referenceFiles & candidateFiles):
+        a=FileParts(os.path.join(reference, f))
+        b=FileParts(os.path.join(candidate, f))
+        for part in sorted(set(a) | set(b)):
+            where=f+(f" [{part}]" if part != "" else "")
+            if part not in a or part not in b:
+                problems.append(f"{where}: part present in only one")
+            elif a[part] != b[part]:
+                problems.append(f"{where}: differs {FirstDivergence(a[part], b[part])}")
+    return problems
+
+
+def main():
+    parser=argparse.ArgumentParser(description="Check that a candidate version of ProgramAnalyzer writes the same reports as a reference version")
+    parser.add_argument("--reference", default="HEAD", help="The reference version: a git revision or a directory (default: HEAD)")
+    parser.add_argument("--candidate", default=os.path.dirname(os.path.abspath(__file__)), help="The candidate version (default: this directory)")
+    parser.add_argument("--sizes", default="small,medium", help=f"Synthetic programs to check, from {', '.join(BenchmarkSizes)} (may be empty)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--parameters", action="append", default=[], help="An archived convention's parameters file (may be repeated)")
+    parser.add_argument("--reports", default="all", help="The ProgramAnalyzer command to run (default: all)")
+    parser.add_argument("--keep", default=None, help="Keep the runs in this directory rather than deleting them")
+    parser.add_argument("--max-problems", type=int, default=20, help="The most differing files to show for each case")
+    args=parser.parse_args()
+
+    sizes=[s.strip() for s in args.sizes.split(",") if s.strip() != ""]
+    for size in sizes:
+        if size not in BenchmarkSizes:
+            parser.error(f"Unknown size '{size}'")
+
+    workdir=args.keep if args.keep is not None else tempfile.mkdtemp(prefix="regression-")
+    os.makedirs(workdir, exist_ok=True)
+    failed=0
+    try:
+        reference=CodeDirectory(args.reference, workdir)
+        candidate=CodeDirectory(args.candidate, workdir)
+        cases=[SyntheticCase(size, args.seed, workdir) for size in sizes]+[ArchivedCase(p) for p in args.parameters]
+        for i, case in enumerate(cases):
+            referenceReports, referenceTime=RunCase(case, reference, os.path.join(workdir, f"case{i}", "reference"), args.reports)
+            candidateReports, candidateTime=RunCase(case, candidate, os.path.join(workdir, f"case{i}", "candidate"), args.reports)
+            problems=CompareReports(referenceReports, candidateReports)
+            times=f" (reference {referenceTime:.2f}s, candidate {candidateTime:.2f}s)" if referenceTime is not None and candidateTime is not None else ""
+            if len(problems) == 0:
+                Log(f"{case.Name}: all reports match{times}")
+                continue
+            failed+=1
+            LogError(f"{case.Name}: {len(problems)} difference{'s' if len(problems) != 1 else ''}{times}")
+            for problem in problems[:args.max_problems]:
+                LogError("    "+problem)
+            if len(problems) > args.max_problems:
+                LogError(f"    ... and {len(problems)-args.max_problems} more")
+    finally:
+        if args.keep is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    exit(1 if failed > 0 else 0)
+
+
+if __name__ == "__main__":
+    main()
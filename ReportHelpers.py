@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import os
+import re
+import math
+from datetime import datetime
+
+from HelpersPackage import ParmDict
+
+from NumericTime import NumericTime
+from Log import LogError
+
+
+# Create the timestamp line which heads most reports
+def MakeTimestamp() -> str:
+    return f"Generated: {datetime.now():%A %B %d, %Y at %H:%M:%S}\n\n"
+
+
+# We have precis which include material in ((double parens)).  This material goes into some reports, but not all.
+# Strip the non-public stuff -- ((in double parens)) from one precis
+def ScrubPrecis(pre: str) -> str:
+    return re.sub(r"\(\(.*\)\)", "", pre, flags=re.DOTALL)
+
+
+# Does (t1, l1) overlap (t2, l2) where t and l and times and lengths in float hours?
+def TimesOverlap(t1: NumericTime, l1: float, t2: NumericTime, l2: float) -> bool:
+    # Define epsilon=0.001 hours slop
+    epsilon=0.001
+
+    # Bogus times never overlap
+    if t1.Bogus or t2.Bogus:
+        return False
+
+    # Note that we want to ignore 0-length overlaps such as (10.0, 1.0) not overlapping (11.0, x)
+    if t1 < t2:
+        if t1+l1 > t2+epsilon:
+            return True    # t1+l1 is less than t2 or exceeds t2 by less than epsilon
+        return False
+    # So t1 must be >= t2
+    if t2+l2 > t1+epsilon:
+        return True    # t2+l2 is less than t1 or exceeds t1 by less than epsilon
+    return False
+
+
+# Delete a file, ignoring any errors
+# We do this because of as-yet not understood failures to delete files
+def SafeDelete(fn: str) -> bool:
+    try:
+        os.remove(fn)
+    except:
+        return False
+    return True
+
+
+# Get a list of the program participants (the keys of the schedules dictionary) sorted by the last token in the name (which will usually be the last name)
+def SortedParticipantList(gSchedules: dict) -> list[str]:
+    return sorted(gSchedules.keys(), key=lambda x: x.split(" ")[-1])
+
+
+# A Control tab setting (setting name in column A, value in column B), or the default if it isn't given
+def ControlSetting(control: ParmDict, name: str, default: str) -> str:
+    if control.Exists(name):
+        return control[name]
+    return default
+
+
+# A numeric Control tab setting (int or float, as kind), or the default if it's missing or isn't a (finite) number.
+# If positive, it must also be greater than zero.
+def ControlNumber(control: ParmDict, name: str, default: str, kind: type=float, positive: bool=False) -> int|float:
+    if control.Exists(name):
+        value=control[name]
+        try:
+            number=kind(str(value).strip())
+        except ValueError:
+            LogError(f"ControlTab:{name}='{value}' is not a number.  Will use '{default}'")
+            return kind(default)
+        if not math.isfinite(number):
+            LogError(f"ControlTab:{name}='{value}' is not a number.  Will use '{default}'")
+        elif positive and number <= 0:
+            LogError(f"ControlTab:{name}='{value}' is not a positive number.  Will use '{default}'")
+        else:
+            return number
+    return kind(default)
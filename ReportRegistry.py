@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import importlib
+from dataclasses import dataclass
+from typing import Callable
+
+# The list of all the reports, in the order in which they are generated.
+# Each report is a function taking (model, reportsdir, timestamp).  The functions are looked up lazily so that listing a report
+# doesn't import its module (and, for the Word reports, python-docx).
+
+
+@dataclass(order=False)
+class ReportSpec:
+    Name: str=""            # A short name used in logs
+    Group: str=""           # The command which generates it: check, reports, docx, html, ics, feed, resolve, free or sent
+    Module: str=""          # The module containing the function
+    FunctionName: str=""    # The function which writes the report
+    UsesPeople: bool=False  # Does the report depend on the People tab (beyond the names on the schedule)?
+    UsesPrecis: bool=False  # Does the report depend on the Precis tab?
+    InAll: bool=True        # Is it generated by "all"?  (Slow, optional reports must be asked for by their own command.)
+
+    @property
+    def Function(self) -> Callable:
+        return getattr(importlib.import_module(self.Module), self.FunctionName)
+
+    # Does a change to any of these tabs mean that this report needs to be regenerated?
+    # Every report depends on the schedule, and the control tab's starting day changes every time in the schedule.
+    def AffectedBy(self, changedTabs: set[str]) -> bool:
+        if "ScheduleTab" in changedTabs or "ControlTab" in changedTabs:
+            return True
+        return (self.UsesPeople and "PeopleTab" in changedTabs) or (self.UsesPrecis and "PrecisTab" in changedTabs)
+
+
+AllReports: list[ReportSpec]=[
+    # The first reports are all error reports or checking reports
+    ReportSpec("Precis without items", "check", "DiagReports", "WritePrecisWithoutItems", UsesPrecis=True),
+    ReportSpec("People not in People", "check", "DiagReports", "WritePeopleNotInPeople", UsesPeople=True),
+    ReportSpec("Names resolved", "check", "DiagReports", "WriteNamesResolved", UsesPeople=True),
+    ReportSpec("Diag rules", "check", "DiagRules", "WriteDiagRuleReports", UsesPeople=True, UsesPrecis=True),     # Response not yes, suspect emails, low participant counts, missing moderators and precis
+    ReportSpec("Yes but not scheduled", "check", "DiagReports", "WriteYesButNotScheduled", UsesPeople=True),
+    ReportSpec("Schedule conflicts", "check", "DiagReports", "WriteScheduleConflicts", UsesPeople=True),
+    ReportSpec("Scheduling limitations", "check", "DiagReports", "WriteSchedulingLimitations", UsesPeople=True),
+    ReportSpec("Similar names", "check", "DiagReports", "WriteSimilarNames", UsesPeople=True),
+    ReportSpec("Near-duplicate items", "check", "NearDuplicates", "WriteNearDuplicateItems", UsesPrecis=True),
+
+    # Now do the content/working reports
+    ReportSpec("People with items by time", "reports", "TextReports", "WritePeopleWithItemsByTime", UsesPeople=True),
+    ReportSpec("Items with people by time", "reports", "TextReports", "WriteItemsWithPeopleByTime", UsesPrecis=True),
+    ReportSpec("Participant schedules (txt)", "reports", "TextReports", "WriteParticipantSchedulesText", UsesPrecis=True),
+    ReportSpec("Participant schedules (xml)", "reports", "TextReports", "WriteParticipantSchedulesXML", UsesPeople=True, UsesPrecis=True),
+    ReportSpec("Changed participant schedules", "reports", "ParticipantChanges", "WriteChangedParticipantSchedules", UsesPeople=True, UsesPrecis=True),
+    ReportSpec("Participants (xml)", "reports", "TextReports", "WriteParticipantsXML", UsesPeople=True),
+    ReportSpec("Items' people counts", "reports", "TextReports", "WriteItemPeopleCounts"),
+    ReportSpec("Equipment requirements", "reports", "TextReports", "WriteEquipmentRequirements"),
+    ReportSpec("Room utilization", "reports", "RoomUtilization", "WriteRoomUtilization"),
+    ReportSpec("Peoples' item counts", "reports", "TextReports", "WritePeopleItemCounts", UsesPeople=True),
+    ReportSpec("Overloaded participants", "reports", "ParticipantLoad", "WriteOverloadedParticipants"),
+    ReportSpec("Pocket program (txt)", "reports", "TextReports", "WritePocketProgramText", UsesPrecis=True),
+
+    ReportSpec("Participant schedules (docx)", "docx", "DocxReports", "WriteParticipantSchedulesDocx", UsesPrecis=True),
+    ReportSpec("Pocket program (docx)", "docx", "DocxReports", "WritePocketProgramDocx", UsesPrecis=True),
+    ReportSpec("Tentcards -- individual", "docx", "DocxReports", "WriteIndividualTentcards"),
+    ReportSpec("Tentcards -- by item", "docx", "DocxReports", "WriteItemTentcards"),
+    ReportSpec("Room signs", "docx", "DocxReports", "WriteRoomSigns"),
+
+    ReportSpec("Schedule web pages", "html", "HtmlReports", "WriteHtmlSchedules", UsesPrecis=True),
+    ReportSpec("Calendars (ics)", "ics", "IcsReports", "WriteCalendars", UsesPrecis=True),
+    ReportSpec("Data feed (json)", "feed", "DataFeed", "WriteDataFeed", UsesPrecis=True),
+
+    ReportSpec("Proposed schedule changes", "resolve", "ScheduleResolver", "WriteProposedScheduleChanges", UsesPeople=True, InAll=False),
+    ReportSpec("Available people", "free", "Availability", "WriteAvailablePeople", UsesPeople=True, InAll=False),
+    ReportSpec("Suggested panelists", "free", "PanelistRecommender", "WritePanelistSuggestions", UsesPeople=True, UsesPrecis=True, InAll=False),
+    ReportSpec("Mark schedules sent", "sent", "ParticipantChanges", "MarkParticipantSchedulesSent", UsesPeople=True, UsesPrecis=True, InAll=False),
+]
+
+
+# The reports generated by a command ("all" generates everything except the optional reports)
+def ReportsForCommand(command: str) -> list[ReportSpec]:
+    return [r for r in AllReports if (command == "all" and r.InAll) or r.Group == command]
@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import os
+import re
+import csv
+import math
+
+import numpy as np
+
+from ProgramModel import ProgramModel
+from NumericTime import NumericTime
+from ReportHelpers import SafeDelete, ControlNumber
+from Log import Log
+
+# How are the rooms used?
+#
+# The occupancy matrix has a row for each room and a column for each slot (half-hour, by default) from the start of the first item to the
+# end of the last; each cell counts the items in that room then (more than one is a double-booking).  Items are placed by their Length, so
+# the two halves of a [0.5] split item each fill their own half.  From it:
+#   Utilization     the fraction of each day's program hours (the first item of the day, in any room, to the end of its last) a room is in use
+#   Concurrency     the number of rooms in use in each slot, and its peak
+#   Idle gaps       the stretches in which a room sits empty between two of its items on the same day
+#   Equipment       the demand for each kind of equipment (from the items' <equipment:...>) in each slot, and its peak
+# Everything is done on whole arrays: the matrix is marked via a difference array, and the gaps are found from its transitions.
+#
+# It writes
+#   Room utilization.txt            The summary: each day's peak concurrency and each kind of equipment's peak demand
+#   Room utilization.csv            For each room, its hours, utilization by day and overall, and idle gaps
+#   Room occupancy matrix.csv       Heatmap-ready: a row for each slot and a column for each room, plus the rooms in use
+#   Equipment demand.csv            A row for each slot and a column for each kind of equipment
+#
+# This Control tab setting adjusts it:
+#   Rooms: slot hours       0.5     The size of a slot, in hours
+
+_defaultSettings: dict[str, str]={
+    "Rooms: slot hours": "0.5",
+}
+
+_epsilon=0.001
+
+
+# Split an equipment parm into (kind, quantity) pairs: "laptop, table mic x4" --> [("laptop", 1), ("table mic", 4)]
+def ParseEquipment(text: str) -> list[tuple[str, int]]:
+    pairs=[]
+    for part in text.split(","):
+        part=part.strip().lower()
+        if part == "":
+            continue
+        m=re.match(r"^(.*?)\s*[x*]\s*(\d+)$", part) or re.match(r"^(\d+)\s*[x*]?\s+(.*)$", part)
+        if m is None:
+            pairs.append((part, 1))
+        elif m.group(1).isdigit():
+            pairs.append((m.group(2), int(m.group(1))))
+        else:
+            pairs.append((m.group(1), int(m.group(2))))
+    return pairs
+
+
+class RoomUtilization:
+    def __init__(self, model: ProgramModel, slotHours: float|None=None):
+        if slotHours is None:
+            slotHours=ControlNumber(model.Control, "Rooms: slot hours", _defaultSettings["Rooms: slot hours"], positive=True)
+        if slotHours <= 0:
+            raise ValueError(f"RoomUtilization: the slot hours must be positive, not {slotHours}")
+        self.Model: ProgramModel=model
+        self.SlotHours: float=slotHours
+
+        items=[item for item in model.Items.values() if item.Time is not None and not item.Time.Bogus and item.Room != ""]
+        self.Rooms: list[str]=[room for room in model.RoomNames[1:] if room != "" and not room.startswith("#")]
+        for item in items:
+            if item.Room not in self.Rooms:
+                self.Rooms.append(item.Room)
+        roomRow={room: i for i, room in enumerate(self.Rooms)}
+
+        starts=np.array([item.Time.Numeric for item in items], dtype=float)
+        ends=starts+np.array([item.Length for item in items], dtype=float)
+        self.Origin: float=math.floor(starts.min()/slotHours)*slotHours if len(items) > 0 else 0.0
+        self.SlotCount: int=max(1, math.ceil((ends.max()-self.Origin)/slotHours-_epsilon)) if len(items) > 0 else 1
+        first, after=self._SlotRange(starts, ends)
+        rows=np.array([roomRow[item.Room] for item in items], dtype=np.int64)
+
+        # Mark each item's slots: +1 at its first slot and -1 after its last, then a running sum along each row
+        marks=np.zeros((len(self.Rooms), self.SlotCount+1), dtype=np.int32)
+        np.add.at(marks, (rows, first), 1)
+        np.add.at(marks, (rows, after), -1)
+        self.Occupancy: np.ndarray=np.cumsum(marks, axis=1)[:, :self.SlotCount]      # rooms x slots
+        self.InUse: np.ndarray=self.Occupancy > 0
+
+        # The nominal day (late-night slots belong to the evening before) of each slot
+        self.SlotStarts: np.ndarray=self.Origin+slotHours*np.arange(self.SlotCount)
+        self.SlotDay: np.ndarray=np.maximum(0, np.searchsorted(model.Calendar.NominalStarts, self.SlotStarts+_epsilon, side="right")-1)
+        self.Days: list[int]=sorted(set(self.SlotDay.tolist()))
+
+        # Each day's program hours: from the first slot in use (in any room) to the last
+        anyInUse=self.InUse.any(axis=0)
+        self.ProgramSlots: np.ndarray=np.zeros(self.SlotCount, dtype=bool)
+        for day in self.Days:
+            used=np.flatnonzero(anyInUse & (self.SlotDay == day))
+            if len(used) > 0:
+                self.ProgramSlots[used[0]:used[-1]+1]=True
+
+        # Equipment demand: kinds x slots
+        demands=[(kind, count, i) for i, item in enumerate(items) if item.Parms.Exists("equipment") for kind, count in ParseEquipment(item.Parms["equipment"])]
+        self.EquipmentKinds: list[str]=sorted({kind for kind, _, _ in demands})
+        kindRow={kind: i for i, kind in enumerate(self.EquipmentKinds)}
+        marks=np.zeros((len(self.EquipmentKinds), self.SlotCount+1), dtype=np.int32)
+        if len(demands) > 0:
+            kinds=np.array([kindRow[kind] for kind, _, _ in demands], dtype=np.int64)
+            counts=np.array([count for _, count, _ in demands], dtype=np.int32)
+            which=np.array([i for _, _, i in demands], dtype=np.int64)
+            np.add.at(marks, (kinds, first[which]), counts)
+            np.add.at(marks, (kinds, after[which]), -counts)
+        self.EquipmentDemand: np.ndarray=np.cumsum(marks, axis=1)[:, :self.SlotCount]
+        Log(f"Room utilization: {len(self.Rooms)} rooms x {self.SlotCount} slots of {slotHours} hours, {len(items)} items")
+
+
+    # The slots covered by [start, end): any slot the interval overlaps by more than a moment
+    def _SlotRange(self, start: np.ndarray, end: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        first=np.floor((start-self.Origin)/self.SlotHours+_epsilon).astype(np.int64)
+        after=np.ceil((end-self.Origin)/self.SlotHours-_epsilon).astype(np.int64)
+        return np.clip(first, 0, self.SlotCount), np.clip(after, 0, self.SlotCount)
+
+
+    def SlotTime(self, slot: int) -> NumericTime:
+        hours=float(self.SlotStarts[slot])
+        return NumericTime.FromDayHour(int(hours//24), hours % 24, calendar=self.Model.Calendar)
+
+
+    # The fraction of the program hours each room is in use: a rooms x days matrix, and overall
+    def Utilization(self) -> tuple[np.ndarray, np.ndarray]:
+        dayMask=(self.SlotDay[np.newaxis, :] == np.array(self.Days)[:, np.newaxis]) & self.ProgramSlots      # days x slots
+        programSlots=dayMask.sum(axis=1)
+        used=self.InUse.astype(np.int64) @ dayMask.T.astype(np.int64)                                        # rooms x days
+        byDay=used/np.maximum(programSlots, 1)
+        overall=used.sum(axis=1)/max(1, int(programSlots.sum()))
+        return byDay, overall
+
+
+    # The number of rooms in use in each slot
+    @property
+    def Concurrency(self) -> np.ndarray:
+        return self.InUse.sum(axis=0)
+
+
+    # Every stretch in which a room is empty between two of its items on the same day, as parallel arrays of room, first idle slot and
+    # the slot after the last
+    def IdleGaps(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # A gap starts where a room goes from in use to idle and ends where it next goes back, in the same row
+        change=np.diff(self.InUse.astype(np.int8), axis=1)
+        rows, cols=np.nonzero(change)
+        kinds=change[rows, cols]
+        pair=(kinds[:-1] == -1) & (kinds[1:] == 1) & (rows[:-1] == rows[1:])
+        room=rows[:-1][pair]
+        start=cols[:-1][pair]+1
+        after=cols[1:][pair]+1
+        sameDay=self.SlotDay[start] == self.SlotDay[after-1]
+        return room[sameDay], start[sameDay], after[sameDay]
+
+
+#*************************************************************************************************
+def WriteRoomUtilization(model: ProgramModel, reportsdir: str, timestamp: str) -> None:
+    rooms=RoomUtilization(model)
+    calendar=model.Calendar
+    byDay, overall=rooms.Utilization()
+    concurrency=rooms.Concurrency
+    gapRoom, gapStart, gapAfter=rooms.IdleGaps()
+    gapHours=(gapAfter-gapStart)*rooms.SlotHours
+    idleHours=np.bincount(gapRoom, weights=gapHours, minlength=len(rooms.Rooms))
+    idleCount=np.bincount(gapRoom, minlength=len(rooms.Rooms))
+    longestGap=np.zeros(len(rooms.Rooms))
+    np.maximum.at(longestGap, gapRoom, gapHours)
+    bookedHours=rooms.InUse.sum(axis=1)*rooms.SlotHours
+    doubleBooked=(rooms.Occupancy > 1).sum(axis=1)
+
+    fname=os.path.join(reportsdir, "Room utilization.txt")
+    SafeDelete(fname)
+    with open(fname, "w") as f:
+        print("Room utilization and peak demand\n", file=f)
+        print(timestamp, file=f)
+        print(f"{len(rooms.Rooms)} rooms, slots of {rooms.SlotHours} hours\n", file=f)
+        for i, day in enumerate(rooms.Days):
+            inDay=np.flatnonzero((rooms.SlotDay == day) & rooms.ProgramSlots)
+            if len(inDay) == 0:
+                continue
+            peak=int(concurrency[inDay].max())
+            when=inDay[concurrency[inDay] == peak]
+            others="" if len(when) == 1 else f" (and {len(when)-1} other slot{'s' if len(when) > 2 else ''})"
+            print(f"{calendar.DayName(day)}: program from {rooms.SlotTime(inDay[0]).NumericToTextTime()} to {(rooms.SlotTime(inDay[-1])+rooms.SlotHours).NumericToTextTime()},"
+                  f" {100*float(byDay[:, i].mean()):.0f}% of room hours used; peak of {peak} rooms in use at {rooms.SlotTime(when[0]).NumericToTextTime()}"
+                  f"{others}", file=f)
+        print("", file=f)
+        for r, room in enumerate(rooms.Rooms):
+            print(f"{room}: {bookedHours[r]:g} hours, {100*overall[r]:.0f}% used, {idleCount[r]} idle gaps ({idleHours[r]:g} hours, longest {longestGap[r]:g})"
+                  f"{f', double-booked for {doubleBooked[r]} slots' if doubleBooked[r] > 0 else ''}", file=f)
+        if len(rooms.EquipmentKinds) > 0:
+            print("\nPeak equipment demand:", file=f)
+            for k, kind in enumerate(rooms.EquipmentKinds):
+                peak=int(rooms.EquipmentDemand[k].max())
+                print(f"    {kind}: {peak} at {rooms.SlotTime(int(rooms.EquipmentDemand[k].argmax()))}", file=f)
+
+    fname=os.path.join(reportsdir, "Room utilization.csv")
+    with open(fname, mode='w', encoding='UTF8', newline="") as f:
+        writer=csv.writer(f, delimiter=',', quotechar='"')
+        writer.writerow(["Room", "Hours booked"]+[f"{calendar.DayName(day)} %" for day in rooms.Days]+["Overall %", "Idle gaps", "Idle hours", "Longest idle gap",
+                                                                                                      "Double-booked slots"])
+        for r, room in enumerate(rooms.Rooms):
+            writer.writerow([room, f"{bookedHours[r]:g}"]+[f"{100*x:.1f}" for x in byDay[r]]+[f"{100*overall[r]:.1f}", idleCount[r], f"{idleHours[r]:g}",
+                                                                                              f"{longestGap[r]:g}", doubleBooked[r]])
+
+    fname=os.path.join(reportsdir, "Room occupancy matrix.csv")
+    with open(fname, mode='w', encoding='UTF8', newline="") as f:
+        writer=csv.writer(f, delimiter=',', quotechar='"')
+        writer.writerow(["Time"]+rooms.Rooms+["Rooms in use"])
+        for s in range(rooms.SlotCount):
+            writer.writerow([str(rooms.SlotTime(s))]+rooms.Occupancy[:, s].tolist()+[int(concurrency[s])])
+
+    fname=os.path.join(reportsdir, "Equipment demand.csv")
+    with open(fname, mode='w', encoding='UTF8', newline="") as f:
+        writer=csv.writer(f, delimiter=',', quotechar='"')
+        writer.writerow(["Time"]+rooms.EquipmentKinds)
+        for s in range(rooms.SlotCount):
+            writer.writerow([str(rooms.SlotTime(s))]+rooms.EquipmentDemand[:, s].tolist())
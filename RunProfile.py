@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import os
+import sys
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+from Log import Log
+
+# Instrumentation for a ProgramAnalyzer run.
+# Each stage of the run (loading, each step of building the model, each report) is timed with wall and CPU time, along with the growth
+# in peak RSS and, when memory tracing is on, the peak Python allocation during the stage.  Each stage is logged as it completes, and
+# the whole profile can be written as JSON so a slow run can be picked apart afterwards.
+
+
+class RunProfile:
+    def __init__(self, command: str="", traceMemory: bool=False):
+        self.Command: str=command
+        self.Started: str=datetime.now().isoformat(timespec="seconds")
+        self.TraceMemory: bool=traceMemory      # tracemalloc slows Python down considerably, so it's optional
+        self.Stages: list[dict]=[]
+        self.Counts: dict[str, int]={}
+        if traceMemory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+
+    # Time a stage:
+    #   with profile.Stage("load"):
+    #       ...
+    @contextmanager
+    def Stage(self, name: str):
+        rssBefore=_PeakRSSKB()
+        if self.TraceMemory:
+            tracemalloc.reset_peak()
+            allocatedBefore=tracemalloc.get_traced_memory()[0]
+        wallStart=time.perf_counter()
+        cpuStart=time.process_time()
+        try:
+            yield
+        finally:
+            stage={"name": name, "wall": time.perf_counter()-wallStart, "cpu": time.process_time()-cpuStart}
+            rssAfter=_PeakRSSKB()
+            if rssBefore is not None and rssAfter is not None:
+                stage["peak rss growth KB"]=rssAfter-rssBefore
+                stage["peak rss KB"]=rssAfter
+            if self.TraceMemory:
+                current, peak=tracemalloc.get_traced_memory()
+                stage["allocated KB"]=(current-allocatedBefore)//1024
+                stage["peak allocated KB"]=(peak-allocatedBefore)//1024
+            self.Stages.append(stage)
+            Log(f"Profile: {name}: {stage['wall']:.3f}s wall, {stage['cpu']:.3f}s cpu"+
+                (f", peak RSS +{stage['peak rss growth KB']}KB" if "peak rss growth KB" in stage else "")+
+                (f", peak alloc {stage['peak allocated KB']}KB" if self.TraceMemory else ""))
+
+
+    # Record the sizes of the things being processed
+    def RecordCounts(self, **counts: int) -> None:
+        self.Counts.update(counts)
+
+
+    @property
+    def TotalWall(self) -> float:
+        return sum(s["wall"] for s in self.Stages)
+
+
+    def AsDict(self) -> dict:
+        return {"command": self.Command, "started": self.Started, "python": sys.version.split()[0], "pid": os.getpid(),
+                "total wall": self.TotalWall, "counts": self.Counts, "stages": self.Stages}
+
+
+    def Write(self, fname: str) -> None:
+        with open(fname, "w") as f:
+            json.dump(self.AsDict(), f, indent=2)
+        Log(f"Run profile written to '{fname}'")
+
+
+# A stage which is only timed if there is a profile
+def ProfileStage(profile: RunProfile|None, name: str):
+    if profile is None:
+        return nullcontext()
+    return profile.Stage(name)
+
+
+# The process's peak resident set size so far, in KB (None if it can't be determined on this platform)
+def _PeakRSSKB() -> int|None:
+    try:
+        import resource
+        peak=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak//1024 if sys.platform == "darwin" else peak    # macOS reports bytes; Linux reports KB
+    except ImportError:
+        pass
+    try:
+        import psutil       # Windows has no resource module; use psutil if it's installed
+        return psutil.Process().memory_info().peak_wset//1024
+    except (ImportError, AttributeError):
+        return None
@@ -0,0 +1,312 @@
+from __future__ import annotations
+
+import os
+import random
+
+from ProgramModel import ProgramModel
+from Person import Avoidment
+from NumericTime import NumericTime
+from Log import Log, LogError
+
+# Propose changes to the schedule grid which remove people's double-bookings and Avoid conflicts while moving as few items as possible.
+#
+# This is a local search over (time, room) assignments.  Each step takes an item involved in a conflict and considers moving it to every
+# free cell of the grid and swapping it with every other movable item, keeping the change which most reduces the conflicts (and, among
+# equally good changes, the one which disturbs the existing schedule least).  Recently-moved items are tabu for a few steps so the search
+# can walk out of local minima, and the best schedule seen is the one reported.  Finally, any moved item which can go back where it was
+# without creating a conflict is put back.
+#
+# Conflicts are checked incrementally: a change only re-scores the people on the items it touches.
+#
+# The result is a report of proposed moves; the spreadsheet itself is never changed.
+
+_epsilon=0.001
+_conflictWeight=1000    # A conflict costs more than any number of moved items
+
+
+# Does (t1, l1) overlap (t2, l2)?  (The same test as ReportHelpers.TimesOverlap, but on numeric hours.)
+def _Overlap(t1: float, l1: float, t2: float, l2: float) -> bool:
+    if t1 < _epsilon or t2 < _epsilon:
+        return False
+    if t1 < t2:
+        return t1+l1 > t2+_epsilon
+    return t2+l2 > t1+_epsilon
+
+
+class ScheduleResolver:
+    def __init__(self, model: ProgramModel, seed: int=1):
+        self.Model: ProgramModel=model
+        self._random=random.Random(seed)
+
+        self.Rooms: list[str]=[room for room in model.RoomNames[1:] if room != "" and not room.startswith("#")]     # Column 0 is the time column
+        self.Start: dict[str, tuple[float, str]]={}     # The original (time, room) of each item, keyed by item name
+        self.Where: dict[str, tuple[float, str]]={}     # The current (time, room) of each item
+        self.Length: dict[str, float]={}
+        self.PeopleOn: dict[str, list[str]]={}          # The people on each item
+        self.ItemsOf: dict[str, list[str]]={}           # The items each person is on
+        self.Avoids: dict[str, list[tuple[float, float]]]={}    # Each person's avoidments as (start, duration)
+        self.Movable: list[str]=[]
+
+        # Continuations ("{cont}") must stay with the item they continue, so neither moves
+        continued={(item.Room, item.DisplayName) for item in model.Items.values() if item.IsContinuation}
+
+        for name, item in model.Items.items():
+            self.Start[name]=self.Where[name]=(item.Time.Numeric, item.Room)
+            self.Length[name]=item.Length
+            self.PeopleOn[name]=list(dict.fromkeys(item.People))     # (Someone listed twice on an item isn't something moving it can fix)
+            for person in self.PeopleOn[name]:
+                self.ItemsOf.setdefault(person, []).append(name)
+            # Only whole-slot items with people in named rooms are moved.  (Split items, continuations and items in unnamed columns stay put,
+            # though they still count for conflicts.)
+            if len(item.People) > 0 and abs(item.Length-1.0) < _epsilon and not item.Time.Bogus and not item.IsContinuation \
+                    and (item.Room, item.DisplayName) not in continued and item.Room in self.Rooms:
+                self.Movable.append(name)
+
+        for person in self.ItemsOf:
+            self.Avoids[person]=[]
+            if person in model.Persons:     # (Don't use the defaultdict to look people up, as that would add empty Persons)
+                try:
+                    avoids: list[Avoidment]=model.Persons[person].Avoid
+                except ValueError as e:
+                    LogError(f"ScheduleResolver: {person}: {e}")
+                    continue
+                self.Avoids[person]=[(av.Start.Numeric, av.Duration) for av in avoids]
+
+        # The slots an item may move to are the start times of whole-slot items in the grid (not the half-hours of split items)
+        self.Times: list[float]=sorted({self.Start[name][0] for name in self.Movable})
+
+        # What occupies each room, so that we only move items into free cells
+        self._occupants: dict[str, set[str]]={room: set() for room in self.Rooms}
+        for name, (time, room) in self.Where.items():
+            self._occupants.setdefault(room, set()).add(name)
+
+        self._personCost: dict[str, int]={person: sum(self._PersonConflicts(person)) for person in self.ItemsOf}
+        self.InitialCost: tuple[int, int]=self.Conflicts()
+
+
+    #----------------------------------------------
+    # The number of double-bookings and Avoid conflicts one person has in the current schedule
+    def _PersonConflicts(self, person: str) -> tuple[int, int]:
+        items=[(self.Where[name][0], self.Length[name]) for name in self.ItemsOf[person]]
+        doubles=0
+        for i in range(len(items)):
+            for j in range(i+1, len(items)):
+                if _Overlap(*items[i], *items[j]):
+                    doubles+=1
+        avoids=0
+        for time, length in items:
+            for start, duration in self.Avoids[person]:
+                if _Overlap(time, length, start, duration):
+                    avoids+=1
+        return doubles, avoids
+
+
+    # Total double-bookings and Avoid conflicts in the current schedule
+    def Conflicts(self) -> tuple[int, int]:
+        doubles=avoids=0
+        for person in self.ItemsOf:
+            d, a=self._PersonConflicts(person)
+            doubles+=d
+            avoids+=a
+        return doubles, avoids
+
+
+    @property
+    def Moved(self) -> list[str]:
+        return [name for name in self.Where if self.Where[name] != self.Start[name]]
+
+
+    def _RoomIsFree(self, room: str, time: float, length: float, ignore: str) -> bool:
+        return all(not _Overlap(time, length, *self._Span(other)) for other in self._occupants[room] if other != ignore)
+
+
+    def _Span(self, name: str) -> tuple[float, float]:
+        return self.Where[name][0], self.Length[name]
+
+
+    def _Place(self, name: str, where: tuple[float, str]) -> None:
+        self._occupants[self.Where[name][1]].discard(name)
+        self.Where[name]=where
+        self._occupants[where[1]].add(name)
+        for person in self.PeopleOn[name]:
+            self._personCost[person]=sum(self._PersonConflicts(person))
+
+
+    # The conflicts which involve any of the changed items (the rest of each person's conflicts can't be affected by the change)
+    # This is the innermost loop of the search, so it avoids method calls.
+    def _ChangedCost(self, people: set[str], changed: list[str]) -> int:
+        where=self.Where
+        length=self.Length
+        cost=0
+        for person in people:
+            mine=[(where[name][0], length[name]) for name in changed if person in self.PeopleOn[name]]
+            spans=[(where[other][0], length[other]) for other in self.ItemsOf[person] if other not in changed]
+            spans.extend(self.Avoids[person])
+            for i, (t1, l1) in enumerate(mine):
+                for t2, l2 in spans+mine[i+1:]:
+                    if t1 > _epsilon and t2 > _epsilon and (t1+l1 > t2+_epsilon if t1 < t2 else t2+l2 > t1+_epsilon):
+                        cost+=1
+        return cost
+
+
+    # The change in (conflicts, moved items) if the items in changes were put in their new places
+    def _Delta(self, changes: dict[str, tuple[float, str]]) -> tuple[int, int]:
+        people={p for name in changes for p in self.PeopleOn[name]}
+        changed=list(changes)
+        before=self._ChangedCost(people, changed)
+        churnBefore=sum(self.Where[name] != self.Start[name] for name in changes)
+        old={name: self.Where[name] for name in changes}
+        self.Where.update(changes)
+        after=self._ChangedCost(people, changed)
+        churnAfter=sum(self.Where[name] != self.Start[name] for name in changes)
+        self.Where.update(old)
+        return after-before, churnAfter-churnBefore
+
+
+    # All the changes which could be made to one item: moves to free cells and swaps with other movable items
+    def _Candidates(self, name: str):
+        time, room=self.Where[name]
+        for t in self.Times:
+            if abs(t-time) < _epsilon:
+                continue
+            # Moving within the same time slot can't fix anything, so only other times are considered.  Prefer the original room, then the current one.
+            rooms=[self.Start[name][1], room]+self.Rooms
+            for r in dict.fromkeys(rooms):
+                if self._RoomIsFree(r, t, self.Length[name], name):
+                    yield {name: (t, r)}
+                    break
+        for other in self.Movable:
+            if other != name and abs(self.Where[other][0]-time) > _epsilon:
+                yield {name: self.Where[other], other: self.Where[name]}
+
+
+    # Run the search.  It stops when there are no conflicts left, or when it has gone patience steps without finding a better schedule.
+    # Returns the (double-bookings, Avoid conflicts) remaining.
+    def Resolve(self, maxSteps: int=5000, patience: int=150, tabuSteps: int=7) -> tuple[int, int]:
+        movable=set(self.Movable)
+        tabu: dict[str, int]={}
+        best=self._Score()
+        bestWhere=dict(self.Where)
+        bestStep=0
+
+        for step in range(maxSteps):
+            conflicted=sorted({name for person, cost in self._personCost.items() if cost > 0 for name in self.ItemsOf[person]} & movable)
+            if len(conflicted) == 0 or step-bestStep > patience:
+                break
+            name=self._random.choice(conflicted)
+
+            bestChange=None
+            bestDelta=None
+            for change in self._Candidates(name):
+                if any(tabu.get(n, -1) >= step for n in change if n != name):
+                    continue
+                conflicts, churn=self._Delta(change)
+                delta=conflicts*_conflictWeight+churn
+                if bestDelta is None or delta < bestDelta:
+                    bestChange, bestDelta=change, delta
+            if bestChange is None:
+                continue
+
+            for n, where in bestChange.items():
+                self._Place(n, where)
+                tabu[n]=step+tabuSteps
+            score=self._Score()
+            if score < best:
+                best, bestWhere, bestStep=score, dict(self.Where), step
+
+        for name, where in bestWhere.items():
+            if self.Where[name] != where:
+                self._Place(name, where)
+        self._Unmove()
+        remaining=self.Conflicts()
+        Log(f"ScheduleResolver: {sum(self.InitialCost)} conflicts reduced to {sum(remaining)} by moving {len(self.Moved)} items")
+        return remaining
+
+
+    def _Score(self) -> int:
+        return sum(self._personCost.values())*_conflictWeight+len(self.Moved)
+
+
+    # Put back any moved item which can return to its original cell without adding a conflict
+    def _Unmove(self) -> None:
+        for name in self.Moved:
+            time, room=self.Start[name]
+            if self._RoomIsFree(room, time, self.Length[name], name):
+                conflicts, churn=self._Delta({name: (time, room)})
+                if conflicts <= 0:
+                    self._Place(name, (time, room))
+
+
+    #----------------------------------------------
+    # Describe the proposed changes.  A pair of items which exchanged places is shown as a swap.
+    def Changes(self) -> list[str]:
+        lines: list[str]=[]
+        moved=self.Moved
+        done: set[str]=set()
+        for name in moved:
+            if name in done:
+                continue
+            partner=next((other for other in moved if other != name and other not in done and
+                          self.Where[other] == self.Start[name] and self.Where[name] == self.Start[other]), None)
+            if partner is not None:
+                lines.append(f'Swap "{name}" ({self._Slot(self.Start[name])}) with "{partner}" ({self._Slot(self.Start[partner])})')
+                done.add(partner)
+            else:
+                lines.append(f'Move "{name}" from {self._Slot(self.Start[name])} to {self._Slot(self.Where[name])}')
+            done.add(name)
+        return lines
+
+
+    # The conflicts remaining in the proposed schedule
+    def RemainingConflicts(self) -> list[str]:
+        lines: list[str]=[]
+        for person in sorted(self.ItemsOf):
+            items=sorted(self.ItemsOf[person], key=lambda n: self.Where[n][0])
+            for i in range(len(items)):
+                for j in range(i+1, len(items)):
+                    if _Overlap(*self._Span(items[i]), *self._Span(items[j])):
+                        lines.append(f'{person}: "{items[i]}" ({self._Slot(self.Where[items[i]])}) overlaps "{items[j]}" ({self._Slot(self.Where[items[j]])})')
+            for name in items:
+                for (start, duration), av in zip(self.Avoids[person], self._AvoidDescriptions(person)):
+                    if _Overlap(*self._Span(name), start, duration):
+                        lines.append(f'{person}: "{name}" at {self._Slot(self.Where[name])} conflicts with "{av}"')
+        return lines
+
+
+    def _Slot(self, where: tuple[float, str]) -> str:
+        time, room=where
+        return f"{NumericTime.FromDayHour(int(time//24), time%24, self.Model.Calendar)}, {room}"
+
+    def _AvoidDescriptions(self, person: str) -> list[str]:
+        try:
+            return [str(av) for av in self.Model.Persons[person].Avoid] if person in self.Model.Persons else []
+        except ValueError:
+            return []
+
+
+#******
+# Write the proposed changes as a report
+def WriteProposedScheduleChanges(model: ProgramModel, reportsdir: str, timestamp: str) -> None:
+    resolver=ScheduleResolver(model)
+    doubles, avoids=resolver.InitialCost
+    remainingDoubles, remainingAvoids=resolver.Resolve()
+
+    fname=os.path.join(reportsdir, "Proposed schedule changes.txt")
+    with open(fname, "w") as f:
+        print("Proposed schedule changes", file=f)
+        print(timestamp, file=f)
+        print(f"Current schedule:  {doubles} double-bookings, {avoids} Avoid conflicts", file=f)
+        print(f"Proposed schedule: {remainingDoubles} double-bookings, {remainingAvoids} Avoid conflicts, {len(resolver.Moved)} items moved", file=f)
+        print("", file=f)
+
+        changes=resolver.Changes()
+        if len(changes) == 0:
+            print("    No changes proposed", file=f)
+        for line in changes:
+            print(line, file=f)
+
+        remaining=resolver.RemainingConflicts()
+        if len(remaining) > 0:
+            print("\nConflicts which could not be resolved by moving items:", file=f)
+            for line in remaining:
+                print("    "+line, file=f)
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import time
+import random
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from Log import Log, LogError
+
+# Read several tabs of a Google sheet concurrently.
+#
+# The sheet's metadata is read first so that each tab is requested with a range covering exactly its grid (rather than A1:Z999, which
+# silently dropped anything beyond column Z or row 999).  The tabs are then fetched on a thread pool.  Each request which fails in a way
+# that may be temporary (a timeout, a dropped connection, or HTTP 429 or 5xx) is retried with exponential backoff and jitter, up to a limit.
+#
+# The discovery client's http object is not thread-safe, so each worker thread gets its own from httpFactory (which is also where the
+# per-request timeout is applied).  Without an httpFactory the service's own http is used and the requests are made one at a time.
+#
+# Any object with the discovery client's interface can be used as the service, e.g., SheetsStub.StubSheetsService, which can inject latency
+# and failures.
+
+_transientStatuses={408, 429, 500, 502, 503, 504}
+
+
+class SheetsLoadError(Exception):
+    pass
+
+
+# Is this an error worth retrying?
+def IsTransientError(e: Exception) -> bool:
+    if isinstance(e, (TimeoutError, socket.timeout, ConnectionError)):
+        return True
+    resp=getattr(e, "resp", None)       # googleapiclient's HttpError (and the stub's) carry the response, with its status
+    if resp is not None:
+        try:
+            return int(getattr(resp, "status", 0)) in _transientStatuses
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+# The A1-notation name of a (1-based) column number: 1 --> A, 26 --> Z, 27 --> AA
+def ColumnLetters(col: int) -> str:
+    letters=""
+    while col > 0:
+        col, rem=divmod(col-1, 26)
+        letters=chr(ord("A")+rem)+letters
+    return letters
+
+
+def TabRange(tabname: str, rows: int, cols: int) -> str:
+    return "'"+tabname.replace("'", "''")+f"'!A1:{ColumnLetters(max(cols, 1))}{max(rows, 1)}"
+
+
+class SheetsLoader:
+    def __init__(self, service, spreadsheetID: str, httpFactory=None, workers: int=4, retries: int=4, backoff: float=0.5, maxBackoff: float=8.0,
+                 deadline: float|None=None, seed: int|None=None):
+        self.Service=service
+        self.SpreadsheetID: str=spreadsheetID
+        self.HttpFactory=httpFactory        # () --> a new http object for the calling thread (None: use the service's own, serially)
+        self.Workers: int=workers if httpFactory is not None else 1
+        self.Retries: int=retries           # Retries after the first attempt
+        self.Backoff: float=backoff         # Seconds before the first retry; doubled for each retry after that
+        self.MaxBackoff: float=maxBackoff
+        self.Deadline: float|None=deadline  # Seconds allowed for the whole load (None: no limit beyond the per-request timeouts)
+        self._random=random.Random(seed)
+        self._local=threading.local()
+
+
+    def _Http(self):
+        if self.HttpFactory is None:
+            return None
+        if getattr(self._local, "http", None) is None:
+            self._local.http=self.HttpFactory()
+        return self._local.http
+
+
+    # Execute a request, retrying temporary failures.  what is used in log messages.
+    def _Execute(self, makeRequest, what: str):
+        attempt=0
+        while True:
+            try:
+                http=self._Http()
+                if http is None:
+                    return makeRequest().execute()
+                return makeRequest().execute(http=http)
+            except Exception as e:
+                if not IsTransientError(e) or attempt >= self.Retries:
+                    raise SheetsLoadError(f"{what}: {type(e).__name__} {e}"+(f" (after {attempt+1} attempts)" if attempt > 0 else "")) from e
+                delay=min(self.MaxBackoff, self.Backoff*2**attempt)*(0.5+self._random.random()/2)
+                LogError(f"{what}: {type(e).__name__} {e}; retrying in {delay:.2f}s")
+                time.sleep(delay)
+                attempt+=1
+
+
+    # The grid size (rows, columns) of each tab in the sheet, keyed by tab name
+    def GridSizes(self) -> dict[str, tuple[int, int]]:
+        metadata=self._Execute(lambda: self.Service.spreadsheets().get(spreadsheetId=self.SpreadsheetID,
+                                                                        fields="sheets(properties(title,gridProperties(rowCount,columnCount)))"),
+                               "Reading spreadsheet metadata")
+        sizes: dict[str, tuple[int, int]]={}
+        for sheet in metadata.get("sheets", []):
+            props=sheet.get("properties", {})
+            grid=props.get("gridProperties", {})
+            sizes[props.get("title", "")]=(int(grid.get("rowCount", 999)), int(grid.get("columnCount", 26)))
+        return sizes
+
+
+    def _ReadTab(self, tabname: str, rows: int, cols: int) -> list[list[str]]:
+        start=time.perf_counter()
+        cells=self._Execute(lambda: self.Service.spreadsheets().values().get(spreadsheetId=self.SpreadsheetID, range=TabRange(tabname, rows, cols)),
+                            f"Reading tab '{tabname}'").get("values", [])
+        Log(f"Read tab '{tabname}' ({rows}x{cols} grid, {len(cells)} rows) in {time.perf_counter()-start:.2f}s")
+        return cells
+
+
+    # Read the tabs.  Returns each tab's cells (as the API returns them: trailing empty cells and rows omitted), keyed by tab name.
+    # Raises SheetsLoadError if a tab doesn't exist or can't be read.
+    def ReadTabs(self, tabnames: list[str]) -> dict[str, list[list[str]]]:
+        sizes=self.GridSizes()
+        for tabname in tabnames:
+            if tabname not in sizes:
+                raise SheetsLoadError(f"Can't locate '{tabname}' tab in spreadsheet.  Is the supplied SheetID wrong?")
+
+        pool=ThreadPoolExecutor(max_workers=max(1, min(self.Workers, len(tabnames))))
+        try:
+            futures={tabname: pool.submit(self._ReadTab, tabname, *sizes[tabname]) for tabname in tabnames}
+            done, notDone=wait(futures.values(), timeout=self.Deadline)
+            if len(notDone) > 0:
+                raise SheetsLoadError(f"Reading the spreadsheet took longer than {self.Deadline} seconds")
+            return {tabname: future.result() for tabname, future in futures.items()}
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)     # (Don't wait for a request which has overrun the deadline)
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import re
+import time
+import random
+import threading
+
+# A stand-in for the Google Sheets (and Drive) service objects returned by googleapiclient's build().
+# It serves tabs from memory so that the Google code paths can be exercised offline.
+#
+# Only the calls ProgramAnalyzer makes are implemented:
+#   service.spreadsheets().get(spreadsheetId=..., fields=...).execute()                         --> {"sheets": [{"properties": {"title": ..., "gridProperties": ...}}]}
+#   service.spreadsheets().values().get(spreadsheetId=..., range="'Tab'!A1:Z999").execute()     --> {"values": [[...], ...]}
+#   service.files().get(fileId=..., fields="version").execute()                                 --> {"version": "n"}
+#
+# Every change made through SetTab() bumps the version, just as an edit to the real sheet bumps its Drive revision.
+#
+# To exercise the retry and timeout handling it can also:
+#   delay every request by Latency seconds (or, if Latency is a dict, by the latency given for the tab being read)
+#   fail the next n requests with an HTTP status (FailNext), or fail each request with probability FailureRate
+#   time a request out if its latency exceeds the timeout of the http object it's executed with (see StubHttp)
+
+
+class StubSheetsService:
+    def __init__(self, tabs: dict[str, list[list[str]]]=None, latency: float|dict[str, float]=0.0, failureRate: float=0.0,
+                 failureStatus: int=503, seed: int=1):
+        self.Tabs: dict[str, list[list[str]]]={} if tabs is None else dict(tabs)
+        self.Version: int=1
+        self.Requests: list[str]=[]     # The ranges requested, in order, so tests can see what was read
+        self.Latency: float|dict[str, float]=latency
+        self.FailureRate: float=failureRate
+        self.FailureStatus: int=failureStatus
+        self.Failures: int=0            # The number of failures injected so far
+        self._failNext: list[int]=[]
+        self._random=random.Random(seed)
+        self._lock=threading.Lock()
+        self.InFlight: int=0            # Requests executing right now, and the most ever at once, so tests can check for concurrency
+        self.MaxInFlight: int=0
+
+    # Replace the contents of a tab (tabname is the tab's real name, not its parameter name)
+    def SetTab(self, tabname: str, cells: list[list[str]]) -> None:
+        self.Tabs[tabname]=cells
+        self.Version+=1
+
+    # Make the next count requests fail with an HTTP status
+    def FailNext(self, count: int=1, status: int=503) -> None:
+        with self._lock:
+            self._failNext.extend([status]*count)
+
+    # The Sheets API
+    def spreadsheets(self) -> StubSheetsService:
+        return self
+
+    def values(self) -> StubSheetsService:
+        return self
+
+    def get(self, spreadsheetId: str=None, range: str=None, fileId: str=None, fields: str=None) -> _StubRequest:
+        if fileId is not None:      # Drive files().get()
+            return _StubRequest(self, None, lambda: {"version": str(self.Version)})
+
+        if range is None:           # Sheets spreadsheets().get(): the metadata
+            return _StubRequest(self, None, lambda: {"sheets": [{"properties": {"title": name, "gridProperties": _GridSize(cells)}}
+                                                                for name, cells in self.Tabs.items()]})
+
+        with self._lock:
+            self.Requests.append(range)
+        tabname=re.sub(r"!.*$", "", range).strip("'").replace("''", "'")
+        if tabname not in self.Tabs:
+            # The real service responds 400 here.  (SheetsLoader checks the metadata first, so it never asks for a missing tab.)
+            return _StubRequest(self, tabname, StubHttpError(400))
+        return _StubRequest(self, tabname, lambda: {"values": [list(row) for row in _Clip(self.Tabs[tabname], range)]})
+
+    # The Drive API
+    def files(self) -> StubSheetsService:
+        return self
+
+
+    def _Latency(self, tabname: str|None) -> float:
+        if isinstance(self.Latency, dict):
+            return self.Latency.get(tabname, 0.0)
+        return self.Latency
+
+    # Decide whether this request should fail, and how
+    def _InjectedFailure(self) -> int|None:
+        with self._lock:
+            if len(self._failNext) > 0:
+                self.Failures+=1
+                return self._failNext.pop(0)
+            if self.FailureRate > 0 and self._random.random() < self.FailureRate:
+                self.Failures+=1
+                return self.FailureStatus
+        return None
+
+
+# The http object a request is executed with.  Only its timeout matters.
+class StubHttp:
+    def __init__(self, timeout: float|None=None):
+        self.timeout: float|None=timeout
+
+
+# Looks enough like googleapiclient.errors.HttpError for the retry logic: it carries the response status in resp.status
+class StubHttpError(Exception):
+    def __init__(self, status: int):
+        super().__init__(f"<HttpError {status}>")
+        self.resp=_StubResponse(status)
+
+
+class _StubResponse:
+    def __init__(self, status: int):
+        self.status: int=status
+
+
+class _StubRequest:
+    def __init__(self, service: StubSheetsService, tabname: str|None, result):
+        self._service=service
+        self._tabname=tabname
+        self._result=result
+
+    def execute(self, http=None, num_retries: int=0):
+        service=self._service
+        with service._lock:
+            service.InFlight+=1
+            service.MaxInFlight=max(service.MaxInFlight, service.InFlight)
+        try:
+            latency=service._Latency(self._tabname)
+            timeout=getattr(http, "timeout", None)
+            if timeout is not None and latency > timeout:
+                time.sleep(timeout)
+                raise TimeoutError("timed out")
+            if latency > 0:
+                time.sleep(latency)
+            status=service._InjectedFailure()
+            if status is not None:
+                raise StubHttpError(status)
+            if isinstance(self._result, Exception):
+                raise self._result
+            return self._result()
+        finally:
+            with service._lock:
+                service.InFlight-=1
+
+
+# The grid a tab would have in the real sheet: at least 1000x26, as for a new sheet, and larger if the contents need it
+def _GridSize(cells: list[list[str]]) -> dict[str, int]:
+    return {"rowCount": max(1000, len(cells)), "columnCount": max(26, max((len(row) for row in cells), default=0))}
+
+
+# Return just the part of a tab inside the range "Tab!A1:<col><row>", trimmed as the API trims it (no trailing empty cells or rows)
+def _Clip(cells: list[list[str]], range: str) -> list[list[str]]:
+    m=re.search(r"![A-Z]+[0-9]+:([A-Z]+)([0-9]+)$", range)
+    if m is None:
+        return cells
+    cols=0
+    for ch in m.group(1):
+        cols=cols*26+ord(ch)-ord("A")+1
+    rows=[row[:cols] for row in cells[:int(m.group(2))]]
+    rows=[row[:max([i+1 for i, cell in enumerate(row) if cell != ""], default=0)] for row in rows]
+    while len(rows) > 0 and len(rows[-1]) == 0:
+        rows.pop()
+    return rows
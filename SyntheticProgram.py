@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import os
+import random
+import argparse
+
+# Generate a synthetic convention program workbook, for benchmarking and for testing changes against realistic data.
+#
+# The workbook has the four tabs ProgramAnalyzer reads (Schedule, People, Precis and Control) and exercises the spreadsheet
+# conventions the parser handles: two-row time/people entries, "(M)" moderators, "[0.5]" split items, <equipment:...> and <solo>
+# parms, generic item names which need uniquifying, "#" comment rows, columns and cells, Avoid strings, ((private)) precis notes,
+# precis without items and scheduled people who aren't in the People tab.
+#
+# Everything is driven by a seeded random number generator, so a given set of arguments always produces the same workbook.
+
+_firstNames=["Alice", "Bob", "Carol", "Dan", "Eve", "Frank", "Grace", "Hal", "Ivy", "Jack", "Kim", "Leo", "Mia", "Ned", "Olga", "Pat", "Quinn",
+             "Rosa", "Sam", "Tara", "Uma", "Vic", "Wendy", "Xavier", "Yuki", "Zoe", "Anders", "Beatriz", "Chen", "Dmitri", "Esther", "Farid"]
+_lastNames=["Smith", "Jones", "King", "Brown", "Adams", "Lee", "Hall", "Hill", "Nguyen", "Garcia", "Okafor", "Kowalski", "Haldeman", "Bujold",
+            "Vinge", "Cherryh", "Tiptree", "Le Guin", "Asimov", "Sturgeon", "Niven", "Pohl", "Willis", "Kress", "Moon", "Leckie", "Jemisin", "Wolfe"]
+_topicWords=["Space Opera", "Worldbuilding", "Hard SF", "Time Travel", "First Contact", "Dragons", "Cozy Mysteries", "Fanzines", "Costuming",
+             "Filk", "Climate Fiction", "Robots", "AI", "Generation Ships", "Alternate History", "Military SF", "Urban Fantasy", "Horror",
+             "Small Presses", "Translation", "Book Reviewing", "Podcasting", "Astronomy", "Rocketry", "Linguistics", "Magic Systems"]
+_topicForms=["{0} Today", "The Future of {0}", "{0}: Then and Now", "Why {0} Matters", "Writing {0}", "{0} for Beginners", "{0} Revisited",
+             "Is {0} Dead?", "The Best {0} of the Year", "{0} and Its Discontents"]
+_genericItems=["Reading", "Autographs", "KK: Kaffeeklatsch"]
+_equipment=["projector", "microphone", "whiteboard", "laptop, projector", "table mic x4"]
+_avoidForms=["arrive sat {h}", "leave sun {h}", "sat dinner", "fri evening", "daily dinner", "sun all day", "sat {h}-{h2}", "fri {h}-{h2}"]
+_precisSentences=["A look at where the field has been and where it is going.", "Our panelists argue about the classics.",
+                  "What makes this work, and what doesn't?", "Bring your questions.", "Recommendations for readers new to the subject.",
+                  "How real science informs the fiction.", "Panelists share their favorite examples.", "A lively discussion."]
+_dayNames=["Friday", "Saturday", "Sunday", "Monday", "Tuesday", "Wednesday", "Thursday"]
+
+
+# Format a (day index, hour) as the schedule tab would show it, e.g., "Sat 2 pm", "Sun Noon" or "Fri 10:30 am"
+def _TimeText(day: int, hour: float) -> str:
+    if hour == 12:
+        return f"{_dayNames[day][:3]} Noon"
+    h=int(hour)
+    minutes=int(round((hour-h)*60))
+    suffix="am" if h < 12 else "pm"
+    if h > 12:
+        h-=12
+    if h == 0:
+        h=12
+    return f"{_dayNames[day][:3]} {h}{'' if minutes == 0 else f':{minutes:02}'} {suffix}"
+
+
+class SyntheticProgram:
+    def __init__(self, rooms: int=8, days: int=3, slots: int=10, people: int=200, seed: int=1, fill: float=0.8, splitFraction: float=0.05,
+                 moderatorFraction: float=0.7, avoidFraction: float=0.3, equipmentFraction: float=0.1, strangerFraction: float=0.02):
+        self.Rooms=rooms                            # Number of room columns
+        self.Days=days                              # Number of convention days (starting on Friday)
+        self.Slots=slots                            # Number of hourly time slots per day
+        self.People=people                          # Number of people in the People tab
+        self.Fill=fill                              # Fraction of room/slot cells which hold an item
+        self.SplitFraction=splitFraction            # Fraction of items whose people are split with [0.5]
+        self.ModeratorFraction=moderatorFraction    # Fraction of items with an (M) moderator
+        self.AvoidFraction=avoidFraction            # Fraction of people with Avoid entries
+        self.EquipmentFraction=equipmentFraction    # Fraction of items with <equipment:...>
+        self.StrangerFraction=strangerFraction      # Fraction of scheduled names which aren't in the People tab
+        self._random=random.Random(seed)
+
+        self.RoomNames: list[str]=[f"Salon {chr(ord('A')+i)}" if i < 26 else f"Room {i}" for i in range(rooms)]
+        self.PersonNames: list[str]=self._MakePeopleNames()
+
+
+    def _MakePeopleNames(self) -> list[str]:
+        names: list[str]=[]
+        seen: set[str]=set()
+        i=0
+        while len(names) < self.People:
+            name=f"{self._random.choice(_firstNames)} {self._random.choice(_lastNames)}"
+            if name in seen:    # Keep everyone distinct once the simple combinations run out
+                i+=1
+                name=f"{name} {i}"
+            seen.add(name)
+            names.append(name)
+        return names
+
+
+    # The Schedule tab: a header row of room names then, for each time, a time/items row and a people row
+    def ScheduleRows(self) -> tuple[list[list[str]], list[str]]:
+        r=self._random
+        rows: list[list[str]]=[["Time"]+self.RoomNames+["# Notes"]]
+        titles: list[str]=[]
+        for day in range(self.Days):
+            rows.append([f"# ---- {_dayNames[day]} ----"])
+            startHour=14 if day == 0 else 9
+            for slot in range(self.Slots):
+                hour=startHour+slot
+                if hour > 23:
+                    break
+                itemRow=[_TimeText(day, hour)]
+                peopleRow=[""]
+                for room in self.RoomNames:
+                    if r.random() > self.Fill:
+                        itemRow.append("")
+                        peopleRow.append("")
+                        continue
+                    title, people=self._MakeItem()
+                    titles.append(title)
+                    itemRow.append(title)
+                    peopleRow.append(people)
+                itemRow.append("# "+r.choice(["", "check AV", "moved from Sat", ""]))
+                peopleRow.append("")
+                rows.append(itemRow)
+                rows.append(peopleRow)
+        return rows, titles
+
+
+    def _MakeItem(self) -> tuple[str, str]:
+        r=self._random
+        if r.random() < 0.15:
+            title=r.choice(_genericItems)       # These names repeat and get uniquified by the parser
+            count=1 if title != "Autographs" else 3
+        else:
+            title=r.choice(_topicForms).format(r.choice(_topicWords))
+            count=r.randint(2, 5)
+            if r.random() < self.EquipmentFraction:
+                title+=f" <equipment:{r.choice(_equipment)}>"
+            if count == 2 and r.random() < 0.2:
+                title+=" <solo>"
+
+        people=[self._ScheduledName() for _ in range(count)]
+        if count > 1 and r.random() < self.ModeratorFraction:
+            people[0]+=" (M)"
+        if count > 1 and r.random() < self.SplitFraction:
+            half=count//2
+            return title, ", ".join(people[:half])+", [0.5] "+", ".join(people[half:])
+        return title, ", ".join(people)
+
+
+    def _ScheduledName(self) -> str:
+        if self._random.random() < self.StrangerFraction:
+            return f"{self._random.choice(_firstNames)} Q. {self._random.choice(_lastNames)}"     # Not in the People tab
+        return self._random.choice(self.PersonNames)
+
+
+    # The People tab
+    def PeopleRows(self) -> list[list[str]]:
+        r=self._random
+        rows: list[list[str]]=[["fname", "lname", "email", "response", "avoid", "badge name", "notes"]]
+        for name in self.PersonNames:
+            fname, lname=name.split(" ", 1)
+            email=f"{fname.lower()}.{lname.lower().replace(' ', '')}@example.org"
+            if r.random() < 0.02:
+                email=email.replace("@", " at ")       # A suspect address
+            response=r.choices(["y", "yes", "n", "maybe", ""], weights=[70, 10, 8, 7, 5])[0]
+            avoid=""
+            if r.random() < self.AvoidFraction:
+                forms=r.sample(_avoidForms, r.randint(1, 2))
+                avoid=", ".join(f.format(h=r.randint(9, 15), h2=r.randint(16, 20)) for f in forms)
+            rows.append([fname, lname, email, response, avoid, name if r.random() < 0.5 else "", ""])
+        return rows
+
+
+    # The Precis tab: most items have a precis, a few precis have no item
+    def PrecisRows(self, titles: list[str]) -> list[list[str]]:
+        r=self._random
+        rows: list[list[str]]=[["Title", "Precis"]]
+        for title in dict.fromkeys(titles):     # Unique, in order
+            if "<" in title:
+                title=title[:title.index("<")].strip()
+            if title in _genericItems or r.random() < 0.1:
+                continue
+            precis=" ".join(r.sample(_precisSentences, 2))
+            if r.random() < 0.1:
+                precis+=" ((Note to staff: check the panelists' availability))"
+            rows.append([title, precis])
+        for i in range(max(1, len(titles)//100)):
+            rows.append([f"Dropped Panel {i+1}", "This item was cut from the schedule."])
+        return rows
+
+
+    # Write the workbook.  Returns the tab names, keyed by the parameters.txt parameter which names them.
+    def WriteWorkbook(self, fname: str) -> dict[str, str]:
+        import openpyxl
+
+        wb=openpyxl.Workbook()
+        scheduleRows, titles=self.ScheduleRows()
+        tabs={"ScheduleTab": ("Schedule", scheduleRows),
+              "PeopleTab": ("People", self.PeopleRows()),
+              "PrecisTab": ("Precis", self.PrecisRows(titles)),
+              "ControlTab": ("Control", [["Starting day", "Friday"]])}
+        wb.remove(wb.active)
+        for tabname, rows in tabs.values():
+            ws=wb.create_sheet(tabname)
+            for row in rows:
+                ws.append(row)
+        wb.save(fname)
+        return {parm: tabname for parm, (tabname, _) in tabs.items()}
+
+
+# Write a parameters.txt which points ProgramAnalyzer at a generated workbook
+def WriteParametersFile(fname: str, workbook: str, tabs: dict[str, str], reportsdir: str="Reports") -> None:
+    with open(fname, "w") as f:
+        print(f"source={workbook}", file=f)
+        for parm, tabname in tabs.items():
+            print(f"{parm}={tabname}", file=f)
+        print(f"reportsdir={reportsdir}", file=f)
+
+
+def main():
+    parser=argparse.ArgumentParser(description="Generate a synthetic convention program workbook")
+    parser.add_argument("output", help="The .xlsx file to write")
+    parser.add_argument("--rooms", type=int, default=8)
+    parser.add_argument("--days", type=int, default=3)
+    parser.add_argument("--slots", type=int, default=10, help="Hourly time slots per day")
+    parser.add_argument("--people", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--parameters", default=None, help="Also write a parameters file for this workbook")
+    args=parser.parse_args()
+
+    tabs=SyntheticProgram(rooms=args.rooms, days=args.days, slots=args.slots, people=args.people, seed=args.seed).WriteWorkbook(args.output)
+    if args.parameters is not None:
+        WriteParametersFile(args.parameters, os.path.abspath(args.output), tabs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import os
+import csv
+import html
+
+from HelpersPackage import MessageLog
+
+from ProgramModel import ProgramModel, PersonOfInterest
+from ReportHelpers import SafeDelete, ScrubPrecis, SortedParticipantList
+from Log import LogError
+
+# The content/working reports which are written as text, csv or pseudo-XML
+
+
+#*******
+# Print the People with items by time report
+def WritePeopleWithItemsByTime(model: ProgramModel, reportsdir: str, timestamp: str) -> None:
+    gPersons=model.Persons
+    gSchedules=model.Schedules
+    fname=os.path.join(reportsdir, "People with items by time.txt")
+    SafeDelete(fname)
+    with open(fname, "w") as f:
+        print("People with Items by Time\n", file=f)
+        print(timestamp,  file=f)
+        for personname in SortedParticipantList(gSchedules):
+            if gPersons[personname].RespondedYes:
+                print("\n"+personname, file=f)
+                for schedElement in gSchedules[personname]:
+                    if len(schedElement.DisplayName) > 0:
+                        print(f"    {schedElement.Time}: {schedElement.DisplayName} [{schedElement.Room}] {schedElement.ModFlag}", file=f)
+
+
+#*******
+# Print the Items with people by time report
+def WriteItemsWithPeopleByTime(model: ProgramModel, reportsdir: str, timestamp: str) -> None:
+    fname=os.path.join(reportsdir, "Items with people by time.txt")
+    SafeDelete(fname)
+    with open(fname, "w") as f:
+        print("Items with People by Time\n", file=f)
+        print(timestamp,  file=f)
+        for time in model.Times:
+            for room in model.RoomNames:
+                item=model.ItemsByTimeAndRoom.get((time, room))
+                if item is not None:
+                    print(f"{time}, {room}: {item.Name}   {item.DisplayPlist()}", file=f)
+                    if item.Precis is not None and item.Precis != "":
+                        print("     "+ScrubPrecis(item.Precis), file=f)
+
+
+#*******
+# Print the program participant's schedule report in .txt format
+def WriteParticipantSchedulesText(model: ProgramModel, reportsdir: str, timestamp: str) -> None:
+    gItems=model.Items
+    gSchedules=model.Schedules
+    fname=os.path.join(reportsdir, "Program participant schedules.txt")
+    SafeDelete(fname)
+    with open(fname, "w") as f:
+        print(timestamp, file=f)
+        for personname in SortedParticipantList(gSchedules):
+            if PersonOfInterest(personname, gSchedules):
+                print("\n\n********************************************", file=f)
+                print(personname, file=f)
+                for schedElement in gSchedules[personname]:
+                    if len(schedElement.DisplayName) > 0:
+                        print(f"\n{schedElement.Time}: {schedElement.DisplayName} [{schedElement.Room}]", file=f)
+                        item=gItems[schedElement.ItemName]
+                        part=f"Participants: {item.DisplayPlist()}"
+                        print(part, file=f)
+                        if item.Precis is not None and item.Precis != "":
+                            print(f"Precis: {item.Precis}", file=f)
+
+
+# *******
+# Print the program participant's schedule report in the pseudo-XML format used by the mail tool
+def WriteParticipantSchedulesXML(model: ProgramModel, reportsdir: str, timestamp: str) -> None:
+    fname=os.path.join(reportsdir, "Program participant schedules.xml")
+    SafeDelete(fname)
+    with open(fname, "w") as xml:
+        for personname in SortedParticipantList(model.Schedules):
+            if model.Persons[personname].Email is None:
+                LogError(f"Error: {personname} was found in the schedule, but is not in People")
+            xml.write(ParticipantScheduleXML(model, personname))
+
+
+# One person's entry in "Program participant schedules.xml".  (Someone who isn't in People gets only their name.)
+def ParticipantScheduleXML(model: ProgramModel, personname: str) -> str:
+    gItems=model.Items
+    gSchedules=model.Schedules
+    lines=[f"<person><full name>{html.escape(personname)}</full name>"]
+    if model.Persons[personname].Email is None:
+        return lines[0]+"\n"
+    lines.append(f"<email>{html.escape(model.Persons[personname].Email)}</email>")
+    if sum(not x.IsDummy for x in gSchedules[personname]) == 0:
+        lines.append(f"<item><title>No Items Scheduled Yet</title><participants>{html.escape(personname)}</participants></item>")
+    else:
+        for schedElement in gSchedules[personname]:
+            if len(schedElement.DisplayName) > 0:
+                lines.append(f"<item><title>{html.escape(str(schedElement.Time))}: {html.escape(schedElement.DisplayName)} [{html.escape(schedElement.Room)}]</title>")
+                item=gItems[schedElement.ItemName]
+                if schedElement.DisplayName in gItems and gItems[schedElement.DisplayName].Parms.Exists("equipment"):
+                    lines.append(f"<equipment>{html.escape(gItems[schedElement.DisplayName].Parms['equipment'])}</equipment>")
+                lines.append(f"<participants>{html.escape(item.DisplayPlist())}</participants>")
+                if item.Precis is not None and item.Precis != "":
+                    lines.append(f"<precis>{html.escape(item.Precis)}</precis>")
+                lines.append(f"</item>\n")
+    lines.append("</person>")
+    return "".join(line+"\n" for line in lines)
+
+
+#*******
+# Put out the entire People table in pseudo-XML format
+def WriteParticipantsXML(model: ProgramModel, reportsdir: str, timestamp: str) -> None:
+    fname=os.path.join(reportsdir, "Program participants.xml")
+    SafeDelete(fname)
+    with open(fname, "w") as xml:
+        for person in model.Persons.values():
+            xml.writelines(f"<person>")
+            for key, val in person.Parms.items():
+                xml.writelines(f"<{key}>{html.escape(str(val))}</{key}>")
+            xml.writelines("</person>\n")
+
+
+#******
+# Report on the number of people/item
+def WriteItemPeopleCounts(model: ProgramModel, reportsdir: str, timestamp: str) -> None:
+    fname=os.path.join(reportsdir, "Items' people counts.txt")
+    SafeDelete(fname)
+    with open(fname, "w") as f:
+        itemdata=[]
+        for itemname, item in model.Items.items():
+            itemdata.append([len(item.People), str(item.Time), item.Name])
+            print(f"{item.Time} {item.Name}: {len(item.People)}", file=f)
+
+    fname=os.path.join(reportsdir, "Items' people counts.csv")
+    with open(fname, mode='w', encoding='UTF8', newline="") as f:
+        writer=csv.writer(f, delimiter=',', quotechar='"')
+        writer.writerow(["Number", "Item Time", "Item Title"])
+        for id in itemdata:
+            writer.writerow(id)
+
+
+def WriteEquipmentRequirements(model: ProgramModel, reportsdir: str, timestamp: str) -> None:
+    fname=os.path.join(reportsdir, "Equipment requirements.txt")
+    SafeDelete(fname)
+    with open(fname, "w") as f:
+        print("List of items with equipment requirements\n\n", file=f)
+        print(timestamp,  file=f)
+        found=False
+        for itemname, item in model.Items.items():
+            if item.Parms.Exists("equipment"):
+                print(f"{item.Time}, {item.Room}:  {item.Name}\n\t\t{item.Parms['equipment']}\n", file=f)
+                found=True
+        if not found:
+            print("None found", file=f)
+
+
+#******
+# Report on the number of items/person
+# Include all people in the people tab, even those with no items
+def WritePeopleItemCounts(model: ProgramModel, reportsdir: str, timestamp: str) -> None:
+    gPersons=model.Persons
+    gSchedules=model.Schedules
+    fname=os.path.join(reportsdir, "Peoples' item counts.txt")
+    SafeDelete(fname)
+    with open(fname, "w") as f:
+        print("List of number of items each person is scheduled on\n", file=f)
+        print(timestamp,  file=f)
+        for personname, person in gPersons.items():
+            if person.RespondedYes or PersonOfInterest(personname, gSchedules):
+                if personname in gSchedules.keys():
+                    numItems=sum(not x.IsDummy for x in gSchedules[personname])
+                    print(f"{personname}: {numItems}{'' if person.RespondedYes else ' not confirmed'}", file=f)
+                else:
+                    if person.RespondedYes:
+                        print(personname+": responded Yes, but is not scheduled", file=f)
+
+    fname=os.path.join(reportsdir, "Peoples' item counts.csv")
+    with open(fname, "w", encoding='UTF8', newline="") as f:
+        writer=csv.writer(f, delimiter=',', quotechar='"')
+        writer.writerow(["Number" , "Person"])
+        for personname, person in gPersons.items():
+            if person.RespondedYes or PersonOfInterest(personname, gSchedules):
+                numItems=sum(not x.IsDummy for x in gSchedules[personname])
+                writer.writerow([numItems, personname])
+
+
+# Create the pocket program .txt file
+def WritePocketProgramText(model: ProgramModel, reportsdir: str, timestamp: str) -> None:
+    fname=os.path.join(reportsdir, "Pocket program.txt")
+    try:
+        if not SafeDelete(fname):
+            pass
+    except:
+        MessageLog(f"Can't do a safe deolete of {fname}")
+        pass
+    try:
+        f=open(fname, "w")    # The file to receive the .txt document
+    except:
+        MessageLog(f"Can't open {fname}")
+        f=None
+        pass
+        # Popup("open("+fname+")  threw exception")
+
+    if f is not None:
+        print("Schedule", file=f)
+        for time in model.Times:
+            print(f"\n{time}", file=f)
+            for room in model.RoomNames:
+                item=model.ItemsByTimeAndRoom.get((time, room))
+                if item is not None and len(item.DisplayName) > 0:
+                    print(f"   {room}:  {item.DisplayName}", file=f)   # Print the room and item name
+                    if len(item.People) > 0:            # And the item's people list
+                        plist=item.DisplayPlist()
+                        print("            "+plist, file=f)
+                    if item.Precis is not None and item.Precis != "":
+                        print("            "+ScrubPrecis(item.Precis), file=f)
+        f.close()
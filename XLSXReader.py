@@ -0,0 +1,286 @@
+from __future__ import annotations
+
+import re
+import zipfile
+import posixpath
+from xml.parsers import expat
+
+from Log import Log
+
+# A minimal reader for .xlsx workbooks: just the cell values, read straight from the zip with expat.
+#
+# openpyxl builds a complete object model of every sheet (styles, dimensions, formatting...) even though we only want the values of four
+# tabs.  This opens the zip, reads the shared strings once, and parses only the sheets which are asked for.  It stands in for an openpyxl
+# workbook as far as ReadSheetFromXLSXTab is concerned (sheetnames, workbook[name].values) and gives the same values openpyxl does:
+# str, int, float or bool, with None for empty cells, and formulas as "=...".
+#
+# Cells it can't turn into exactly what openpyxl would -- numbers formatted as dates or times, dates stored as dates, and shared or array
+# formulas -- raise XLSXUnsupported, and the caller falls back on openpyxl (see LoadCellsFromXLSX).
+
+_relationshipNS="http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+
+# The built-in number formats which openpyxl reads as dates or times
+_builtinDateFormats={14, 15, 16, 17, 18, 19, 20, 21, 22, 45, 46, 47}
+# (openpyxl's test of a custom number format: any date or time letter outside quotes and [locale] brackets in the positive format)
+_formatStrip=re.compile(r'".*?"|\[(?!hh?\]|mm?\]|ss?\])[^\]]*\]')
+_dateLetters=re.compile(r"(?<![_\\])[dmhysDMHYS]")
+
+
+class XLSXUnsupported(Exception):
+    pass
+
+
+# Parse an XML part of the workbook, calling start(name, attrs), end(name) and text(data) with names stripped of their namespaces
+def _Parse(stream, start=None, end=None, text=None) -> None:
+    parser=expat.ParserCreate(namespace_separator=" ")
+    parser.buffer_text=True
+    if start is not None:
+        parser.StartElementHandler=lambda name, attrs: start(name.rpartition(" ")[2], attrs)
+    if end is not None:
+        parser.EndElementHandler=lambda name: end(name.rpartition(" ")[2])
+    if text is not None:
+        parser.CharacterDataHandler=text
+    parser.ParseFile(stream)
+
+
+# The column number (A=1) of a cell reference like "AB12"
+def ColumnNumber(ref: str) -> int:
+    col=0
+    for ch in ref:
+        if not ch.isalpha():
+            break
+        col=col*26+ord(ch.upper())-ord("A")+1
+    return col
+
+
+# Collects the text of <si> (shared string) or <is> (inline string) elements: the <t> directly inside, plus the <t>s of rich text runs
+# (but not of phonetic runs, <rPh>)
+class _StringText:
+    def __init__(self):
+        self.Parts: list[str]=[]
+        self._inText=False
+        self._phonetic=0
+
+    def Start(self, name: str) -> None:
+        if name == "rPh":
+            self._phonetic+=1
+        elif name == "t" and self._phonetic == 0:
+            self._inText=True
+
+    def End(self, name: str) -> None:
+        if name == "rPh":
+            self._phonetic-=1
+        elif name == "t":
+            self._inText=False
+
+    def Text(self, data: str) -> None:
+        if self._inText:
+            self.Parts.append(data)
+
+    def Value(self) -> str:
+        value="".join(self.Parts)
+        self.Parts=[]
+        return value
+
+
+class XLSXSheet:
+    def __init__(self, workbook: XLSXWorkbook, name: str, part: str):
+        self.Workbook: XLSXWorkbook=workbook
+        self.Title: str=name
+        self.Part: str=part         # The sheet's XML part in the zip
+
+
+    # The rows of values, as tuples running from column A to the last column used, with None for empty cells (like openpyxl's ws.values)
+    @property
+    def values(self) -> list[tuple]:
+        cells=self._ReadCells()
+        if len(cells) == 0:
+            return []
+        width=max((max(row) for row in cells.values() if len(row) > 0), default=0)
+        return [tuple(cells.get(r, {}).get(c) for c in range(1, width+1)) for r in range(1, max(cells)+1)]
+
+
+    # The sheet's cell values as {row: {column: value}}
+    def _ReadCells(self) -> dict[int, dict[int, object]]:
+        workbook=self.Workbook
+        shared=workbook.SharedStrings
+        dateStyles=workbook.DateStyles
+        cells: dict[int, dict[int, object]]={}
+        state={"row": 0, "col": 0}
+        cell: dict[str, object]={}
+        buffer: list[str]=[]
+        inline=_StringText()
+        where=[""]          # What the character data belongs to: "v", "f" or "is" (or "" for nothing we want)
+
+        def Start(name: str, attrs: dict[str, str]) -> None:
+            if name == "c":
+                ref=attrs.get("r")
+                state["col"]=ColumnNumber(ref) if ref else state["col"]+1
+                cell.clear()
+                cell.update(type=attrs.get("t", "n"), style=int(attrs.get("s", 0) or 0), ref=ref)
+            elif name == "v" or name == "f":
+                if name == "f":
+                    if attrs.get("t") in ("shared", "array"):
+                        raise XLSXUnsupported(f"{self.Title}!{cell.get('ref')} has a {attrs.get('t')} formula")
+                    cell["formula"]=True
+                where[0]=name
+                buffer.clear()
+            elif name == "is":
+                where[0]="is"
+                cell["inline"]=True
+            elif where[0] == "is":
+                inline.Start(name)
+            elif name == "row":
+                r=attrs.get("r")
+                state["row"]=int(float(r)) if r else state["row"]+1
+                state["col"]=0
+                cells.setdefault(state["row"], {})
+
+        def End(name: str) -> None:
+            if name == "v" or name == "f":
+                cell[name]="".join(buffer)
+                where[0]=""
+            elif name == "is":
+                cell["is"]=inline.Value()
+                where[0]=""
+            elif where[0] == "is":
+                inline.End(name)
+            elif name == "c":
+                cells.setdefault(state["row"], {})[state["col"]]=self._Value(cell, shared, dateStyles)
+
+        def Text(data: str) -> None:
+            if where[0] == "is":
+                inline.Text(data)
+            elif where[0] != "":
+                buffer.append(data)
+
+        with workbook.Zip.open(self.Part) as f:
+            _Parse(f, Start, End, Text)
+        return cells
+
+
+    # A cell's value, as openpyxl would give it
+    def _Value(self, cell: dict, shared: list[str], dateStyles: set[int]) -> object:
+        kind=cell["type"]
+        if cell.get("formula"):
+            return "="+cell.get("f", "")
+        if kind == "inlineStr":
+            return cell.get("is")
+        value=cell.get("v") or None
+        if value is None:
+            return None
+        if kind == "n":
+            if cell["style"] in dateStyles:
+                raise XLSXUnsupported(f"{self.Title}!{cell['ref']} is a date or time")
+            return float(value) if "." in value or "E" in value or "e" in value else int(value)
+        if kind == "s":
+            return shared[int(value)]
+        if kind == "b":
+            return bool(int(value))
+        if kind == "d":
+            raise XLSXUnsupported(f"{self.Title}!{cell['ref']} is a date")
+        return value        # "str" (a formula's string result) and "e" (an error like #N/A)
+
+
+class XLSXWorkbook:
+    def __init__(self, fname: str):
+        self.Zip: zipfile.ZipFile=zipfile.ZipFile(fname)
+        self._sheets: dict[str, str]={}                     # Sheet name --> its XML part
+        self._sharedStrings: list[str]|None=None
+        self._dateStyles: set[int]|None=None
+        self._parts: dict[str, str]={}                      # Relationship type (the last part of it) --> the workbook's part of that type
+
+        # Find the sheets' parts via the workbook's relationships
+        targets: dict[str, str]={}
+
+        def Relationship(name: str, attrs: dict[str, str]) -> None:
+            if name == "Relationship":
+                target=attrs["Target"]
+                target=target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join("xl", target))
+                targets[attrs["Id"]]=target
+                self._parts.setdefault(attrs.get("Type", "").rpartition("/")[2], target)
+
+        with self.Zip.open("xl/_rels/workbook.xml.rels") as f:
+            _Parse(f, Relationship)
+
+        def Sheet(name: str, attrs: dict[str, str]) -> None:
+            if name == "sheet":
+                rid=attrs.get(_relationshipNS+" id")
+                if rid in targets:
+                    self._sheets[attrs["name"]]=targets[rid]
+
+        with self.Zip.open("xl/workbook.xml") as f:
+            _Parse(f, Sheet)
+
+
+    def __enter__(self) -> XLSXWorkbook:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.Close()
+
+    def Close(self) -> None:
+        self.Zip.close()
+
+
+    @property
+    def sheetnames(self) -> list[str]:
+        return list(self._sheets)
+
+    def __getitem__(self, name: str) -> XLSXSheet:
+        return XLSXSheet(self, name, self._sheets[name])
+
+
+    # The shared strings table, read the first time it's needed
+    @property
+    def SharedStrings(self) -> list[str]:
+        if self._sharedStrings is None:
+            self._sharedStrings=[]
+            part=self._parts.get("sharedStrings", "xl/sharedStrings.xml")
+            if part in self.Zip.NameToInfo:
+                text=_StringText()
+
+                def End(name: str) -> None:
+                    if name == "si":
+                        self._sharedStrings.append(text.Value().replace("x005F_", ""))      # (As openpyxl does)
+                    else:
+                        text.End(name)
+
+                with self.Zip.open(part) as f:
+                    _Parse(f, lambda name, attrs: text.Start(name), End, text.Text)
+            Log(f"XLSXReader: {len(self._sharedStrings)} shared strings")
+        return self._sharedStrings
+
+
+    # The cell styles (indexes into cellXfs) which openpyxl would read as dates or times
+    @property
+    def DateStyles(self) -> set[int]:
+        if self._dateStyles is None:
+            self._dateStyles=set()
+            part=self._parts.get("styles", "xl/styles.xml")
+            if part in self.Zip.NameToInfo:
+                custom: dict[int, str]={}
+                formats: list[int]=[]
+                inCellXfs=[False]
+
+                def Start(name: str, attrs: dict[str, str]) -> None:
+                    if name == "numFmt":
+                        custom[int(attrs["numFmtId"])]=attrs.get("formatCode", "")
+                    elif name == "cellXfs":
+                        inCellXfs[0]=True
+                    elif name == "xf" and inCellXfs[0]:
+                        formats.append(int(attrs.get("numFmtId", 0)))
+
+                def End(name: str) -> None:
+                    if name == "cellXfs":
+                        inCellXfs[0]=False
+
+                with self.Zip.open(part) as f:
+                    _Parse(f, Start, End)
+                for style, numFmtId in enumerate(formats):
+                    if numFmtId in custom:
+                        if _dateLetters.search(_formatStrip.sub("", custom[numFmtId].split(";")[0])) is not None:
+                            self._dateStyles.add(style)
+                    elif numFmtId in _builtinDateFormats:
+                        self._dateStyles.add(style)
+        return self._dateStyles
@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+import os
+import sys
+
+import pytest
+
+# The modules live at the top of the repository and import one another by name, so the tests run with it on the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from HelpersPackage import ParmDict
+
+from SyntheticProgram import SyntheticProgram
+
+
+# The tabs of a small synthetic program, keyed by tab name, as a spreadsheet would hold them
+@pytest.fixture
+def syntheticTabs() -> dict[str, list[list[str]]]:
+    program=SyntheticProgram(rooms=4, days=2, slots=6, people=60, seed=7)
+    scheduleRows, titles=program.ScheduleRows()
+    return {"Schedule": scheduleRows, "People": program.PeopleRows(), "Precis": program.PrecisRows(titles), "Control": [["Starting day", "Friday"]]}
+
+
+# The parameters.txt settings naming those tabs
+@pytest.fixture
+def syntheticParms() -> ParmDict:
+    parms=ParmDict(CaseInsensitiveCompare=True)
+    for parm, tabname in {"ScheduleTab": "Schedule", "PeopleTab": "People", "PrecisTab": "Precis", "ControlTab": "Control"}.items():
+        parms[parm]=tabname
+    parms["SheetID"]="synthetic"
+    return parms
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import os
+
+import pytest
+
+from ProgramWatcher import ProgramWatcher, GoogleProgramSource
+from SheetsStub import StubSheetsService
+
+# Watch mode driven by a StubSheetsService: each SetTab() is an edit to the sheet, seen at the next poll
+
+
+@pytest.fixture
+def stub(syntheticTabs) -> StubSheetsService:
+    return StubSheetsService(syntheticTabs)
+
+
+@pytest.fixture
+def watcher(stub, syntheticParms, tmp_path) -> ProgramWatcher:
+    return ProgramWatcher(GoogleProgramSource(syntheticParms, stub, stub), str(tmp_path), command="check", interval=0)
+
+
+def test_first_poll_builds_the_model_and_the_reports(watcher, tmp_path):
+    assert watcher.Poll()
+    assert watcher.Model is not None and len(watcher.Model.Items) > 0
+    assert os.path.exists(tmp_path/"Diag - precis without items.txt")
+    assert not watcher.Poll()       # Nothing has changed since
+
+
+def test_unchanged_tabs_are_not_reloaded(watcher, stub, syntheticTabs):
+    watcher.Poll()
+    read=len(stub.Requests)
+    assert not watcher.Poll()
+    assert len(stub.Requests) == read
+
+    # A new revision whose tabs are the same as before is read, but changes nothing
+    stub.SetTab("Precis", [list(row) for row in syntheticTabs["Precis"]])
+    assert not watcher.Poll()
+    assert len(stub.Requests) > read
+
+
+def test_precis_edit_regenerates_only_the_reports_which_use_it(watcher, stub, syntheticTabs, tmp_path):
+    watcher.Poll()
+    for fname in os.listdir(tmp_path):
+        os.remove(tmp_path/fname)
+
+    title=next(iter(watcher.Model.Items.values())).Name
+    stub.SetTab("Precis", syntheticTabs["Precis"]+[[title, "A brand new description"]])
+    assert watcher.Poll()
+    assert watcher.Model.Items[title].Precis == "A brand new description"
+    assert os.path.exists(tmp_path/"Diag - precis without items.txt")
+    assert not os.path.exists(tmp_path/"Diag - People in schedule but not in People.txt")
+
+
+def test_schedule_edit_is_patched_into_the_model(watcher, stub, syntheticTabs):
+    watcher.Poll()
+    count=len(watcher.Model.Items)
+    rows=[list(row) for row in syntheticTabs["Schedule"]]
+    rows.append(["Saturday 9:00 pm", "Late Night Filk"])
+    stub.SetTab("Schedule", rows)
+    assert watcher.Poll()
+    assert len(watcher.Model.Items) == count+1
+    assert watcher.Model.Items["Late Night Filk"].Room == rows[0][1]
+
+
+def test_people_edit_reaches_the_model(watcher, stub, syntheticTabs):
+    watcher.Poll()
+    stub.SetTab("People", syntheticTabs["People"]+[["Zelda", "Quinn", "zelda@example.org", "y", "", "", ""]])
+    assert watcher.Poll()
+    assert "Zelda Quinn" in watcher.Model.Persons
+
+
+def test_an_unreadable_schedule_waits_for_the_next_change(watcher, stub, syntheticTabs):
+    watcher.Poll()
+    stub.SetTab("Schedule", [])
+    assert not watcher.Poll()
+    assert watcher.Model is None
+
+    stub.SetTab("Schedule", syntheticTabs["Schedule"])
+    assert watcher.Poll()
+    assert watcher.Model is not None and len(watcher.Model.Items) > 0
+
+
+def test_run_polls_the_given_number_of_times(watcher, stub):
+    watcher.Run(cycles=3)
+    assert watcher.Model is not None
+    assert stub.Version == 1
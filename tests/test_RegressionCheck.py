@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import os
+import shutil
+import zipfile
+
+import pytest
+
+from RegressionCheck import CompareReports
+
+# Comparing a reference and a candidate reports directory
+
+
+def _Write(folder, fname: str, text: str) -> None:
+    os.makedirs(os.path.dirname(os.path.join(folder, fname)) or folder, exist_ok=True)
+    with open(os.path.join(folder, fname), "w") as f:
+        f.write(text)
+
+
+def _WriteDocx(folder, fname: str, body: str, modified: str) -> None:
+    with zipfile.ZipFile(os.path.join(folder, fname), "w") as z:
+        z.writestr("word/document.xml", f"<w:document><w:body>{body}</w:body></w:document>")
+        z.writestr("docProps/core.xml", f'<cp:coreProperties><dcterms:modified xsi:type="dcterms:W3CDTF">{modified}</dcterms:modified></cp:coreProperties>')
+
+
+@pytest.fixture
+def reference(tmp_path) -> str:
+    folder=str(tmp_path/"reference")
+    os.makedirs(folder)
+    _Write(folder, "Diag - precis without items.txt", "Precis without corresponding items:\nGenerated: Mon Oct 19 10:00:00 2026\n    None found\n")
+    _Write(folder, "Calendars/Everyone.ics", "BEGIN:VEVENT\nUID:1\nDTSTAMP:20261019T100000Z\nSUMMARY:Opening\nEND:VEVENT\n")
+    _Write(folder, "Run profile.json", '{"total wall": 1.5}')
+    _WriteDocx(folder, "Pocket program.docx", "Opening", "2026-10-19T10:00:00Z")
+    return folder
+
+
+# A second run of the same code: only the timestamps differ
+@pytest.fixture
+def candidate(reference, tmp_path) -> str:
+    folder=str(tmp_path/"candidate")
+    shutil.copytree(reference, folder)
+    _Write(folder, "Diag - precis without items.txt", "Precis without corresponding items:\nGenerated: Tue Oct 20 11:30:00 2026\n    None found\n")
+    _Write(folder, "Calendars/Everyone.ics", "BEGIN:VEVENT\nUID:1\nDTSTAMP:20261020T113000Z\nSUMMARY:Opening\nEND:VEVENT\n")
+    _Write(folder, "Run profile.json", '{"total wall": 0.9}')
+    _WriteDocx(folder, "Pocket program.docx", "Opening", "2026-10-20T11:30:00Z")
+    return folder
+
+
+def test_unchanged_output_matches(reference, candidate):
+    assert CompareReports(reference, candidate) == []
+
+
+def test_changed_text_report_is_reported(reference, candidate):
+    _Write(candidate, "Diag - precis without items.txt", "Precis without corresponding items:\nGenerated: Tue Oct 20 11:30:00 2026\n   Dropped Panel 1\n")
+    problems=CompareReports(reference, candidate)
+    assert len(problems) == 1
+    assert problems[0].startswith("Diag - precis without items.txt: differs at byte")
+    assert "(line 3)" in problems[0]
+
+
+def test_changed_calendar_is_reported(reference, candidate):
+    _Write(candidate, "Calendars/Everyone.ics", "BEGIN:VEVENT\nUID:1\nDTSTAMP:20261020T113000Z\nSUMMARY:Closing\nEND:VEVENT\n")
+    problems=CompareReports(reference, candidate)
+    assert len(problems) == 1 and problems[0].startswith(os.path.join("Calendars", "Everyone.ics")+": differs")
+
+
+def test_changed_word_document_names_the_part(reference, candidate):
+    _WriteDocx(candidate, "Pocket program.docx", "Closing", "2026-10-20T11:30:00Z")
+    problems=CompareReports(reference, candidate)
+    assert len(problems) == 1 and problems[0].startswith("Pocket program.docx [word/document.xml]: differs")
+
+
+def test_missing_and_extra_files_are_reported(reference, candidate):
+    os.remove(os.path.join(candidate, "Diag - precis without items.txt"))
+    _Write(candidate, "Diag - Names resolved automatically.txt", "None found\n")
+    assert CompareReports(reference, candidate) == ["missing from the candidate: Diag - precis without items.txt",
+                                                    "not written by the reference: Diag - Names resolved automatically.txt"]
+
+
+def test_run_profile_is_not_compared(reference, candidate):
+    os.remove(os.path.join(candidate, "Run profile.json"))
+    assert CompareReports(reference, candidate) == []
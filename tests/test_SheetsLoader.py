@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import pytest
+
+from SheetsLoader import SheetsLoader, SheetsLoadError, TabRange
+from SheetsStub import StubSheetsService, StubHttp
+
+# The concurrent Sheets loader against a StubSheetsService which injects latency and failures
+
+_tabnames=["Schedule", "Precis", "People", "Control"]
+
+
+# The tabs as the API returns them: without trailing empty cells
+def _Served(tabs: dict[str, list[list[str]]]) -> dict[str, list[list[str]]]:
+    served={}
+    for tabname in _tabnames:
+        rows=[list(row) for row in tabs[tabname]]
+        for row in rows:
+            while len(row) > 0 and row[-1] == "":
+                row.pop()
+        served[tabname]=rows
+    return served
+
+
+def _Loader(stub: StubSheetsService, **kwargs) -> SheetsLoader:
+    kwargs.setdefault("backoff", 0.0)
+    kwargs.setdefault("seed", 1)
+    return SheetsLoader(stub, "synthetic", **kwargs)
+
+
+def test_reads_every_tab(syntheticTabs):
+    stub=StubSheetsService(syntheticTabs)
+    assert _Loader(stub).ReadTabs(_tabnames) == _Served(syntheticTabs)
+
+
+def test_range_covers_the_whole_grid():
+    wide=[[f"r{r}c{c}" for c in range(30)] for r in range(1200)]
+    stub=StubSheetsService({"Wide": wide})
+    assert _Loader(stub).ReadTabs(["Wide"])["Wide"] == wide
+    assert stub.Requests == [TabRange("Wide", 1200, 30)] == ["'Wide'!A1:AD1200"]
+
+
+def test_missing_tab_is_an_error(syntheticTabs):
+    stub=StubSheetsService(syntheticTabs)
+    with pytest.raises(SheetsLoadError, match="Can't locate 'Program' tab"):
+        _Loader(stub).ReadTabs(["Program"])
+    assert stub.Requests == []
+
+
+def test_503_is_retried(syntheticTabs):
+    stub=StubSheetsService(syntheticTabs)
+    stub.FailNext(3, 503)
+    assert _Loader(stub, retries=4).ReadTabs(_tabnames)["People"] == _Served(syntheticTabs)["People"]
+    assert stub.Failures == 3
+
+
+def test_retries_give_up(syntheticTabs):
+    stub=StubSheetsService(syntheticTabs)
+    stub.FailNext(3, 503)
+    with pytest.raises(SheetsLoadError, match="after 3 attempts"):
+        _Loader(stub, retries=2).ReadTabs(_tabnames)
+    assert stub.Failures == 3
+
+
+def test_permanent_error_is_not_retried(syntheticTabs):
+    stub=StubSheetsService(syntheticTabs)
+    stub.FailNext(1, 403)
+    with pytest.raises(SheetsLoadError, match="403"):
+        _Loader(stub, retries=4).ReadTabs(_tabnames)
+    assert stub.Failures == 1
+
+
+def test_random_failures_are_retried(syntheticTabs):
+    stub=StubSheetsService(syntheticTabs, failureRate=0.3, seed=4)
+    assert _Loader(stub, retries=10, httpFactory=StubHttp).ReadTabs(_tabnames) == _Served(syntheticTabs)
+    assert stub.Failures > 0
+
+
+def test_slow_request_times_out_and_is_retried(syntheticTabs):
+    stub=StubSheetsService(syntheticTabs, latency={"People": 0.2})
+    with pytest.raises(SheetsLoadError, match="TimeoutError.*after 2 attempts"):
+        _Loader(stub, retries=1, httpFactory=lambda: StubHttp(timeout=0.02)).ReadTabs(_tabnames)
+    assert stub.Requests.count(TabRange("People", 1000, 26)) == 2
+
+    # A request within the timeout succeeds
+    stub.Latency={"People": 0.01}
+    assert _Loader(stub, retries=1, httpFactory=lambda: StubHttp(timeout=0.2)).ReadTabs(_tabnames)["People"] == _Served(syntheticTabs)["People"]
+
+
+def test_deadline_stops_the_load(syntheticTabs):
+    stub=StubSheetsService(syntheticTabs, latency={"Precis": 0.5})
+    with pytest.raises(SheetsLoadError, match="longer than 0.1 seconds"):
+        _Loader(stub, httpFactory=StubHttp, deadline=0.1).ReadTabs(_tabnames)
+
+
+def test_tabs_are_read_concurrently(syntheticTabs):
+    stub=StubSheetsService(syntheticTabs, latency=0.1)
+    _Loader(stub, httpFactory=StubHttp, workers=4).ReadTabs(_tabnames)
+    assert stub.MaxInFlight == 4
+
+
+def test_workers_limit_concurrency(syntheticTabs):
+    stub=StubSheetsService(syntheticTabs, latency=0.1)
+    _Loader(stub, httpFactory=StubHttp, workers=2).ReadTabs(_tabnames)
+    assert stub.MaxInFlight == 2
+
+
+def test_without_an_http_factory_requests_are_serial(syntheticTabs):
+    stub=StubSheetsService(syntheticTabs, latency=0.02)
+    loader=_Loader(stub, workers=4)
+    assert loader.Workers == 1
+    loader.ReadTabs(_tabnames)
+    assert stub.MaxInFlight == 1